@@ -0,0 +1,49 @@
+"""Server CPU and websocket payload per radio click: full-page rerun vs. fragment rerun.
+
+    python benchmarks/fragment_reruns.py [--page "Assessment: (1) Accessibility"] [--clicks 20]
+"""
+import argparse
+import statistics
+
+from harness import LIKERT_CYCLE, MeasuredSession
+
+
+def measure(page, clicks, scoped):
+    session = MeasuredSession(page)
+    session.run()
+    samples = []
+    for n in range(clicks):
+        radio = session.app.radio[n % len(session.app.radio)]
+        if scoped:
+            samples.append(session.click(radio, LIKERT_CYCLE[n % len(LIKERT_CYCLE)]))
+        else:
+            # What every click cost before the subdimension fragments: a rerun of the whole page
+            radio.set_value(LIKERT_CYCLE[n % len(LIKERT_CYCLE)])
+            samples.append(session.run())
+    return samples
+
+
+def summary(samples):
+    return {
+        "cpu_ms": 1000 * statistics.median(sample.cpu for sample in samples),
+        "wall_ms": 1000 * statistics.median(sample.wall for sample in samples),
+        "messages": statistics.median(sample.messages for sample in samples),
+        "payload_bytes": statistics.median(sample.payload_bytes for sample in samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", default="Assessment: (1) Accessibility")
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+
+    full = summary(measure(args.page, args.clicks, scoped=False))
+    fragment = summary(measure(args.page, args.clicks, scoped=True))
+    print(f"{'per click (median)':<20}{'full rerun':>14}{'fragment':>14}")
+    for metric in ("cpu_ms", "wall_ms", "messages", "payload_bytes"):
+        print(f"{metric:<20}{full[metric]:>14.1f}{fragment[metric]:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+from urllib import parse
+
+# The page scripts import the app's modules from the repository root, as under `streamlit run`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData, ScriptRequests
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as app_test_module
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+from streamlit.testing.v1.util import patch_config_options
+
+PAGES = os.path.join(ROOT, "pages")
+
+# Answers cycled through by the scripted clicks
+LIKERT_CYCLE = ("Strongly Agree", "Somewhat Disagree", "Strongly Disagree", "Somewhat Agree", "Neutral")
+
+
+def page_names():
+    # Every page of the app: the start page first, then pages/ in sidebar order
+    return ["streamlit_app"] + sorted(os.path.splitext(name)[0] for name in os.listdir(PAGES) if name.endswith(".py"))
+
+
+def synthetic_answers(n, seed=0, unanswered=0.1):
+    """(n x questions) int8 answers as a ResponseStore holds them; a share of `unanswered` questions is 0."""
+    import questions
+
+    rng = np.random.default_rng(seed)
+    answers = rng.integers(1, 6, (n, len(questions.load_question_bank())), dtype=np.int8)
+    answers[rng.random(answers.shape) < unanswered] = 0
+    return answers
+
+
+def synthetic_weights(n, seed=0):
+    # Slider weights (0.0-2.0 in steps of 0.1) per assessment, as saved by the Results page
+    import scoring
+
+    rng = np.random.default_rng(seed)
+    return [dict(zip(scoring.DIMENSIONS, (rng.integers(0, 21, len(scoring.DIMENSIONS)) / 10).tolist())) for _ in range(n)]
+
+
+def page_path(name):
+    # "Results" -> pages/Results.py, "streamlit_app" -> streamlit_app.py
+    if name == "streamlit_app":
+        return os.path.join(ROOT, "streamlit_app.py")
+    return os.path.join(PAGES, f"{name}.py")
+
+
+# Fragment to rerun and forward messages of the last run, per thread driving a session
+_runs = threading.local()
+
+
+class _MeasuredRunner(LocalScriptRunner):
+    """LocalScriptRunner that can scope a rerun to one fragment, as the browser does for a click inside it."""
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        # The constructor already queued a full rerun, which would swallow a fragment-scoped request
+        self._requests = ScriptRequests()
+        query_string = parse.urlencode(query_params, doseq=True) if query_params else ""
+        self.request_rerun(RerunData(widget_states=widget_state, query_string=query_string, page_script_hash=page_hash,
+                                     fragment_id=getattr(_runs, "fragment_id", None)))
+        try:
+            if not self._script_thread:
+                self.start()
+            require_widgets_deltas(self, timeout)
+        finally:
+            self.join()
+        _runs.messages = list(self.forward_msgs())
+        return parse_tree_from_messages(self.forward_msgs())
+
+
+class _KeepRuntime(type):
+    # The end of one AppTest run resets the runtime, which would pull it away from runs still going on other threads
+    def __setattr__(cls, name, value):
+        if not (name == "_instance" and value is None):
+            setattr(Runtime, name, value)
+
+
+class _SharedRuntime(Runtime, metaclass=_KeepRuntime):
+    pass
+
+
+@contextmanager
+def concurrent_sessions():
+    """Let MeasuredSessions rerun on several threads at once, like the sessions of one server process.
+
+    AppTest assumes one app at a time: every run installs and finally removes a global runtime and
+    patches the config. Inside this block the runtime stays installed and the patches stay in place.
+    """
+    with mock.patch.object(app_test_module, "Runtime", _SharedRuntime), \
+            mock.patch.object(app_test_module, "LocalScriptRunner", _MeasuredRunner), \
+            patch_config_options({"global.appTest": True}):
+        try:
+            yield
+        finally:
+            Runtime._instance = None
+
+
+class RunStats:
+    def __init__(self, wall, cpu, messages):
+        self.wall = wall  # seconds
+        self.cpu = cpu  # process CPU seconds (all threads) spent serving the rerun
+        self.messages = len(messages)
+        # Serialized size of the forward messages the server would push over the websocket
+        self.payload_bytes = sum(message.ByteSize() for message in messages)
+
+
+class MeasuredSession:
+    """One headless browser session on a page script, recording wall/CPU time and payload of every rerun."""
+
+    def __init__(self, page, timeout=60):
+        self.app = AppTest.from_file(page_path(page), default_timeout=timeout)
+        self.widget_fragments = {}  # widget id -> id of the fragment it was rendered in
+        self.fragments = []  # ids of the fragments rendered by the last full run
+
+    def set_state(self, **values):
+        for key, value in values.items():
+            self.app.session_state[key] = value
+
+    def switch_page(self, page):
+        # Keep session state (answers, assessment id, weights) and continue on another page, like sidebar navigation
+        state = {key: self.app.session_state[key] for key in self.app.session_state
+                 if not key.startswith("$$") and not key.startswith("q")}
+        self.app = AppTest.from_file(page_path(page), default_timeout=self.app.default_timeout)
+        for key, value in state.items():
+            self.app.session_state[key] = value
+        self.widget_fragments = {}
+        self.fragments = []
+
+    def run(self, fragment_id=None):
+        _runs.fragment_id = fragment_id
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        with mock.patch.object(app_test_module, "LocalScriptRunner", _MeasuredRunner):
+            self.app.run()
+        messages = _runs.messages
+        stats = RunStats(time.perf_counter() - start_wall, time.process_time() - start_cpu, messages)
+        if self.app.exception:
+            raise RuntimeError(f"Page raised: {self.app.exception[0].message}")
+        if fragment_id is None:
+            self.fragments = list(dict.fromkeys(message.delta.fragment_id for message in messages
+                                                if message.HasField("delta") and message.delta.fragment_id))
+            for message in messages:
+                if message.HasField("delta") and message.delta.HasField("new_element"):
+                    element = message.delta.new_element
+                    widget = getattr(element, element.WhichOneof("type"), None)
+                    if getattr(widget, "id", None):
+                        self.widget_fragments[widget.id] = message.delta.fragment_id or None
+        return stats
+
+    def click(self, widget, value=None, refresh=True):
+        """Change a widget and rerun the way the browser would: only its fragment if it lives in one.
+
+        After a fragment rerun the element tree holds only the fragment; `refresh` reruns the full page
+        (not measured) so widgets outside of it can be clicked next.
+        """
+        if value is not None:
+            widget.set_value(value)
+        fragment_id = self.widget_fragments.get(widget.id)
+        stats = self.run(fragment_id)
+        if fragment_id and refresh:
+            # A fragment rerun only returns the fragment's elements; refresh the full tree (not measured)
+            self.run()
+        return stats
@@ -0,0 +1,83 @@
+"""Import-time report: what each page costs on a cold server process.
+
+    python benchmarks/import_times.py [--pages Results "Summary & Export"] [--top 8] [--warm] [--output imports.json]
+
+Every page runs once in a fresh interpreter with `python -X importtime`. Streamlit itself and the
+test harness are imported first and left out, so the report shows only what the page pulls in.
+The background warm-up is disabled, unless --warm lets it finish before the page runs (i.e. the
+page is the first visit on a server process that has been up for a few seconds).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import harness
+
+MARKER = "--- page run starts ---"
+
+# Runs in the child interpreter
+CHILD = """
+import os, sys, time
+sys.path.insert(0, {benchmarks!r})
+import harness
+session = harness.MeasuredSession({page!r})
+if {warm!r}:
+    import session as app_session
+    app_session.warm_up().join()
+print({marker!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+session.run()
+print("first_run_seconds", time.perf_counter() - start)
+"""
+
+
+def measure(page, warm=False):
+    code = CHILD.format(benchmarks=os.path.dirname(os.path.abspath(__file__)), page=page, marker=MARKER, warm=warm)
+    # Keep the measurement away from a real assessments.db
+    env = dict(os.environ, IIP_WARM_UP="1" if warm else "0")
+    env.setdefault("IIP_DB_PATH", os.path.join(tempfile.gettempdir(), "iip-import-times.db"))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=harness.ROOT, env=env)
+    if result.returncode:
+        raise RuntimeError(f"{page} failed:\n{result.stderr[-2000:]}")
+    first_run = float(result.stdout.split("first_run_seconds")[-1])
+    _, _, imports = result.stderr.partition(MARKER)
+    packages = {}
+    for line in imports.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue  # header line, or nested import already counted in its parent
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative) / 1e6
+    return {"page": page, "first_run_seconds": first_run, "import_seconds": sum(packages.values()),
+            "packages": dict(sorted(packages.items(), key=lambda item: -item[1]))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=harness.page_names())
+    parser.add_argument("--top", type=int, default=8, help="packages listed per page")
+    parser.add_argument("--warm", action="store_true", help="let the per-process warm-up finish before the page runs")
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = []
+    for page in args.pages:
+        entry = measure(page, args.warm)
+        report.append(entry)
+        top = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in list(entry["packages"].items())[:args.top])
+        print(f"{page:<46} imports {entry['import_seconds'] * 1000:7.0f} ms   first run {entry['first_run_seconds'] * 1000:7.0f} ms",
+              flush=True)
+        print(f"    {top}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Load test: many simulated users working through an assessment at the same time on one server process.
+
+    python benchmarks/load_test.py                          # 1, 2, 4, 8 and 16 concurrent users
+    python benchmarks/load_test.py --users 10 25 50 --think 2
+    python benchmarks/load_test.py --compare benchmarks/results/load-<earlier>.json
+
+Every simulated user is a headless session on the real page scripts (see harness.py) with its own
+thread, as a browser tab has its own script thread on the server. It opens the start page, answers a
+few questions on each of the seven assessment pages, changes a weight on Results and exports the PDF
+report on Summary & Export, polling until the report can be downloaded. Between two actions it pauses
+for a random think time.
+
+For every number of users the report lists the rerun latency (p50 / p95 / p99, overall and per page),
+the throughput in reruns per second, the PDF export turnaround and the growth of the server's peak RSS
+per session. The results are written to benchmarks/results/load-<timestamp>.json.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from suite import RESULTS, metadata  # sets up a temporary database before the app is imported
+import harness
+import reports
+import scoring
+
+START_PAGE = "streamlit_app"
+ASSESSMENT_PAGES = [page for page in harness.page_names() if page.startswith("Assessment: ")]
+USERS = (1, 2, 4, 8, 16)
+POLL_SECONDS = 0.5  # as the export status on the Summary page
+EXPORT_TIMEOUT = 300
+
+
+class SimulatedUser:
+    """One user's walk through the app; every rerun is recorded as (page, action, seconds)."""
+
+    def __init__(self, number, think, answers, rng):
+        self.number = number
+        self.think = think
+        self.answers = answers  # questions answered per assessment page
+        self.rng = rng
+        self.reruns = []
+        self.export = None  # "done", "failed", "refused" or "timeout"
+        self.export_seconds = None  # click to download
+        self.error = None
+        self.session = None  # kept after the walk: a finished user still holds a session on the server
+
+    def pause(self):
+        time.sleep(self.rng.uniform(0.5, 1.5) * self.think)
+
+    def rerun(self, page, action, fragment_id=None):
+        stats = self.session.run(fragment_id)
+        self.reruns.append((page, action, stats.wall))
+        return stats
+
+    def walk(self):
+        try:
+            self.pause()
+            self.session = harness.MeasuredSession(START_PAGE)
+            self.rerun(START_PAGE, "load")
+            for page in ASSESSMENT_PAGES:
+                self.answer(page)
+            self.change_weight()
+            self.export_report()
+        except Exception as error:  # reported with the results, the other users carry on
+            self.error = f"{type(error).__name__}: {error}"
+
+    def answer(self, page):
+        self.pause()
+        self.session.switch_page(page)
+        self.rerun(page, "load")
+        for n in range(self.answers):
+            self.pause()
+            # A click reruns only the radio's subdimension block, which is then all the page tree holds:
+            # the next answers are given in the same block, as a user works down the page
+            radio = self.session.app.radio[n % len(self.session.app.radio)]
+            stats = self.session.click(radio, harness.LIKERT_CYCLE[(self.number + n) % len(harness.LIKERT_CYCLE)],
+                                       refresh=False)
+            self.reruns.append((page, "answer", stats.wall))
+
+    def change_weight(self):
+        self.pause()
+        self.session.switch_page("Results")
+        self.rerun("Results", "load")
+        self.pause()
+        slider = self.session.app.sidebar.slider[self.number % len(scoring.DIMENSIONS)]
+        stats = self.session.click(slider, round(float(self.rng.integers(0, 21)) / 10, 1))
+        self.reruns.append(("Results", "weight", stats.wall))
+
+    def export_report(self):
+        page = "Summary & Export"
+        self.pause()
+        self.session.switch_page(page)
+        self.rerun(page, "load")
+        self.pause()
+        start = time.perf_counter()
+        next(button for button in self.session.app.button if button.label == "Export Detailed Breakdown as PDF").click()
+        self.rerun(page, "export")
+        if self.session.app.warning:
+            self.export = "refused"
+            return
+        # The export status is the page's only fragment; it polls until the report is ready and then reruns the page
+        status = self.session.fragments[0]
+        while time.perf_counter() - start < EXPORT_TIMEOUT:
+            if self.session.app.error:
+                self.export = "failed"
+                return
+            if any(button.label == "Download PDF Report" for button in self.session.app.get("download_button")):
+                self.export = "done"
+                self.export_seconds = time.perf_counter() - start
+                return
+            time.sleep(POLL_SECONDS)
+            self.rerun(page, "poll", None if not self.session.app.get("progress") else status)
+        self.export = "timeout"
+
+
+def percentiles(seconds):
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": max(seconds) * 1000}
+
+
+def run_level(n, think, answers, seed):
+    """Walk `n` users through the app at the same time; returns the level's summary."""
+    gc.collect()
+    before = reports.peak_rss_mb()
+    users = [SimulatedUser(number, think, answers, np.random.default_rng([seed, n, number])) for number in range(n)]
+    threads = [threading.Thread(target=user.walk, name=f"user-{user.number}") for user in users]
+    start = time.perf_counter()
+    with harness.concurrent_sessions():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    growth = None if before is None else reports.peak_rss_mb() - before
+
+    reruns = [rerun for user in users for rerun in user.reruns]
+    by_page = {}
+    for page, _, wall in reruns:
+        by_page.setdefault(page, []).append(wall)
+    exports = [user.export_seconds for user in users if user.export == "done"]
+    return {
+        "users": n,
+        "seconds": seconds,
+        "reruns": len(reruns),
+        "reruns_per_second": len(reruns) / seconds,
+        **percentiles([wall for _, _, wall in reruns]),
+        "pages": {page: {"reruns": len(walls), **percentiles(walls)} for page, walls in by_page.items()},
+        "actions": {action: percentiles([wall for _, kind, wall in reruns if kind == action])
+                    for action in dict.fromkeys(kind for _, kind, _ in reruns)},
+        "exports": {outcome: sum(user.export == outcome for user in users)
+                    for outcome in ("done", "refused", "failed", "timeout")},
+        "export_turnaround": percentiles(exports),
+        "peak_rss_growth_mb": growth,
+        "peak_rss_growth_mb_per_session": None if growth is None else growth / n,
+        "errors": [f"user {user.number}: {user.error}" for user in users if user.error],
+    }
+
+
+def print_level(level):
+    export = level["export_turnaround"]
+    rss = level["peak_rss_growth_mb_per_session"]
+    print(f"{level['users']:>6}{level['reruns']:>9}{level['reruns_per_second']:>10.1f}"
+          f"{level['p50_ms']:>10.0f}{level['p95_ms']:>10.0f}{level['p99_ms']:>10.0f}"
+          f"{level['exports']['done']:>5}/{level['users']:<4}"
+          f"{'-' if export['p50_ms'] is None else format(export['p50_ms'] / 1000, '.1f'):>9}"
+          f"{'-' if rss is None else format(rss, '.1f'):>12}", flush=True)
+    for error in level["errors"]:
+        print(f"      {error}")
+
+
+def print_pages(level):
+    print(f"\nPer page with {level['users']} users (ms):")
+    print(f"{'page':<44}{'reruns':>8}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for page, stats in level["pages"].items():
+        print(f"{page:<44}{stats['reruns']:>8}{stats['p50_ms']:>8.0f}{stats['p95_ms']:>8.0f}{stats['p99_ms']:>8.0f}")
+
+
+def compare(levels, baseline_path):
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = {level["users"]: level for level in json.load(handle)["levels"]}
+    print(f"\nCompared with {baseline_path} (new / old):")
+    print(f"{'users':>6}{'reruns/s':>10}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for level in levels:
+        old = baseline.get(level["users"])
+        if old:
+            print(f"{level['users']:>6}{level['reruns_per_second'] / old['reruns_per_second']:>9.2f}x"
+                  + "".join(f"{level[key] / old[key]:>7.2f}x" for key in ("p50_ms", "p95_ms", "p99_ms")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=list(USERS), help="numbers of concurrent users to run")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between two actions in seconds")
+    parser.add_argument("--answers", type=int, default=3, help="questions answered per assessment page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/load-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier load test JSON to compare against")
+    args = parser.parse_args()
+
+    # The first session pays for imports, caches and the export workers; warm them up before measuring
+    run_level(1, 0, 1, args.seed)
+    print(f"{'users':>6}{'reruns':>9}{'reruns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'exports':>9}"
+          f"{'export s':>9}{'MB/session':>12}")
+    levels = []
+    for n in sorted(args.users):
+        levels.append(run_level(n, args.think, args.answers, args.seed))
+        print_level(levels[-1])
+    print_pages(levels[-1])
+
+    output = args.output or os.path.join(RESULTS, datetime.datetime.now().strftime("load-%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump({"meta": {**metadata(), "think_seconds": args.think, "answers_per_page": args.answers},
+                   "levels": levels}, handle, indent=2)
+    print(f"\nWrote {len(levels)} levels to {output}")
+    if args.compare:
+        compare(levels, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Benchmark suite: scoring, chart rendering, PDF export and page reruns on synthetic portfolios.
+
+    python benchmarks/suite.py                      # full run, results in benchmarks/results/<timestamp>.json
+    python benchmarks/suite.py --quick              # fewer sizes and repeats
+    python benchmarks/suite.py --compare benchmarks/results/<earlier>.json
+
+Every benchmark is repeated and reported as min / median / mean / max seconds. Results of different
+runs can be compared with --compare, which prints the ratio of the medians.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# The app opens its database at import time; keep the synthetic portfolio away from a real assessments.db
+os.environ.setdefault("IIP_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="iip-bench-"), "assessments.db"))
+
+import harness  # noqa: E402  (puts the repository root on sys.path)
+import numpy as np  # noqa: E402
+
+import charts  # noqa: E402
+import collaboration  # noqa: E402
+import history  # noqa: E402
+import reports  # noqa: E402
+import scoring  # noqa: E402
+import storage  # noqa: E402
+from response_store import ResponseStore  # noqa: E402
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SIZES = (1, 10, 100, 1000, 10000)
+QUICK_SIZES = (1, 100, 1000)
+PORTFOLIO_SIZES = (10, 100, 300)
+
+
+class Suite:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def time(self, name, fn, size=None, repeat=None, setup=None, **info):
+        """Run `fn` `repeat` times (after `setup`, which is not timed) and record the timings."""
+        timings = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        self.record(name, timings, size, **info)
+        return timings
+
+    def record(self, name, timings, size=None, **info):
+        result = {"benchmark": name, "size": size, "unit": "s", "repeat": len(timings),
+                  "min": min(timings), "median": statistics.median(timings),
+                  "mean": statistics.fmean(timings), "max": max(timings), **info}
+        self.results.append(result)
+        label = name if size is None else f"{name} [n={size}]"
+        size_note = f"  {info['pdf_bytes'] / 1024:,.0f} KB" if "pdf_bytes" in info else ""
+        print(f"{label:<58}{result['median'] * 1000:>12.2f} ms  (min {result['min'] * 1000:.2f} ms){size_note}", flush=True)
+
+
+def bench_scoring(suite, sizes):
+    for n in sizes:
+        answers = harness.synthetic_answers(n, seed=n)
+        weights = [scoring.weight_vector(w) for w in harness.synthetic_weights(n, seed=n)]
+        suite.time("scoring.answer_matrix", lambda: scoring.answer_matrix(answers), size=n)
+        matrix = scoring.answer_matrix(answers)
+        suite.time("scoring.score", lambda: scoring.score(matrix, weights), size=n)
+    # What an assessment page does per click: one answer into the incremental store
+    store = ResponseStore(harness.synthetic_answers(1)[0].copy())
+    values = iter(range(10 ** 9))
+    suite.time("response_store.set (one answer)",
+               lambda: store.set(next(values) % len(store.answers), next(values) % 5 + 1), repeat=max(suite.repeat, 1000))
+    # Shared assessment with 20 raters: one changed answer, and the consensus every rater's page reads afterwards
+    shared = collaboration.SharedAssessment("bench")
+    for rater, row in enumerate(harness.synthetic_answers(20, seed=20)):
+        shared.submit(f"Rater {rater}", row)
+    answers = shared.answers("Rater 0")
+
+    def change_answer():
+        answers[next(values) % len(answers)] = next(values) % 5 + 1
+        shared.submit("Rater 0", answers)
+
+    suite.time("shared assessment submit (one answer, 20 raters)", change_answer, repeat=max(suite.repeat, 1000))
+    suite.time("shared assessment consensus (20 raters)", shared.consensus, setup=change_answer,
+               repeat=max(suite.repeat, 100))
+
+
+def bench_charts(suite, renders):
+    store = ResponseStore(harness.synthetic_answers(1)[0].copy())
+    weighted = scoring.apply_weights(store.dimension_scores(), scoring.weight_vector()).tolist()
+    suite.time("plotly radar figure (Results page)",
+               lambda: charts.interactive_radar_figure(list(scoring.DIMENSIONS), weighted, "Weighted Dimension Averages"))
+
+    breakdowns = reports.breakdown(store)
+    # Uncached: rasterization of all seven breakdown charts on new figures and on pooled ones updated in place
+    suite.time("matplotlib breakdown charts x7 (new figures)",
+               lambda: [charts.figure_png(charts.breakdown_figure(*info)) for info in breakdowns])
+    suite.time("matplotlib breakdown charts x7 (figure pool)",
+               lambda: [charts.breakdown_png(*info) for info in breakdowns], setup=charts.chart_cache.clear)
+    suite.time("matplotlib breakdown charts x7 (chart cache)",
+               lambda: [charts.breakdown_png(*info) for info in breakdowns])
+    suite.time("matplotlib radar chart (new figure)", lambda: charts.figure_png(charts.radar_figure(weighted)))
+    suite.time("matplotlib radar chart (figure pool)", lambda: charts.radar_png(weighted), setup=charts.chart_cache.clear)
+
+    # Memory of a long-lived process: many renderings (a cache that keeps nothing) must not grow the peak RSS
+    no_cache = charts.ChartCache(max_bytes=0)
+    before = reports.peak_rss_mb()
+    start = time.perf_counter()
+    for i in range(renders):
+        charts.breakdown_png(*breakdowns[i % len(breakdowns)], cache=no_cache)
+    suite.record("matplotlib renders (figure pool)", [(time.perf_counter() - start) / renders], size=renders,
+                 peak_rss_growth_mb=None if before is None else reports.peak_rss_mb() - before,
+                 pool=charts.breakdown_pool.stats())
+
+
+def bench_pdf(suite, sizes):
+    store = ResponseStore(harness.synthetic_answers(1)[0].copy())
+    weights = harness.synthetic_weights(1)[0]
+    suite.time("pdf report (cold chart cache)", lambda: reports.render_report(store, weights),
+               setup=charts.chart_cache.clear)
+    suite.time("pdf report (warm chart cache)", lambda: reports.render_report(store, weights))
+    # Layout of the report alone, with the charts already rendered: boilerplate line-broken again vs cached
+    detailed_info = reports.breakdown(store)
+    images = reports.chart_images(detailed_info)
+    radar = charts.radar_image([scoring.NEUTRAL] * len(scoring.DIMENSIONS), fmt=reports.CHART_FORMAT)
+    assemble = lambda: reports.pdf_bytes(reports.build_pdf(detailed_info, images, radar, scoring.NEUTRAL))
+    suite.time("pdf assembly (boilerplate line-broken)", assemble, setup=reports.LINE_BREAKS.clear)
+    suite.time("pdf assembly (boilerplate lines cached)", assemble)
+    # Size and build time per chart embedding (raster PNG, palette PNG, SVG vector graphics)
+    for fmt in charts.IMAGE_FORMATS:
+        pdf_bytes = len(reports.render_report(store, weights, fmt))
+        suite.time(f"pdf report, {fmt} charts (cold chart cache)", lambda: reports.render_report(store, weights, fmt),
+                   setup=charts.chart_cache.clear, pdf_bytes=pdf_bytes)
+        suite.time(f"pdf report, {fmt} charts (warm chart cache)", lambda: reports.render_report(store, weights, fmt),
+                   pdf_bytes=pdf_bytes)
+    # Batch export of a portfolio in worker processes (process start-up included)
+    for n in sizes:
+        answers = harness.synthetic_answers(n, seed=n)
+        assessments = [(f"Use case {i}", ResponseStore(row.copy()), w)
+                       for i, (row, w) in enumerate(zip(answers, harness.synthetic_weights(n, seed=n)))]
+        suite.time("batch pdf export (zip)", lambda: reports.batch_reports(assessments), size=n, repeat=1)
+
+
+def bench_pages(suite):
+    store = ResponseStore(harness.synthetic_answers(1)[0].copy())
+    weights = harness.synthetic_weights(1)[0]
+    for page in harness.page_names():
+        if page == "Portfolio":
+            continue
+        session = harness.MeasuredSession(page)
+        session.set_state(responses=ResponseStore(store.answers.copy()), dimension_weights=dict(weights))
+        first = session.run()
+        reruns = [session.run() for _ in range(suite.repeat)]
+        suite.record(f"page first run: {page}", [first.wall], messages=first.messages,
+                     payload_bytes=first.payload_bytes)
+        suite.record(f"page rerun: {page}", [rerun.wall for rerun in reruns],
+                     cpu=statistics.median(rerun.cpu for rerun in reruns),
+                     messages=reruns[-1].messages, payload_bytes=reruns[-1].payload_bytes)
+
+    # The export button on the Summary page: the click only queues a background job, the page polls until the
+    # report can be downloaded. Answers change between clicks so identical exports are not served from the queue.
+    session = harness.MeasuredSession("Summary & Export")
+    session.set_state(responses=ResponseStore(store.answers.copy()), dimension_weights=dict(weights))
+    session.run()
+    clicks, turnarounds = [], []
+    for i in range(suite.repeat):
+        session.app.session_state.responses.set(i % len(store.answers), i % 5 + 1)
+        start = time.perf_counter()
+        next(button for button in session.app.button if button.label == "Export Detailed Breakdown as PDF").click()
+        clicks.append(session.run())
+        while not any(button.label == "Download PDF Report" for button in session.app.get("download_button")):
+            time.sleep(0.05)
+            session.run()
+        turnarounds.append(time.perf_counter() - start)
+    suite.record("page click: Export Detailed Breakdown as PDF", [click.wall for click in clicks],
+                 payload_bytes=clicks[-1].payload_bytes)
+    suite.record("pdf export job (click to download)", turnarounds)
+
+
+def bench_portfolio_page(suite, sizes):
+    repository = storage.SQLiteRepository()
+    stored = 0
+    for n in sorted(sizes):
+        # Grow the saved portfolio to n assessments
+        answers = harness.synthetic_answers(n - stored, seed=n)
+        weights = harness.synthetic_weights(n - stored, seed=n)
+        repository.save_many((f"bench-{stored + i}", row, w, f"Use case {stored + i}")
+                             for i, (row, w) in enumerate(zip(answers, weights)))
+        stored = n
+        session = harness.MeasuredSession("Portfolio")
+        first = session.run()
+        reruns = [session.run() for _ in range(suite.repeat)]
+        suite.record("page rerun: Portfolio", [rerun.wall for rerun in reruns], size=n, first_run=first.wall,
+                     messages=reruns[-1].messages, payload_bytes=reruns[-1].payload_bytes)
+
+
+def bench_history(suite, revisions):
+    # One use case revised `revisions` times, one to three answers per save and new weights now and then
+    repository = storage.SQLiteRepository(os.path.join(tempfile.mkdtemp(prefix="iip-bench-"), "history.db"))
+    rng = np.random.default_rng(0)
+    store = ResponseStore(harness.synthetic_answers(1)[0].copy())
+    weights = harness.synthetic_weights(revisions // 100 + 1)
+    start = time.perf_counter()
+    for revision in range(revisions):
+        for question_id in rng.choice(len(store.answers), size=rng.integers(1, 4), replace=False):
+            store.set(int(question_id), (int(store.answers[question_id]) % 5) + 1)  # always a change
+        repository.save("history", store, weights[revision // 100])
+    suite.record("history: save one revision", [(time.perf_counter() - start) / revisions], size=revisions)
+    stored = repository._connection.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'revisions'").fetchone()[0]
+    numbers = iter(rng.integers(1, revisions + 1, size=10 ** 6).tolist())
+    suite.time("history: rebuild one revision", lambda: history.load(repository, "history", next(numbers)),
+               size=revisions, repeat=max(suite.repeat, 200), bytes_per_revision=stored / revisions)
+    suite.time("history: replay and score all revisions", lambda: history.timeline(repository, "history"),
+               size=revisions)
+
+
+def metadata():
+    import numpy
+    import streamlit
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=harness.ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(handle)["results"]}
+    print(f"\nCompared with {baseline_path} (median, new / old):")
+    for result in results:
+        old = baseline.get((result["benchmark"], result["size"]))
+        if old and old["median"]:
+            label = result["benchmark"] if result["size"] is None else f"{result['benchmark']} [n={result['size']}]"
+            size_note = (f"  size {result['pdf_bytes'] / old['pdf_bytes']:.2f}x"
+                         if result.get("pdf_bytes") and old.get("pdf_bytes") else "")
+            print(f"{label:<58}{result['median'] / old['median']:>10.2f}x{size_note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer portfolio sizes and repeats")
+    parser.add_argument("--repeat", type=int, help="repeats per benchmark (default 5, 3 with --quick)")
+    parser.add_argument("--only", nargs="+", choices=["scoring", "charts", "pdf", "pages", "portfolio", "history"],
+                        help="run only these groups")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    suite = Suite(repeat=args.repeat or (3 if args.quick else 5))
+    groups = set(args.only or ["scoring", "charts", "pdf", "pages", "portfolio", "history"])
+    if "scoring" in groups:
+        bench_scoring(suite, QUICK_SIZES if args.quick else SIZES)
+    if "charts" in groups:
+        bench_charts(suite, 200 if args.quick else 1000)
+    if "pdf" in groups:
+        bench_pdf(suite, (1, 10) if args.quick else (1, 10, 50))
+    if "pages" in groups:
+        bench_pages(suite)
+    if "portfolio" in groups:
+        bench_portfolio_page(suite, PORTFOLIO_SIZES[:2] if args.quick else PORTFOLIO_SIZES)
+    if "history" in groups:
+        bench_history(suite, 1000 if args.quick else 5000)
+
+    output = args.output or os.path.join(RESULTS, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump({"meta": metadata(), "results": suite.results}, handle, indent=2)
+    print(f"\nWrote {len(suite.results)} results to {output}")
+    if args.compare:
+        compare(suite.results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+import instrumentation
+import scoring
+
+# Everything that changes the look of a chart; part of the cache key so a style change never serves stale images
+STYLE = {"color": "darkblue", "dpi": 100, "breakdown_size": (6.4, 4.8), "radar_size": (6, 6)}
+
+# Image formats of a chart: "png" as shown on the pages, "compact" the same pixels as a palette PNG
+# (a few KB, for reports), "svg" vector graphics (sharp at any zoom, fpdf2 draws it as PDF paths)
+IMAGE_FORMATS = ("png", "compact", "svg")
+COMPACT_COLORS = 64  # flat charts with anti-aliased text need only a few dozen colors
+
+
+def _figure(size):
+    # Object-oriented Matplotlib (no pyplot), so figures are independent of any global state and no GUI
+    # backend is ever selected. Imported here: pages that never draw a Matplotlib chart never load it.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=size, dpi=STYLE["dpi"])
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _build_breakdown(n_bars):
+    # Horizontal bar chart with `n_bars` bars of width 0; the bars are at 0..n-1 and labelled by tick labels,
+    # which renders the same as categorical bars but lets another chart's names be set on the same axes
+    fig = _figure(STYLE["breakdown_size"])
+    ax = fig.subplots()
+    bars = ax.barh(np.arange(n_bars), np.zeros(n_bars), color=STYLE["color"])
+    ax.set_xlabel('Score')
+    ax.set_xlim(0, 5)
+    return fig, (ax, bars)
+
+
+def _update_breakdown(artists, dimension, sub_names, sub_scores):
+    ax, bars = artists
+    for bar, score in zip(bars, sub_scores):
+        bar.set_width(score)
+    ax.set_yticks(np.arange(len(bars)), labels=list(sub_names))
+    ax.set_title(f"Subdimension Scores for {dimension}")
+
+
+def _build_radar(dimensions):
+    fig = _figure(STYLE["radar_size"])
+    ax = fig.subplots(subplot_kw=dict(polar=True))
+    angles = np.linspace(0, 2 * np.pi, len(dimensions) + 1, endpoint=False)  # last point closes the loop
+    zeros = np.zeros(len(angles))
+    fill, = ax.fill(angles, zeros, color=STYLE["color"], alpha=0.25)
+    line, = ax.plot(angles, zeros, color=STYLE["color"], linewidth=2)
+    ax.set_yticks([1, 2, 3, 4, 5])
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(dimensions, fontsize=10)
+    ax.set_title("Weighted Dimension Averages")
+    return fig, (ax, angles, fill, line)
+
+
+def _update_radar(artists, weighted_values):
+    ax, angles, fill, line = artists
+    radar_values = np.append(np.asarray(weighted_values, dtype=float), weighted_values[0])
+    fill.set_xy(np.column_stack([angles, radar_values]))
+    line.set_ydata(radar_values)
+    # The radius is autoscaled to the data and then widened to show all ticks, as when the figure is built
+    ax.relim()
+    ax.autoscale_view()
+    ax.yaxis.set_view_interval(1, 5)
+
+
+class FigurePool:
+    """Pre-built figures of one chart type, reused for every rendering with their artists updated in place.
+
+    Figures are kept per layout (the number of bars, the radar's dimensions) and lent to one caller at a
+    time. A figure always comes back: to the pool, or, beyond `max_idle` per layout or when the rendering
+    failed half-way, cleared and dropped. Memory is bounded by the layouts in use, not by the renderings.
+    """
+
+    def __init__(self, build, update, max_idle=2):
+        self.build = build  # layout -> (figure, artists)
+        self.update = update  # (artists, *data) -> None
+        self.max_idle = max_idle
+        self._idle = {}  # layout -> [(figure, artists)]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+
+    @contextmanager
+    def figure(self, layout, *data):
+        with self._lock:
+            idle = self._idle.get(layout)
+            entry = idle.pop() if idle else None
+            if entry is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if entry is None:
+            entry = self.build(layout)
+        returned = False
+        try:
+            self.update(entry[1], *data)
+            yield entry[0]
+            with self._lock:
+                idle = self._idle.setdefault(layout, [])
+                if len(idle) < self.max_idle:
+                    idle.append(entry)
+                    returned = True
+        finally:
+            if not returned:
+                self._release(entry[0])
+
+    def _release(self, fig):
+        # Without pyplot nothing else refers to the figure, but figure, canvas and artists refer to each
+        # other; clearing breaks those cycles so the memory is freed now rather than at the next GC pass
+        fig.clear()
+        with self._lock:
+            self.released += 1
+
+    def clear(self):
+        with self._lock:
+            entries = [entry for idle in self._idle.values() for entry in idle]
+            self._idle.clear()
+        for fig, _ in entries:
+            self._release(fig)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": sum(len(idle) for idle in self._idle.values()), "layouts": len(self._idle),
+                    "created": self.created, "reused": self.reused, "released": self.released}
+
+
+# One pool per chart type and process, shared by every Streamlit session and report
+breakdown_pool = FigurePool(_build_breakdown, _update_breakdown)
+radar_pool = FigurePool(_build_radar, _update_radar)
+
+
+def breakdown_figure(dimension, sub_names, sub_scores):
+    # A new figure owned by the caller; renderings go through breakdown_pool instead
+    fig, artists = _build_breakdown(len(sub_names))
+    _update_breakdown(artists, dimension, sub_names, sub_scores)
+    return fig
+
+
+def radar_figure(weighted_values, dimensions=scoring.DIMENSIONS):
+    fig, artists = _build_radar(tuple(dimensions))
+    _update_radar(artists, weighted_values)
+    return fig
+
+
+def interactive_radar_figure(categories, values, title="Radar Chart"):
+    # Plotly radar of the Results page; the first point is repeated to close the loop
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=list(values) + list(values[:1]),
+        theta=list(categories) + list(categories[:1]),
+        fill='toself',
+        name='Assessment Score',
+        line=dict(color='blue')
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 5],
+                tickfont=dict(color='darkred')  # Change the color of the numbers to make them more visible
+            )
+        ),
+        showlegend=False,
+        title=title
+    )
+    return fig
+
+
+def consensus_radar_figure(categories, consensus, lowest, highest, title="Consensus of All Raters"):
+    # Plotly radar of a shared assessment: the consensus, and the lowest and highest rater score per dimension
+    import plotly.graph_objects as go
+
+    theta = list(categories) + list(categories[:1])
+    fig = go.Figure()
+    for values, name, line in ((highest, 'Highest rater', dict(color='gray', dash='dot')),
+                               (lowest, 'Lowest rater', dict(color='gray', dash='dash'))):
+        fig.add_trace(go.Scatterpolar(r=list(values) + list(values[:1]), theta=theta, name=name, line=line))
+    fig.add_trace(go.Scatterpolar(r=list(consensus) + list(consensus[:1]), theta=theta, fill='toself',
+                                  name='Consensus', line=dict(color='blue')))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickfont=dict(color='darkred'))),
+        title=title
+    )
+    return fig
+
+
+def figure_png(fig):
+    # Rasterize a figure straight into memory, no temporary file involved
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def compact_png(png, colors=COMPACT_COLORS):
+    # Quantize a rendered chart to a palette PNG; needs no new Matplotlib rendering
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(png)).convert("RGB").quantize(colors, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def figure_svg(fig):
+    # Text stays text instead of one path per glyph: a tenth of the size, and fpdf2 sets it in a PDF core
+    # font, so no font is embedded. fpdf2 does not clip to the figure, so the bounding box is tightened
+    # around everything drawn (long tick labels included). <metadata> is dropped, fpdf2 does not support it.
+    from matplotlib import rc_context
+
+    buffer = io.BytesIO()
+    with rc_context({"svg.fonttype": "none"}):
+        fig.savefig(buffer, format="svg", bbox_inches="tight", metadata={"Date": None})
+    return re.sub(rb"<metadata>.*?</metadata>", b"", buffer.getvalue(), flags=re.S)
+
+
+class ChartCache:
+    """Thread-safe LRU cache of rendered chart images (bytes), bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(*parts):
+        # Content address: hash of everything that determines the rendered image
+        payload = json.dumps([parts, STYLE], default=float, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = png
+            self.size += len(png)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        png = self.get(key)
+        if png is None:
+            instrumentation.count("chart_cache_miss")
+            # Rendering happens outside the lock; two sessions racing on the same chart both render once
+            with instrumentation.stage("matplotlib_render"):
+                png = render()
+            self.put(key, png)
+        else:
+            instrumentation.count("chart_cache_hit")
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# One cache per process, shared by every Streamlit session; the cap can be set with IIP_CHART_CACHE_MB
+chart_cache = ChartCache(max_bytes=int(float(os.environ.get("IIP_CHART_CACHE_MB", 64)) * 1024 * 1024))
+
+
+def _render(pool, layout, data, png, fmt):
+    # Image bytes of a chart in `fmt`, drawn on a pooled figure; "compact" is derived from the (cached) PNG
+    if fmt == "compact":
+        return compact_png(png())
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format {fmt!r}, expected one of {', '.join(IMAGE_FORMATS)}")
+    with pool.figure(layout, *data) as fig:
+        return figure_png(fig) if fmt == "png" else figure_svg(fig)
+
+
+def breakdown_image(dimension, sub_names, sub_scores, fmt="png", cache=chart_cache):
+    key = cache.key("breakdown", fmt, dimension, list(sub_names), list(sub_scores))
+    return cache.get_or_render(key, lambda: _render(breakdown_pool, len(sub_names), (dimension, sub_names, sub_scores),
+                                                    lambda: breakdown_png(dimension, sub_names, sub_scores, cache), fmt))
+
+
+def radar_image(weighted_values, dimensions=scoring.DIMENSIONS, fmt="png", cache=chart_cache):
+    key = cache.key("radar", fmt, list(dimensions), list(weighted_values))
+    return cache.get_or_render(key, lambda: _render(radar_pool, tuple(dimensions), (weighted_values,),
+                                                    lambda: radar_png(weighted_values, dimensions, cache), fmt))
+
+
+def breakdown_png(dimension, sub_names, sub_scores, cache=chart_cache):
+    return breakdown_image(dimension, sub_names, sub_scores, "png", cache)
+
+
+def radar_png(weighted_values, dimensions=scoring.DIMENSIONS, cache=chart_cache):
+    return radar_image(weighted_values, dimensions, "png", cache)
+
+
+def warm_up():
+    """Pay the one-time costs of a fresh server process before the first user does.
+
+    Imports Matplotlib, loads its font cache and the Agg text rendering path, and builds the pooled
+    figures of every chart layout of the question bank by drawing each once; also loads the default
+    Plotly template. Nothing is put in the chart cache.
+    """
+    index = scoring.DEFAULT_INDEX
+    for n_bars in np.unique(np.bincount(index.question_dimension, minlength=index.n_dimensions)):
+        with breakdown_pool.figure(int(n_bars), "Warm-up", ["Warm-up"] * n_bars, [scoring.NEUTRAL] * n_bars) as fig:
+            figure_png(fig)
+    with radar_pool.figure(tuple(scoring.DIMENSIONS), [scoring.NEUTRAL] * len(scoring.DIMENSIONS)) as fig:
+        figure_png(fig)
+    import plotly.io as pio
+
+    pio.templates[pio.templates.default]
+    interactive_radar_figure(scoring.DIMENSIONS, [scoring.NEUTRAL] * len(scoring.DIMENSIONS)).to_plotly_json()
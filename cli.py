@@ -0,0 +1,308 @@
+"""Batch scoring and PDF reports without starting Streamlit, e.g. nightly from cron.
+
+    python cli.py INPUT... [--db [PATH]] [--profile NAME ...] [--profiles FILE] [--output scores.csv]
+                  [--reports DIR] [--workers N]
+
+INPUT is an assessment file (the JSON saved on the Summary page, or a CSV/Excel file in the
+format of the Import page) or a directory searched for such files; --db adds the saved
+assessments of the app. Every assessment is scored once per weight profile: "own" keeps the
+weights saved with the assessment, "equal" weighs every dimension 1.0, and --profiles adds
+named profiles from a JSON file ({"name": {"Dimension": weight, ...}, ...}).
+
+Files are parsed and reports rendered in a pool of worker processes; scoring itself runs as one
+vectorized batch per chunk in the main process. Progress and throughput go to stderr. The exit
+status is 1 when some files or rows were rejected (they are listed on stderr), 0 otherwise.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import export
+import scoring
+
+INPUT_EXTENSIONS = (".json", ".csv", ".xlsx", ".xlsm")
+BUILTIN_PROFILES = {"own": None, "equal": {}}  # None keeps every assessment's own weights
+FILES_PER_JOB = 200  # JSON files parsed per worker job
+CHUNK_SIZE = 5000  # assessments scored and written per batch
+
+
+class Progress:
+    """Count of finished items with throughput on stderr, redrawn at most a few times per second."""
+
+    def __init__(self, label, total, stream=sys.stderr, interval=0.25):
+        self.label = label
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.start = self._shown = time.perf_counter()
+        self._live = stream.isatty()
+
+    def update(self, amount=1):
+        self.done += amount
+        now = time.perf_counter()
+        if self._live and now - self._shown >= self.interval:
+            self._shown = now
+            self.stream.write(f"\r{self._line(now)}")
+            self.stream.flush()
+
+    def close(self):
+        self.stream.write(("\r" if self._live else "") + self._line(time.perf_counter()) + "\n")
+        self.stream.flush()
+
+    def _line(self, now):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        return f"{self.label}: {self.done}/{self.total} in {elapsed:.1f}s ({rate:,.1f}/s)"
+
+
+def load_profiles(path=None, index=scoring.DEFAULT_INDEX):
+    # Built-in profiles plus the ones in `path`; raises ValueError for malformed profiles, unknown dimensions or
+    # weights out of range. A profile is {dimension: weight} or null (every assessment keeps its own weights)
+    profiles = dict(BUILTIN_PROFILES)
+    if path is None:
+        return profiles
+    with open(path, encoding="utf-8") as handle:
+        document = json.load(handle)
+    if not isinstance(document, dict):
+        raise ValueError("The profiles file must be an object of profile name: weights")
+    low, high = scoring.WEIGHT_RANGE
+    for name, weights in document.items():
+        if weights is None:
+            profiles[name] = None
+            continue
+        if not isinstance(weights, dict):
+            raise ValueError(f"Profile {name!r}: expected an object of dimension: weight or null")
+        unknown = set(weights) - set(index.dimensions)
+        if unknown:
+            raise ValueError(f"Profile {name!r}: unknown dimension(s) {', '.join(sorted(unknown))}")
+        for dimension, weight in weights.items():
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not low <= weight <= high:
+                raise ValueError(f"Profile {name!r}: weight of {dimension} must be a number between {low} and {high}")
+        profiles[name] = {dimension: float(weight) for dimension, weight in weights.items()}
+    return profiles
+
+
+def find_inputs(paths):
+    # Files as given, directories searched recursively for assessment files, in a stable order
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files += sorted(os.path.join(root, name) for name in names if name.lower().endswith(INPUT_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def _load_files(paths):
+    """Worker job: parse assessment files into (ids, names, answers, weights, problems, notes).
+
+    JSON files hold one assessment each (id = file path, name = file name); CSV/Excel files hold
+    many and are validated with importer. `problems` lists rejected files and rows as (file, message),
+    `notes` the importer's warnings that did not reject anything.
+    """
+    import importer
+    import reports
+
+    ids, names, rows, weights, problems, notes = [], [], [], [], [], []
+    for path in paths:
+        try:
+            if path.lower().endswith(".json"):
+                with open(path, "rb") as handle:
+                    responses, dimension_weights = reports.load_assessment(handle.read())
+                ids.append(path)
+                names.append(os.path.splitext(os.path.basename(path))[0])
+                rows.append(responses.answers)
+                weights.append(dimension_weights)
+                continue
+            with open(path, "rb") as handle:
+                result = importer.validate(importer.read_table(handle.read(), path))
+        except (OSError, ValueError, KeyError, UnicodeDecodeError) as error:
+            problems.append((path, str(error) or type(error).__name__))
+            continue
+        notes += [(path, message) for message in result.warnings]
+        problems += [(path, f"row {row} {column}: {message}".replace("  ", " "))
+                     for row, column, _, message in result.errors.itertuples(index=False)]
+        ids += result.ids
+        names += [name or assessment_id for name, assessment_id in zip(result.names, result.ids)]
+        rows += list(result.answers)
+        weights += result.weights
+    return ids, names, rows, weights, problems, notes
+
+
+def _write_report(job):
+    # Worker job: render one PDF report straight to disk
+    import reports
+    from response_store import ResponseStore
+
+    path, answers, dimension_weights, chart_format = job
+    with open(path, "wb") as handle:
+        handle.write(reports.render_report(ResponseStore(answers), dimension_weights, chart_format))
+    return path
+
+
+def _jobs(files):
+    # One job per table file, JSON files in groups, so small files do not pay one round trip each
+    json_files = [path for path in files if path.lower().endswith(".json")]
+    jobs = [[path] for path in files if not path.lower().endswith(".json")]
+    return jobs + [json_files[start:start + FILES_PER_JOB] for start in range(0, len(json_files), FILES_PER_JOB)]
+
+
+def load_inputs(files, pool, db_path=None):
+    ids, names, rows, weights, problems = [], [], [], [], []
+    if db_path:
+        import storage
+
+        repository = storage.SQLiteRepository(db_path)
+        for chunk_ids, chunk_names, chunk_answers, chunk_weights in repository.iter_chunks(CHUNK_SIZE):
+            ids += chunk_ids
+            names += [name or assessment_id for name, assessment_id in zip(chunk_names, chunk_ids)]
+            rows += list(chunk_answers)
+            weights += chunk_weights
+        repository.close()
+
+    jobs = _jobs(files)
+    progress = Progress("Loading files", len(files))
+    results = pool.map(_load_files, jobs) if pool else map(_load_files, jobs)
+    for job, (job_ids, job_names, job_rows, job_weights, job_problems, job_notes) in zip(jobs, results):
+        for path, message in job_notes:
+            print(f"{path}: warning: {message}", file=sys.stderr)
+        ids += job_ids
+        names += job_names
+        rows += job_rows
+        weights += job_weights
+        problems += job_problems
+        progress.update(len(job))
+    if files:
+        progress.close()
+    answers = np.stack(rows) if rows else np.zeros((0, scoring.DEFAULT_INDEX.n_questions), dtype=np.int8)
+    return ids, names, answers, weights, problems
+
+
+def profile_path(path, profile, several):
+    # scores.csv -> scores-<profile>.csv when several profiles are written
+    if not several:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f"{stem}-{profile}{extension}"
+
+
+def _safe_name(name):
+    return re.sub(r"[^\w.\- ]+", "_", name).strip() or "assessment"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="assessment files or directories")
+    parser.add_argument("--db", nargs="?", const="", metavar="PATH",
+                        help="also score the saved assessments (default: the app's database)")
+    parser.add_argument("--profile", action="append", dest="profiles_used", metavar="NAME",
+                        help="weight profile to score with, repeatable (default: own)")
+    parser.add_argument("--profiles", metavar="FILE", help="JSON file with named weight profiles")
+    parser.add_argument("--list-profiles", action="store_true", help="print the available profiles and exit")
+    parser.add_argument("--output", default="-",
+                        help="scores file, .csv, .jsonl or .parquet (default: CSV on stdout)")
+    parser.add_argument("--format", choices=list(export.FORMATS), help="scores format if not given by --output")
+    parser.add_argument("--reports", metavar="DIR", help="also write one PDF report per assessment and profile")
+    parser.add_argument("--charts", choices=("png", "compact", "svg"),
+                        help="how charts are embedded in reports (default: compact, or IIP_REPORT_CHARTS)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for parsing and reports; 1 runs everything in this process")
+    args = parser.parse_args(argv)
+
+    try:
+        profiles = load_profiles(args.profiles)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.list_profiles:
+        for name, weights in profiles.items():
+            print(f"{name}: " + ("weights saved with each assessment" if weights is None else
+                                 ", ".join(f"{dimension}={weight}" for dimension, weight in weights.items())
+                                 or "every dimension 1.0"))
+        return 0
+    selected = args.profiles_used or ["own"]
+    unknown = [name for name in selected if name not in profiles]
+    if unknown:
+        parser.error(f"unknown profile(s) {', '.join(unknown)}; available: {', '.join(profiles)}")
+    if not args.inputs and args.db is None:
+        parser.error("give at least one input file or directory, or --db")
+    fmt = args.format or next((name for name, (_, extension) in export.FORMATS.items()
+                               if args.output.lower().endswith(extension)), "csv")
+    if args.output == "-" and (fmt == "parquet" or len(selected) > 1):
+        parser.error("write Parquet or several profiles to files with --output")
+
+    start = time.perf_counter()
+    files = find_inputs(args.inputs)
+    db_path = None
+    if args.db is not None:
+        import storage
+
+        db_path = args.db or storage.DEFAULT_DB_PATH
+        if not os.path.exists(db_path):
+            parser.error(f"no database at {db_path}")
+    # Spawned workers import only what the jobs need, and behave the same on every platform
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) \
+        if args.workers > 1 else None
+    try:
+        ids, names, answers, weights, problems = load_inputs(files, pool, db_path)
+        for path, message in problems:
+            print(f"{path}: {message}", file=sys.stderr)
+
+        report_jobs = []
+        for profile in selected:
+            profile_weights = weights if profiles[profile] is None else [profiles[profile]] * len(ids)
+            chunks = ((ids[i:i + CHUNK_SIZE], names[i:i + CHUNK_SIZE], answers[i:i + CHUNK_SIZE],
+                       profile_weights[i:i + CHUNK_SIZE]) for i in range(0, len(ids), CHUNK_SIZE))
+            scoring_start = time.perf_counter()
+            if args.output == "-":
+                rows = export.write(chunks, fmt, sys.stdout.buffer)
+                sys.stdout.flush()
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+                with open(profile_path(args.output, profile, len(selected) > 1), "wb") as handle:
+                    rows = export.write(chunks, fmt, handle)
+            elapsed = time.perf_counter() - scoring_start
+            print(f"Scored {rows} assessments with profile {profile!r} in {elapsed:.2f}s "
+                  f"({rows / elapsed if elapsed else 0:,.0f}/s)", file=sys.stderr)
+            if args.reports:
+                suffix = f"-{profile}" if len(selected) > 1 else ""
+                report_jobs += [(f"{_safe_name(name)}{suffix}", answers[i], profile_weights[i])
+                                for i, name in enumerate(names)]
+
+        if report_jobs:
+            os.makedirs(args.reports, exist_ok=True)
+            # Keep every report when several assessments share a name
+            taken = set()
+            jobs = []
+            for name, row, dimension_weights in report_jobs:
+                filename, n = f"{name}.pdf", 1
+                while filename in taken:
+                    n += 1
+                    filename = f"{name} ({n}).pdf"
+                taken.add(filename)
+                jobs.append((os.path.join(args.reports, filename), row, dimension_weights, args.charts))
+            progress = Progress("Rendering reports", len(jobs))
+            for _ in (pool.map(_write_report, jobs, chunksize=4) if pool else map(_write_report, jobs)):
+                progress.update()
+            progress.close()
+    finally:
+        if pool:
+            # Drop queued jobs when interrupted instead of letting the workers finish the whole batch
+            pool.shutdown(cancel_futures=True)
+
+    print(f"Done in {time.perf_counter() - start:.1f}s: {len(ids)} assessments from {len(files)} file(s)"
+          + (" and the database" if db_path else "") + (f", {len(problems)} problem(s)" if problems else ""),
+          file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+
+import scoring
+from response_store import UNANSWERED
+
+
+class Consensus:
+    """Aggregates of a shared assessment at one version; immutable, shared by every session reading it.
+
+    Per question id: number of raters who answered, mean and (population) variance of their answers and the
+    share of rater pairs that gave the same answer. Questions nobody answered have NaN statistics and count
+    as neutral in the consensus scores, as in a single assessment. Unanswered questions of a rater are left
+    out of the question statistics but count as neutral in that rater's own scores.
+    """
+
+    def __init__(self, version, raters, answers, counts, sums, squares, histogram, index=scoring.DEFAULT_INDEX):
+        self.version = version
+        self.raters = raters  # rater names in the order they joined
+        self.counts = counts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.means = sums / counts
+            self.variances = np.maximum(squares / counts - self.means ** 2, 0)
+            # Observed agreement of a question: agreeing rater pairs / all rater pairs (Fleiss)
+            pairs = counts * (counts - 1.0)
+            self.agreement = (histogram * (histogram - 1.0)).sum(axis=1) / pairs
+        # Fleiss' kappa over the questions answered by at least two raters: agreement beyond chance
+        rated = pairs > 0
+        self.kappa = float("nan")
+        if rated.any():
+            category_shares = histogram[rated].sum(axis=0) / counts[rated].sum()
+            expected = float((category_shares ** 2).sum())
+            observed = float(self.agreement[rated].mean())
+            self.kappa = 1.0 if expected == 1 else (observed - expected) / (1 - expected)
+
+        row = np.where(counts > 0, self.means, scoring.NEUTRAL)[index.ordered_ids]
+        self.scores = scoring.score(row[np.newaxis], index=index)  # of the mean answers
+        self.rater_scores = scoring.score(scoring.answer_matrix(answers.reshape(-1, index.n_questions), index), index=index)
+        self.index = index
+
+    def __len__(self):
+        return len(self.raters)
+
+    def stds(self):
+        return np.sqrt(self.variances)
+
+    def dimension_scores(self):
+        return self.scores.dimension_means[0]
+
+    def weighted(self, weights):
+        # (weighted consensus scores, readiness, weighted scores of every rater) under the given weight vector
+        weighted = scoring.apply_weights(self.dimension_scores(), weights)
+        return weighted, float(scoring.readiness_scores(weighted, weights)), scoring.apply_weights(
+            self.rater_scores.dimension_means, weights)
+
+    def dimension_spread(self):
+        # (lowest, highest, standard deviation) of the raters' unweighted dimension scores
+        scores = self.rater_scores.dimension_means
+        if not len(scores):
+            nan = np.full(self.index.n_dimensions, np.nan)
+            return nan, nan, nan
+        return scores.min(axis=0), scores.max(axis=0), scores.std(axis=0)
+
+
+class SharedAssessment:
+    """One use case rated by several people, each with their own answers.
+
+    Every submission updates per-question counts, sums, sums of squares and answer histograms for
+    the questions whose answer changed only, under a lock. Each change stamps a new `version`; the
+    Consensus derived from the statistics is built once per version, however many sessions read it.
+    """
+
+    def __init__(self, shared_id, index=scoring.DEFAULT_INDEX):
+        self.shared_id = shared_id
+        self.index = index
+        n_questions = index.n_questions
+        self._answers = {}  # rater -> int8 answers by question id
+        self._counts = np.zeros(n_questions, dtype=np.int64)
+        self._sums = np.zeros(n_questions, dtype=np.int64)
+        self._squares = np.zeros(n_questions, dtype=np.int64)
+        self._histogram = np.zeros((n_questions, scoring.MAX_SCORE), dtype=np.int64)  # column v - 1 counts answer v
+        self._lock = threading.Lock()
+        self._consensus = None
+        self.version = 0
+
+    def submit(self, rater, answers):
+        # Replace the answers of `rater` (a new rater joins on first submission); returns the new version
+        answers = np.asarray(answers, dtype=np.int8)
+        with self._lock:
+            previous = self._answers.get(rater)
+            if previous is None:
+                previous = np.zeros_like(answers)
+            elif np.array_equal(previous, answers):
+                return self.version
+            changed = np.flatnonzero(previous != answers)
+            self._apply(changed, previous[changed], -1)
+            self._apply(changed, answers[changed], 1)
+            self._answers[rater] = answers.copy()
+            self.version += 1
+            return self.version
+
+    def _apply(self, question_ids, values, sign):
+        # Add (sign 1) or remove (sign -1) one answer per question; the ids are unique, so plain fancy indexing
+        answered = values != UNANSWERED
+        question_ids, values = question_ids[answered], values[answered].astype(np.int64)
+        self._counts[question_ids] += sign
+        self._sums[question_ids] += sign * values
+        self._squares[question_ids] += sign * values ** 2
+        self._histogram[question_ids, values - 1] += sign
+
+    def answers(self, rater):
+        with self._lock:
+            answers = self._answers.get(rater)
+            return None if answers is None else answers.copy()
+
+    def consensus(self):
+        with self._lock:
+            if self._consensus is None or self._consensus.version != self.version:
+                raters = list(self._answers)
+                answers = np.array([self._answers[rater] for rater in raters], dtype=np.int8)
+                self._consensus = Consensus(self.version, raters, answers, self._counts.copy(), self._sums.copy(),
+                                            self._squares.copy(), self._histogram.copy(), self.index)
+            return self._consensus
+
+
+class SharedAssessments:
+    """Process-wide registry of shared assessments, loaded from storage on first use.
+
+    Each rater's answers are saved as an ordinary assessment (and can be resumed like one);
+    storage only records which assessment belongs to which rater of which shared assessment.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._assessments = {}
+        self._lock = threading.Lock()
+
+    def get(self, shared_id):
+        with self._lock:
+            shared = self._assessments.get(shared_id)
+            if shared is None:
+                shared = SharedAssessment(shared_id)
+                for rater, assessment_id in self.storage.raters(shared_id):
+                    loaded = self.storage.load(assessment_id)
+                    if loaded is not None:
+                        shared.submit(rater, loaded[0].answers)
+                self._assessments[shared_id] = shared
+            return shared
+
+    def join(self, shared_id, rater, assessment_id):
+        # (SharedAssessment, id of the rater's assessment); a rater who joined before gets their earlier assessment back
+        assessment_id = self.storage.add_rater(shared_id, rater, assessment_id)
+        return self.get(shared_id), assessment_id
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import tempfile
+
+import numpy as np
+
+import scoring
+from response_store import UNANSWERED
+
+# format -> (MIME type, file extension)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# Exports are assembled in memory up to this size, then spill to a temporary file
+SPOOL_BYTES = 16 * 1024 * 1024
+
+
+def columns(index=scoring.DEFAULT_INDEX):
+    """Column names of an export, with dimensions and questions in the order of all_dimensions.
+
+    assessment_id, name, readiness, then per dimension its weight, score and weighted score,
+    then one column per subdimension score and one per raw answer (empty while unanswered).
+    """
+    names = ["assessment_id", "name", "readiness"]
+    names += [f"weight:{dimension}" for dimension in index.dimensions]
+    names += [f"dimension:{dimension}" for dimension in index.dimensions]
+    names += [f"weighted:{dimension}" for dimension in index.dimensions]
+    names += [f"subdimension:{dimension}/{subdimension}" for dimension, subdimension in index.subdimensions]
+    names += [f"q{question_id}" for question_id in index.ordered_ids]
+    return names
+
+
+def session_chunks(assessment_id, responses, dimension_weights=None, name=None):
+    # The assessment of the current session (st.session_state.responses) as a single chunk
+    yield [assessment_id], [name], responses.answers[None, :], [dimension_weights]
+
+
+def chunk_columns(chunk, index=scoring.DEFAULT_INDEX):
+    """Score one chunk of assessments in a single batch and return its export columns.
+
+    `chunk` is (ids, names, answers (N x questions int8), [dimension_weights]) as yielded by
+    AssessmentRepository.iter_chunks. Scores are float arrays; answers are int8 with 0 for unanswered.
+    """
+    ids, names, answers, dimension_weights = chunk
+    answers = np.asarray(answers)
+    weights = np.array([scoring.weight_vector(w, index) for w in dimension_weights]).reshape(-1, index.n_dimensions)
+    scores = scoring.score(scoring.answer_matrix(answers, index), weights, index)
+    return {
+        "assessment_id": list(ids),
+        "name": [name or "" for name in names],
+        "readiness": scores.readiness,
+        "weights": weights,
+        "dimensions": scores.dimension_means,
+        "weighted": scores.weighted,
+        "subdimensions": scores.subdimension_means,
+        "answers": answers[:, index.ordered_ids],
+    }
+
+
+def _numeric_blocks(table):
+    return [table["readiness"][:, None], table["weights"], table["dimensions"], table["weighted"],
+            table["subdimensions"]]
+
+
+def _rows(table):
+    # Row tuples of a chunk; unanswered questions become None
+    numbers = np.hstack(_numeric_blocks(table)).tolist()
+    answers = table["answers"].astype(object)
+    answers[table["answers"] == UNANSWERED] = None
+    for assessment_id, name, values, row_answers in zip(table["assessment_id"], table["name"], numbers,
+                                                         answers.tolist()):
+        yield [assessment_id, name] + values + row_answers
+
+
+def write_csv(chunks, handle, index=scoring.DEFAULT_INDEX):
+    writer = csv.writer(handle)
+    writer.writerow(columns(index))
+    rows = 0
+    for chunk in chunks:
+        table = chunk_columns(chunk, index)
+        writer.writerows(["" if value is None else value for value in row] for row in _rows(table))
+        rows += len(table["assessment_id"])
+    return rows
+
+
+def write_jsonl(chunks, handle, index=scoring.DEFAULT_INDEX):
+    names = columns(index)
+    rows = 0
+    for chunk in chunks:
+        table = chunk_columns(chunk, index)
+        handle.writelines(json.dumps(dict(zip(names, row))) + "\n" for row in _rows(table))
+        rows += len(table["assessment_id"])
+    return rows
+
+
+def write_parquet(chunks, handle, index=scoring.DEFAULT_INDEX):
+    # pyarrow ships with Streamlit; every chunk becomes one row group, so memory stays bounded by the chunk size
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = columns(index)
+    n_numbers = len(names) - 2 - index.n_questions
+    schema = pa.schema([("assessment_id", pa.string()), ("name", pa.string())]
+                       + [(name, pa.float64()) for name in names[2:2 + n_numbers]]
+                       + [(name, pa.int8()) for name in names[2 + n_numbers:]])
+    rows = 0
+    with pq.ParquetWriter(handle, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            table = chunk_columns(chunk, index)
+            numbers = np.hstack(_numeric_blocks(table))
+            answers = table["answers"]
+            arrays = [pa.array(table["assessment_id"], pa.string()), pa.array(table["name"], pa.string())]
+            arrays += [pa.array(numbers[:, column]) for column in range(numbers.shape[1])]
+            arrays += [pa.array(answers[:, column], pa.int8(), mask=answers[:, column] == UNANSWERED)
+                       for column in range(answers.shape[1])]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(table["assessment_id"])
+    return rows
+
+
+def write(chunks, fmt, handle, index=scoring.DEFAULT_INDEX):
+    """Stream `chunks` into the binary file object `handle` in `fmt`; returns the number of rows written."""
+    if fmt == "parquet":
+        return write_parquet(chunks, handle, index)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+    try:
+        return (write_csv if fmt == "csv" else write_jsonl)(chunks, text, index)
+    finally:
+        # Hand the binary handle back to the caller open
+        text.flush()
+        text.detach()
+
+
+def export_file(chunks, fmt, index=scoring.DEFAULT_INDEX):
+    # Export into a spooled temporary file (in memory up to SPOOL_BYTES) and return it rewound, e.g. for st.download_button
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    write(chunks, fmt, spool, index)
+    spool.seek(0)
+    return spool
@@ -0,0 +1,152 @@
+import json
+
+import numpy as np
+
+import scoring
+from response_store import UNANSWERED
+
+# Every CHECKPOINT_EVERY-th revision (1, 33, 65, ...) stores the full answers; the others only what changed,
+# so a version is rebuilt from at most CHECKPOINT_EVERY - 1 deltas after the checkpoint before it
+CHECKPOINT_EVERY = 32
+
+# One changed answer of a delta: question id and new answer (0 = unanswered again), 3 bytes
+CHANGE = np.dtype([("question", "<u2"), ("answer", "i1")])
+
+
+def is_checkpoint(revision):
+    return (revision - 1) % CHECKPOINT_EVERY == 0
+
+
+def encode(revision, answers, weights, previous_answers=None, previous_weights=None):
+    """(checkpoint, changes, weights) of a revision as stored by the repository.
+
+    `answers` are int8 bytes and `weights` the JSON text of the dimension weights, as in the
+    assessments table. A checkpoint keeps both in full; a delta keeps the changed answers as
+    CHANGE records and the weights only if they changed (None otherwise).
+    """
+    if is_checkpoint(revision) or previous_answers is None:
+        return True, answers, weights
+    old = np.frombuffer(previous_answers, dtype=np.int8)
+    new = np.frombuffer(answers, dtype=np.int8)
+    changed = np.flatnonzero(old != new)
+    changes = np.empty(len(changed), dtype=CHANGE)
+    changes["question"] = changed
+    changes["answer"] = new[changed]
+    return False, changes.tobytes(), None if weights == previous_weights else weights
+
+
+class Revision:
+    """State of an assessment at one saved revision."""
+
+    def __init__(self, revision, created_at, answers, weights, changed):
+        self.revision = revision
+        self.created_at = created_at  # Unix time of the save
+        self.answers = answers  # int8 by question id, 0 = unanswered
+        self.weights = weights  # {dimension: weight} or None
+        self.changed = changed  # answers changed by this revision (all answered ones for a checkpoint)
+
+
+def replay(rows):
+    """Rebuild the revisions of `rows` in order; the first row must be a checkpoint.
+
+    Rows are (revision, created_at, checkpoint, changes, weights) as returned by the repository.
+    Each delta costs only its own changes: the answers are updated in place and copied per revision.
+    """
+    answers, weights = None, None
+    for revision, created_at, checkpoint, changes, weights_json in rows:
+        if checkpoint:
+            previous = answers
+            answers = np.frombuffer(changes, dtype=np.int8).copy()
+            changed = int(np.count_nonzero(answers != (UNANSWERED if previous is None else previous)))
+        else:
+            if answers is None:
+                raise ValueError(f"Revision {revision} is a delta without a checkpoint before it")
+            delta = np.frombuffer(changes, dtype=CHANGE)
+            answers[delta["question"]] = delta["answer"]
+            changed = len(delta)
+        if weights_json is not None:
+            weights = json.loads(weights_json) or None
+        yield Revision(revision, created_at, answers.copy(), weights, changed)
+
+
+def load(repository, assessment_id, revision=None):
+    # One revision (the latest if None), rebuilt from the checkpoint before it; None if there is no such revision
+    checkpoint = repository.latest_checkpoint(assessment_id, revision)
+    if not checkpoint:
+        return None
+    state = None
+    for state in replay(repository.revisions(assessment_id, checkpoint, revision)):
+        pass
+    return state if state is not None and (revision is None or state.revision == revision) else None
+
+
+def timeline(repository, assessment_id, index=scoring.DEFAULT_INDEX):
+    """All revisions of an assessment with their scores, in one pass over the stored deltas.
+
+    Returns (revisions, Scores) with one scores row per revision.
+    """
+    revisions = list(replay(repository.revisions(assessment_id)))
+    answers = np.array([revision.answers for revision in revisions], dtype=np.int8).reshape(-1, index.n_questions)
+    weights = np.array([scoring.weight_vector(revision.weights, index) for revision in revisions]).reshape(
+        -1, index.n_dimensions)
+    return revisions, scoring.score(scoring.answer_matrix(answers, index), weights, index)
+
+
+class Diff:
+    """What changed between two revisions, at question, subdimension and dimension level.
+
+    `contributions` splits the change of the readiness score over the dimensions: the readiness is
+    the weighted average sum(w * x) / sum(w) of the weighted dimension scores x, so dimension d
+    contributes w_new * x_new / W_new - w_old * x_old / W_old, and the contributions add up to the
+    change exactly, whether answers, weights or both changed.
+    """
+
+    def __init__(self, old, new, index=scoring.DEFAULT_INDEX):
+        self.old = old
+        self.new = new
+        self.index = index
+        self.weights = np.array([scoring.weight_vector(old.weights, index), scoring.weight_vector(new.weights, index)])
+        self.scores = scoring.score(scoring.answer_matrix(np.array([old.answers, new.answers]), index), self.weights, index)
+        totals = self.weights.sum(axis=1, keepdims=True)
+        shares = np.divide(self.weights * self.scores.weighted, totals, out=np.zeros_like(self.weights), where=totals != 0)
+        self.contributions = shares[1] - shares[0]
+        self.readiness = self.scores.readiness  # (old, new)
+
+    def questions(self):
+        # Table (column -> values) of the changed answers in asking order; 0 = unanswered (counts as neutral)
+        changed = [question for question in self.index.bank.ordered
+                   if self.old.answers[question.id] != self.new.answers[question.id]]
+        return {
+            "Dimension": [question.dimension for question in changed],
+            "Subdimension": [question.subdimension for question in changed],
+            "Question": [question.title for question in changed],
+            "Old answer": [int(self.old.answers[question.id]) for question in changed],
+            "New answer": [int(self.new.answers[question.id]) for question in changed],
+        }
+
+    def subdimensions(self):
+        # Subdimensions whose mean changed
+        old, new = self.scores.subdimension_means
+        changed = np.flatnonzero(old != new)
+        return {
+            "Dimension": [self.index.subdimensions[s][0] for s in changed],
+            "Subdimension": [self.index.subdimensions[s][1] for s in changed],
+            "Old score": old[changed].round(2),
+            "New score": new[changed].round(2),
+            "Change": (new - old)[changed].round(2),
+        }
+
+    def dimensions(self):
+        # Every dimension with its scores, weights and share of the readiness change, largest share first
+        order = np.argsort(-np.abs(self.contributions), kind="stable")
+        old, new = self.scores.dimension_means[:, order]
+        return {
+            "Dimension": [self.index.dimensions[d] for d in order],
+            "Old score": old.round(2),
+            "New score": new.round(2),
+            "Old weight": self.weights[0, order],
+            "New weight": self.weights[1, order],
+            "Old weighted": self.scores.weighted[0, order].round(2),
+            "New weighted": self.scores.weighted[1, order].round(2),
+            "Readiness change": self.contributions[order].round(3),
+        }
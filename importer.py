@@ -0,0 +1,171 @@
+import io
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import questions
+import scoring
+
+# Answer labels accepted in addition to the numbers 1-5 (case-insensitive), as shown on the assessment pages
+LIKERT_LABELS = ('Strongly Disagree', 'Somewhat Disagree', 'Neutral', 'Somewhat Agree', 'Strongly Agree')
+WEIGHT_RANGE = scoring.WEIGHT_RANGE
+
+
+class ImportResult:
+    """Validated assessments of one uploaded file.
+
+    Rows with errors are left out of `answers`; every problem is listed in `errors`
+    (one row per offending cell, with the 1-based spreadsheet row number).
+    """
+
+    def __init__(self, ids, names, answers, weights, rows, errors, warnings, index=scoring.DEFAULT_INDEX):
+        self.ids = ids  # assessment ids of the valid rows
+        self.names = names
+        self.answers = answers  # (valid rows x question ids) int8, 0 = unanswered
+        self.weights = weights  # [dimension_weights or None] per valid row
+        self.rows = rows  # spreadsheet row number of every valid row
+        self.errors = errors  # DataFrame: row, column, value, message
+        self.warnings = warnings  # list of file-level messages
+        self.scores = scoring.score(scoring.answer_matrix(answers, index),
+                                    np.array([scoring.weight_vector(w, index) for w in weights]).reshape(
+                                        -1, index.n_dimensions), index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def records(self):
+        # (assessment_id, answers, dimension_weights, name) for AssessmentRepository.save_many
+        return list(zip(self.ids, self.answers, self.weights, self.names))
+
+    def summary(self):
+        # One row per valid assessment with its readiness and dimension scores, for review
+        table = {"Row": self.rows, "Assessment ID": self.ids, "Name": self.names,
+                 "Answered": np.count_nonzero(self.answers, axis=1),
+                 "Readiness": self.scores.readiness.round(2)}
+        for d, dimension in enumerate(self.scores.index.dimensions):
+            table[dimension] = self.scores.dimension_means[:, d].round(2)
+        return pd.DataFrame(table)
+
+
+def read_table(data, filename):
+    # CSV, or Excel (.xlsx/.xlsm, read with openpyxl) by file extension; every cell is read as text and converted
+    # during validation
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        try:
+            return pd.read_excel(io.BytesIO(data), dtype=object, engine="openpyxl")
+        except ImportError as error:
+            raise ValueError(f"Reading Excel files needs openpyxl, see requirements.txt ({error}).") from error
+    return pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=True, skipinitialspace=True)
+
+
+def question_columns(frame, bank=None):
+    """Map the frame's columns to question ids.
+
+    Accepts "q12" (as written by the data export), a bare "12", or the full question text.
+    """
+    bank = questions.load_question_bank() if bank is None else bank
+    by_text = {question.text.strip().lower(): question.id for question in bank.questions}
+    mapping = {}
+    for column in frame.columns:
+        label = str(column).strip()
+        match = re.fullmatch(r"q?(\d+)", label, flags=re.IGNORECASE)
+        question_id = int(match.group(1)) if match else by_text.get(label.lower())
+        if question_id is not None and 0 <= question_id < len(bank):
+            mapping[column] = question_id
+    return mapping
+
+
+def validate(frame, min_answered=0.0, index=scoring.DEFAULT_INDEX):
+    """Validate all rows of `frame` at once and return an ImportResult.
+
+    Answers must be whole numbers 1-5 or a Likert label; empty cells are unanswered (neutral).
+    Rows that answer less than `min_answered` (a share, 0-1) of the questions are rejected.
+    Optional columns: assessment_id, name and weight:<dimension> (0.0-2.0).
+    """
+    bank = index.bank
+    n = len(frame)
+    row_numbers = np.arange(n) + 2  # spreadsheet rows: 1 is the header
+    errors = []
+    warnings = []
+
+    def reject(mask, column, values, message):
+        for row in np.flatnonzero(mask):
+            errors.append((int(row_numbers[row]), column, values[row], message))
+
+    mapping = question_columns(frame, bank)
+    duplicated = pd.Series(list(mapping.values())).duplicated()
+    if duplicated.any():
+        warnings.append(f"{int(duplicated.sum())} question(s) appear in more than one column; the last one is used.")
+    missing = sorted(set(range(len(bank))) - set(mapping.values()))
+    if missing:
+        warnings.append(f"{len(missing)} of {len(bank)} questions have no column and count as unanswered: "
+                        + ", ".join(f"q{question_id}" for question_id in missing[:10]) + (" ..." if len(missing) > 10 else ""))
+
+    # Answers: the whole (rows x question columns) block is converted and range-checked at once;
+    # only the cells that are not plain numbers are looked up as labels (or parsed again with surrounding spaces)
+    labels = {label.lower(): value for value, label in enumerate(LIKERT_LABELS, start=1)}
+    columns = list(mapping)
+    raw = frame[columns].to_numpy(dtype=object)
+    cells = pd.Series(raw.ravel())
+    numeric = pd.to_numeric(cells, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+    present = cells.notna().to_numpy(copy=True)
+    text = present & np.isnan(numeric)
+    if text.any():
+        words = cells[text].astype(str).str.strip()
+        numeric[text] = words.str.lower().map(labels).fillna(pd.to_numeric(words, errors="coerce")).to_numpy(dtype=np.float64)
+        present[np.flatnonzero(text)[(words == "").to_numpy()]] = False
+    numeric, present = numeric.reshape(raw.shape), present.reshape(raw.shape)
+    valid = ~present | np.isin(numeric, (1, 2, 3, 4, 5))
+    for row, column in zip(*np.nonzero(~valid)):
+        errors.append((int(row_numbers[row]), str(columns[column]), raw[row, column], "Answer must be 1-5 or a Likert label"))
+    answers = np.zeros((n, len(bank)), dtype=np.int8)
+    answers[:, list(mapping.values())] = np.where(present & valid, np.nan_to_num(numeric), 0).astype(np.int8)
+
+    # Coverage
+    answered = np.count_nonzero(answers, axis=1)
+    if min_answered:
+        required = int(np.ceil(min_answered * len(bank)))
+        reject(answered < required, "", answered, f"Only some questions answered; at least {required} required")
+
+    # Weights
+    weights = [{} for _ in range(n)]
+    for dimension in index.dimensions:
+        column = f"weight:{dimension}"
+        if column not in frame.columns:
+            continue
+        raw = frame[column]
+        values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64)
+        present = raw.notna().to_numpy() & (raw.astype("string").str.strip() != "").to_numpy()
+        valid = ~present | ((values >= WEIGHT_RANGE[0]) & (values <= WEIGHT_RANGE[1]))
+        reject(~valid, column, raw.to_numpy(), f"Weight must be between {WEIGHT_RANGE[0]} and {WEIGHT_RANGE[1]}")
+        for row in np.flatnonzero(present & valid):
+            weights[row][dimension] = float(values[row])
+
+    # Ids and names
+    if "assessment_id" in frame.columns:
+        ids = frame["assessment_id"].astype("string").str.strip().fillna("").to_numpy(dtype=object)
+        ids[ids == ""] = None
+        duplicated = pd.Series(ids).duplicated(keep=False).to_numpy() & pd.notna(ids)
+        reject(duplicated, "assessment_id", ids, "Assessment ID appears more than once in the file")
+    else:
+        ids = np.full(n, None, dtype=object)
+    ids = [assessment_id or uuid.uuid4().hex[:12] for assessment_id in ids]
+    names = frame["name"].astype("string").fillna("").tolist() if "name" in frame.columns else [""] * n
+    names = [name or None for name in names]
+
+    errors = pd.DataFrame(sorted(errors, key=lambda error: error[0]), columns=["row", "column", "value", "message"])
+    ok = ~np.isin(row_numbers, errors["row"].to_numpy())
+    keep = np.flatnonzero(ok)
+    return ImportResult([ids[row] for row in keep], [names[row] for row in keep], answers[keep],
+                        [weights[row] or None for row in keep], row_numbers[keep].tolist(), errors, warnings, index)
+
+
+def template_csv(index=scoring.DEFAULT_INDEX):
+    # Header row of an import file; the question text is in the data export and on the assessment pages
+    header = ["assessment_id", "name"] + [f"weight:{dimension}" for dimension in index.dimensions]
+    header += [f"q{question_id}" for question_id in index.ordered_ids]
+    return ",".join(f'"{column}"' if "," in column else column for column in header) + "\n"
@@ -0,0 +1,177 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Rerun stages timed across the app; other names are accepted too
+STAGES = ("session_init", "question_rendering", "score_aggregation", "plotly_figure", "matplotlib_render",
+          "pdf_assembly", "download_preparation", "storage_write", "storage_read",
+          "import_validation")
+
+# Optional export for a local scraper: *.prom is rewritten as Prometheus text, anything else gets JSON lines appended
+METRICS_FILE = os.environ.get("IIP_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("IIP_METRICS_INTERVAL", 15))
+MAX_SESSIONS = 1000  # per-session statistics kept for the most recently active sessions
+
+_context = threading.local()  # page and session of the script run on this thread
+
+
+class Timing:
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+
+class Metrics:
+    """Process-wide stage timings and counters, per page and per session.
+
+    Recording is a couple of dict updates under a lock, cheap enough to stay on in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}  # (page, stage) -> Timing
+        self._counters = {}  # (page, counter) -> int
+        self._sessions = OrderedDict()  # session -> {(page, stage): Timing}, least recently active first
+        self._events = []  # not yet exported observations (JSON lines export)
+
+    def observe(self, stage, seconds, page, session):
+        with self._lock:
+            self._timings.setdefault((page, stage), Timing()).add(seconds)
+            if session is not None:
+                timings = self._sessions.pop(session, None) or {}
+                self._sessions[session] = timings
+                timings.setdefault((page, stage), Timing()).add(seconds)
+                while len(self._sessions) > MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+            if METRICS_FILE and not METRICS_FILE.endswith(".prom"):
+                self._events.append({"ts": time.time(), "page": page, "session": session, "stage": stage,
+                                     "seconds": seconds})
+
+    def increment(self, counter, page, amount=1):
+        with self._lock:
+            self._counters[(page, counter)] = self._counters.get((page, counter), 0) + amount
+
+    def timings(self, session=None):
+        # [(page, stage, count, total, max, last)] for the whole process or one session
+        with self._lock:
+            source = self._timings if session is None else dict(self._sessions.get(session, {}))
+            return sorted((page, stage, t.count, t.total, t.max, t.last) for (page, stage), t in source.items())
+
+    def counters(self):
+        with self._lock:
+            return sorted((page, counter, value) for (page, counter), value in self._counters.items())
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._sessions.clear()
+            self._events.clear()
+
+    def prometheus_text(self):
+        lines = ["# HELP iip_stage_seconds Time spent in a rerun stage.", "# TYPE iip_stage_seconds summary"]
+        timings = self.timings()
+        for page, stage, count, total, _, _ in timings:
+            labels = _labels(page=page, stage=stage)
+            lines.append(f"iip_stage_seconds_count{labels} {count}")
+            lines.append(f"iip_stage_seconds_sum{labels} {total:.6f}")
+        lines += ["# HELP iip_stage_seconds_max Slowest observation of a rerun stage.",
+                  "# TYPE iip_stage_seconds_max gauge"]
+        lines += [f"iip_stage_seconds_max{_labels(page=page, stage=stage)} {longest:.6f}"
+                  for page, stage, _, _, longest, _ in timings]
+        lines += ["# HELP iip_events_total Counted events.", "# TYPE iip_events_total counter"]
+        lines += [f"iip_events_total{_labels(page=page, event=counter)} {value}" for page, counter, value in self.counters()]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        path = path or METRICS_FILE
+        if not path:
+            return
+        if path.endswith(".prom"):
+            # Write next to the target and rename, so a scraper never reads a half-written file
+            with open(path + ".tmp", "w", encoding="utf-8") as handle:
+                handle.write(self.prometheus_text())
+            os.replace(path + ".tmp", path)
+            return
+        with self._lock:
+            events, self._events = self._events, []
+        if events:
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(event) + "\n" for event in events)
+
+
+def _labels(**labels):
+    # Prometheus label set; backslashes, quotes and newlines in values are escaped
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+metrics = Metrics()
+
+
+def set_context(page, session=None):
+    # Called at the start of every script run (session.init_session); stages recorded later on this thread are tagged with it
+    _context.page = page
+    _context.session = session
+
+
+def current_page():
+    return getattr(_context, "page", None) or "-"
+
+
+def current_session():
+    return getattr(_context, "session", None)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(name, time.perf_counter() - start, current_page(), current_session())
+
+
+def timed(name):
+    # Decorator form of `stage`
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(counter, amount=1):
+    metrics.increment(counter, current_page(), amount)
+
+
+def _export_loop():
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            metrics.export()
+        except OSError:
+            pass
+
+
+if METRICS_FILE:
+    threading.Thread(target=_export_loop, name="iip-metrics-export", daemon=True).start()
+    atexit.register(metrics.export)
@@ -0,0 +1,200 @@
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import instrumentation
+import reports
+from response_store import ResponseStore
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Exports rendered at the same time; the rest wait in the queue. Override with IIP_EXPORT_WORKERS
+EXPORT_WORKERS = int(os.environ.get("IIP_EXPORT_WORKERS", 0)) or max(1, (os.cpu_count() or 1) // 2)
+MAX_QUEUED = 32  # distinct exports waiting before new ones are refused
+MAX_FINISHED = 64  # finished reports kept for download (and for identical requests), least recently finished dropped
+WORKER_NICENESS = 10  # renderers yield the CPU to the server process answering interactive reruns
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ExportJob:
+    """One PDF export; its state and result are set by the queue, sessions only read them."""
+
+    def __init__(self, key, responses, dimension_weights, chart_format):
+        self.key = key
+        self.payload = (responses, dimension_weights, chart_format)
+        self.state = QUEUED
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.result = None  # PDF bytes once done
+        self.error = None
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+
+def _lower_priority():
+    if hasattr(os, "nice"):
+        os.nice(WORKER_NICENESS)
+
+
+def _export(payload):
+    responses, dimension_weights, chart_format = payload
+    return reports.render_report(responses, dimension_weights, chart_format)
+
+
+class ExportQueue:
+    """Background PDF exports in a process pool, deduplicated by content.
+
+    Jobs are keyed by a hash of the answers, weights and chart format, so identical requests from
+    any session share one job (and its finished report). At most `workers` jobs are handed to the
+    pool at a time, in submission order, and workers run at a lower priority: a spike of exports
+    waits in the queue instead of competing with interactive reruns for the CPU.
+    """
+
+    def __init__(self, workers=EXPORT_WORKERS, max_queued=MAX_QUEUED, max_finished=MAX_FINISHED):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._jobs = {}  # key -> ExportJob, queued, running or finished
+        self._queue = deque()  # queued jobs in submission order
+        self._finished = OrderedDict()  # keys of finished jobs, oldest first
+        self._running = 0
+        self._lock = threading.RLock()  # re-entrant: a done callback may run in the submitting thread
+        self._pool = None  # started on the first export
+        self.expected_seconds = 2.0  # moving average of the rendering time, for progress estimates
+        self.submitted = 0
+        self.coalesced = 0
+        atexit.register(self.close)
+
+    @staticmethod
+    def key(answers, dimension_weights=None, chart_format=None):
+        payload = json.dumps([dimension_weights or {}, chart_format or reports.CHART_FORMAT], sort_keys=True)
+        return hashlib.sha256(np.asarray(answers, dtype=np.int8).tobytes() + payload.encode("utf-8")).hexdigest()
+
+    def submit(self, responses, dimension_weights=None, chart_format=None):
+        # The job for these answers and weights: an identical queued, running or finished one, or a new one
+        key = self.key(responses.answers, dimension_weights, chart_format)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != FAILED:
+                self.coalesced += 1
+                instrumentation.count("export_coalesced")
+                if job.state == DONE:
+                    self._finished.move_to_end(key)
+                return job
+            if len(self._queue) >= self.max_queued:
+                instrumentation.count("export_refused")
+                raise QueueFull
+            # A copy, so answers changed in the session after the click are not part of this export
+            job = ExportJob(key, ResponseStore(responses.answers.copy()), dict(dimension_weights or {}) or None,
+                            chart_format)
+            self._jobs[key] = job
+            self._finished.pop(key, None)  # a failed earlier attempt
+            self._queue.append(job)
+            self.submitted += 1
+            instrumentation.count("export_submitted")
+            self._dispatch()
+            return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def position(self, job):
+        # Jobs ahead of a queued job; 0 once it runs
+        with self._lock:
+            return self._queue.index(job) + 1 if job.state == QUEUED and job in self._queue else 0
+
+    def progress(self, job):
+        # Estimated share done (0-1) from the time spent rendering and the average rendering time
+        if job.done:
+            return 1.0
+        if job.state == QUEUED:
+            return 0.0
+        return min((time.monotonic() - job.started) / self.expected_seconds, 0.95)
+
+    def _dispatch(self):
+        with self._lock:
+            while self._queue and self._running < self.workers:
+                if self._pool is None:
+                    # Spawned workers do not inherit the Streamlit server's threads or state
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                pool = self._pool
+                job = self._queue.popleft()
+                job.state = RUNNING
+                job.started = time.monotonic()
+                self._running += 1
+                try:
+                    future = pool.submit(_export, job.payload)
+                except (BrokenProcessPool, RuntimeError) as error:
+                    # A worker died before its own callback reset the pool; the next job gets a new one
+                    self._reset_pool(pool)
+                    self._running -= 1
+                    self._fail(job, str(error) or type(error).__name__)
+                    continue
+                future.add_done_callback(lambda future, job=job, pool=pool: self._finish(job, future, pool))
+
+    def _reset_pool(self, pool):
+        # Only the pool the failure happened in; a newer one started by an earlier failure stays
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fail(self, job, error):
+        job.finished = time.monotonic()
+        job.payload = None
+        job.state = FAILED
+        job.error = error
+        instrumentation.count("export_failed")
+        self._keep_finished(job)
+
+    def _keep_finished(self, job):
+        self._finished[job.key] = None
+        while len(self._finished) > self.max_finished:
+            evicted, _ = self._finished.popitem(last=False)
+            self._jobs.pop(evicted, None)
+
+    def _finish(self, job, future, pool):
+        with self._lock:
+            self._running -= 1
+            error = None if future.cancelled() else future.exception()
+            if future.cancelled() or error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    self._reset_pool(pool)  # a worker died; the next export starts a new pool
+                self._fail(job, "cancelled" if future.cancelled() else str(error) or type(error).__name__)
+            else:
+                job.finished = time.monotonic()
+                job.payload = None
+                job.result = future.result()
+                job.state = DONE
+                self.expected_seconds = 0.8 * self.expected_seconds + 0.2 * (job.finished - job.started)
+                self._keep_finished(job)
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "queued": len(self._queue), "running": self._running,
+                    "finished": len(self._finished), "submitted": self.submitted, "coalesced": self.coalesced,
+                    "expected_seconds": self.expected_seconds}
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._queue.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
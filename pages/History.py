@@ -0,0 +1,93 @@
+import datetime
+
+import plotly.graph_objects as go
+import streamlit as st
+
+import history
+import instrumentation
+import session
+
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def load_timeline(assessment_id, updated_at):
+    # Replayed from the stored deltas once per assessment and save (`updated_at` only keys the cache)
+    with instrumentation.stage("storage_read"):
+        revisions, scores = history.timeline(session.get_storage(), assessment_id)
+    return revisions, scores.readiness
+
+
+def saved_at(revision):
+    return datetime.datetime.fromtimestamp(revision.created_at).strftime("%Y-%m-%d %H:%M")
+
+
+st.title("Assessment History")
+st.write("Every save that changes the answers or weights of an assessment is kept as a revision. Pick two revisions to "
+         "see which answers changed and how much each dimension moved the readiness score.")
+
+session.init_session(page="History")
+saved = session.get_storage().list()
+if not saved:
+    st.info("No saved assessments yet.")
+    st.stop()
+
+names = {assessment_id: name for assessment_id, name, _ in saved}
+updated = {assessment_id: updated_at for assessment_id, _, updated_at in saved}
+ids = list(names)
+current = st.session_state.assessment_id
+assessment_id = st.selectbox("Assessment", ids, index=ids.index(current) if current in ids else 0,
+                             format_func=lambda key: f"{names[key] or key} ({key})" + (" – this session" if key == current else ""))
+
+revisions, readiness = load_timeline(assessment_id, updated[assessment_id])
+if not revisions:
+    st.info("This assessment was saved before revisions were kept; its next change starts the history.")
+    st.stop()
+
+# Readiness over time, one point per revision
+with instrumentation.stage("plotly_figure"):
+    fig = go.Figure(go.Scatter(x=[datetime.datetime.fromtimestamp(revision.created_at) for revision in revisions],
+                               y=readiness, mode="lines+markers", line=dict(color='blue'),
+                               text=[f"Revision {revision.revision}" for revision in revisions]))
+    fig.update_layout(title=f"Readiness Score over {len(revisions)} Revisions", yaxis_title="Readiness score",
+                      yaxis_range=[0, 5])
+st.plotly_chart(fig)
+
+with st.expander("All revisions"):
+    st.dataframe({"Revision": [revision.revision for revision in revisions],
+                  "Saved": [saved_at(revision) for revision in revisions],
+                  "Changed answers": [revision.changed for revision in revisions],
+                  "Readiness": readiness.round(2)}, hide_index=True)
+
+by_number = {revision.revision: revision for revision in revisions}
+numbers = list(by_number)
+if len(numbers) == 1:
+    st.info("Only one revision so far; changes show up here once the assessment is saved again.")
+    st.stop()
+old, new = st.select_slider("Compare revisions", options=numbers, value=(numbers[-2], numbers[-1]),
+                            format_func=lambda number: f"{number} ({saved_at(by_number[number])})")
+if old == new:
+    st.stop()
+
+with instrumentation.stage("score_aggregation"):
+    diff = history.Diff(by_number[old], by_number[new])
+col1, col2, col3 = st.columns(3)
+col1.metric(f"Readiness at revision {old}", f"{diff.readiness[0]:.2f} / 5")
+col2.metric(f"Readiness at revision {new}", f"{diff.readiness[1]:.2f} / 5", delta=f"{diff.readiness[1] - diff.readiness[0]:+.2f}")
+col3.metric("Changed answers", len(diff.questions()["Question"]))
+
+st.write("### Why the Readiness Score Moved")
+st.write("The readiness score is the weighted average of the weighted dimension scores. The change of every dimension's "
+         "share of that average is listed below; the shares add up to the total change, whether answers, weights or both changed.")
+dimensions = diff.dimensions()
+with instrumentation.stage("plotly_figure"):
+    fig = go.Figure(go.Bar(x=dimensions["Readiness change"], y=dimensions["Dimension"], orientation="h",
+                           marker_color=["darkred" if change < 0 else "blue" for change in dimensions["Readiness change"]]))
+    fig.update_layout(title="Change of the Readiness Score by Dimension", xaxis_title="Readiness change",
+                      yaxis_autorange="reversed")
+st.plotly_chart(fig)
+st.dataframe(dimensions, hide_index=True)
+
+st.write("### Changed Subdimensions")
+st.dataframe(diff.subdimensions(), hide_index=True)
+st.write("### Changed Answers")
+st.caption("Answers are 1 (Strongly Disagree) to 5 (Strongly Agree); 0 is unanswered and counts as Neutral.")
+st.dataframe(diff.questions(), hide_index=True)
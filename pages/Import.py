@@ -0,0 +1,69 @@
+import streamlit as st
+
+import importer
+import instrumentation
+import session
+
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def validate_upload(data, filename, min_answered):
+    # Parsed, validated and scored once per distinct file and setting
+    with instrumentation.stage("import_validation"):
+        return importer.validate(importer.read_table(data, filename), min_answered)
+
+
+st.title("Bulk Import")
+st.write("Upload a CSV or Excel file with one pre-filled assessment per row. Answers are numbers 1-5 or the answer "
+         "labels (e.g. *Somewhat Agree*), empty cells count as unanswered. The columns of the data export "
+         "(`q0`, `q1`, ..., optional `assessment_id`, `name` and `weight:<dimension>`) are understood, so exported "
+         "files can be imported again.")
+
+session.init_session(page="Import")
+st.download_button("Download empty template (CSV)", importer.template_csv(), file_name="import_template.csv",
+                   mime="text/csv")
+
+col1, col2 = st.columns([2, 1])
+uploaded_file = col1.file_uploader("Assessments", type=["csv", "xlsx", "xlsm"])
+min_answered = col2.slider("Required answered questions", 0, 100, 0, step=5, format="%d%%",
+                           help="Rows that answer fewer questions are rejected") / 100
+if uploaded_file is None:
+    st.stop()
+
+try:
+    result = validate_upload(uploaded_file.getvalue(), uploaded_file.name, min_answered)
+except (ValueError, UnicodeDecodeError) as error:
+    st.error(f"Could not read {uploaded_file.name}: {error}")
+    st.stop()
+
+for warning in result.warnings:
+    st.warning(warning)
+rejected = result.errors["row"].nunique()
+col1, col2, col3 = st.columns(3)
+col1.metric("Valid rows", len(result))
+col2.metric("Rejected rows", rejected)
+col3.metric("Errors", len(result.errors))
+if len(result.errors):
+    with st.expander("Row-level errors", expanded=not len(result)):
+        st.dataframe(result.errors.astype({"value": str}), hide_index=True)
+
+if not len(result):
+    st.stop()
+
+st.subheader("Scores")
+st.dataframe(result.summary(), hide_index=True)
+
+if st.button(f"Save {len(result)} assessments", type="primary"):
+    session.get_storage().save_many(result.records())
+    st.session_state._imported = list(result.ids)
+    st.success(f"Saved {len(result)} assessments. They are listed on the Portfolio page and can be resumed by ID.")
+
+if st.session_state.get("_imported"):
+    st.subheader("Review an Imported Assessment")
+    labels = dict(zip(result.ids, result.names))
+    assessment_id = st.selectbox("Assessment", st.session_state._imported,
+                                 format_func=lambda key: f"{labels.get(key) or key} ({key})")
+    if st.button("Open in this session"):
+        session.save_session()
+        if session.resume_assessment(assessment_id):
+            st.switch_page("pages/Results.py")
+        st.error(f"No saved assessment with ID {assessment_id}.")
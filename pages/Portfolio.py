@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+import instrumentation
+import portfolio
+import reports
+import scoring
+import session
+
+
+@st.cache_data(max_entries=1000, show_spinner=False)
+def parse_upload(data):
+    # Parsed once per distinct file content and shared by all sessions
+    responses, dimension_weights = reports.load_assessment(data)
+    return responses.answers, dimension_weights
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_saved(version):
+    # The saved assessments, read again only once one was saved or deleted (`version` only keys the cache)
+    return session.get_storage().load_all()
+
+
+def load_portfolio(include_saved, uploaded_files):
+    ids, names, rows, weights = [], [], [], []
+    if include_saved:
+        saved_ids, saved_names, saved_answers, saved_weights = load_saved(session.get_storage().version())
+        ids += saved_ids
+        names += saved_names
+        rows += list(saved_answers)
+        weights += saved_weights
+    for uploaded_file in uploaded_files or []:
+        try:
+            answers, dimension_weights = parse_upload(uploaded_file.getvalue())
+        except ValueError:
+            st.warning(f"Skipped {uploaded_file.name}: not a valid assessment file.")
+            continue
+        ids.append(uploaded_file.name)
+        names.append(os.path.splitext(uploaded_file.name)[0])
+        rows.append(answers)
+        weights.append(dimension_weights)
+    answers = np.stack(rows) if rows else np.zeros((0, scoring.DEFAULT_INDEX.n_questions), dtype=np.int8)
+    with instrumentation.stage("score_aggregation"):
+        return portfolio.Portfolio(ids, names, answers, weights)
+
+
+# Overlaid radars of the current ranking page plus the spread of the whole portfolio; WebGL traces keep many overlays fast
+@instrumentation.timed("plotly_figure")
+def plot_portfolio_radar(cases, rows, ranks, envelope):
+    categories = list(cases.index.dimensions) + [cases.index.dimensions[0]]  # Close the radar chart loop
+    low, median, high = (list(values) + [values[0]] for values in envelope)
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolargl(r=high, theta=categories, mode='lines', line=dict(color='lightgray'),
+                                    name='Portfolio 90th percentile'))
+    fig.add_trace(go.Scatterpolargl(r=low, theta=categories, mode='lines', line=dict(color='lightgray'),
+                                    fill='tonext', name='Portfolio 10th percentile'))
+    fig.add_trace(go.Scatterpolargl(r=median, theta=categories, mode='lines', line=dict(color='black', dash='dash'),
+                                    name='Portfolio median'))
+    for row, rank in zip(rows, ranks):
+        values = cases.weighted[row].round(2).tolist()
+        # Ranked legend entries, so use cases of the same name stay apart
+        fig.add_trace(go.Scatterpolargl(r=values + values[:1], theta=categories, mode='lines',
+                                        name=f"{rank}. {cases.names[row]}", opacity=0.7))
+    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickfont=dict(color='darkred'))),
+                      title="Weighted Dimension Averages")
+    st.plotly_chart(fig)
+
+
+@instrumentation.timed("plotly_figure")
+def plot_portfolio_heatmap(cases, order):
+    z, labels, names = cases.heatmap(order)
+    fig = go.Figure(go.Heatmap(z=z.round(2), x=labels, y=cases.index.dimensions, zmin=0, zmax=5,
+                               hovertext=[names] * len(cases.index.dimensions), colorscale="RdYlGn",
+                               colorbar=dict(title="Score")))
+    bucketed = len(labels) < len(order)
+    fig.update_layout(title="Weighted Dimension Scores by Use Case" + (" (ranks averaged)" if bucketed else ""),
+                      xaxis=dict(type='category', showticklabels=len(labels) <= 50))
+    st.plotly_chart(fig)
+
+
+st.title("Portfolio Comparison")
+st.write("Compare many assessed use cases at once: saved assessments and uploaded assessment files are scored on the server "
+         "with their own weights, and only the current page of the ranking is sent to your browser.")
+
+session.init_session(page="Portfolio")
+col1, col2 = st.columns([1, 2])
+include_saved = col1.checkbox("Saved assessments", value=True)
+uploaded_files = col2.file_uploader("Assessment files", type="json", accept_multiple_files=True)
+cases = load_portfolio(include_saved, uploaded_files)
+
+if not len(cases):
+    st.info("No assessments yet. Complete an assessment or upload assessment files to compare them here.")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Use cases", len(cases))
+col2.metric("Median readiness", f"{np.median(cases.readiness):.2f} / 5")
+col3.metric("Ready (score ≥ 3)", f"{np.mean(scoring.is_ready(cases.readiness)):.0%}")
+
+# Ranking: sorted and paginated on the server
+st.subheader("Ranking")
+col1, col2, col3, col4 = st.columns(4)
+sort_by = col1.selectbox("Sort by", cases.sort_keys())
+descending = col2.toggle("Descending", value=sort_by != "Name")
+page_size = col3.selectbox("Rows per page", portfolio.PAGE_SIZES, index=1)
+page = col4.number_input("Page", min_value=1, max_value=cases.page_count(page_size), value=1)
+order = cases.ranking(sort_by, descending)
+rows, table = cases.page(order, int(page), page_size)
+st.dataframe(table, hide_index=True)
+st.caption(f"Use cases {table['Rank'][0]}–{table['Rank'][-1]} of {len(cases)}")
+
+st.subheader("Radar Comparison")
+plot_portfolio_radar(cases, rows, table["Rank"], cases.envelope())
+
+st.subheader("Heatmap")
+plot_portfolio_heatmap(cases, order)
@@ -1,109 +1,166 @@
-import streamlit as st
 import numpy as np
+import streamlit as st
 import plotly.graph_objects as go
+import charts
+import instrumentation
+import scoring
+import session
 
 # Function to plot an interactive radar chart
 def plot_interactive_radar(categories, values, title="Radar Chart"):
-    fig = go.Figure()
-
-    values += values[:1]  # Close the radar chart loop
-    categories += categories[:1]  # Close the radar chart loop
-
-    fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
-        fill='toself',
-        name='Assessment Score',
-        line=dict(color='blue')
-    ))
-
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 5],
-                tickfont=dict(color='darkred')  # Change the color of the numbers to make them more visible
-            )
-        ),
-        showlegend=False,
-        title=title
+    with instrumentation.stage("plotly_figure"):
+        fig = charts.interactive_radar_figure(categories, values, title)
+    st.plotly_chart(fig)
+
+# Ensure responses exist in session_state (a saved assessment can be resumed from the sidebar)
+responses = session.init_session(page="Results")
+
+# List of all dimensions that should appear in the chart
+all_dimensions = scoring.DIMENSIONS
+
+# Allow users to customize the weight for each dimension
+st.sidebar.header("Customize Weights for Each Dimension")
+saved_weights = st.session_state.get('dimension_weights') or {}
+dimension_weights = {}
+for dimension in all_dimensions:
+    key = session.weight_key(dimension)
+    if key not in st.session_state:
+        # Seed the slider from the saved weights; its stable key keeps the user's changes across reruns
+        st.session_state[key] = saved_weights.get(dimension, 1.0)
+    dimension_weights[dimension] = st.sidebar.slider(
+        f"Weight for {dimension}", min_value=0.0, max_value=2.0, step=0.1, key=key
     )
+# Keep the weights so the PDF export on the Summary page uses the same weighting, and save them with the assessment
+st.session_state.dimension_weights = dimension_weights
+session.save_session()
 
-    st.plotly_chart(fig)
+# Apply the weighting rule to the incrementally maintained dimension scores (unanswered questions count as neutral):
+# positive scores are amplified by the weight, negative scores are dampened, neutral scores stay neutral
+with instrumentation.stage("score_aggregation"):
+    weights = scoring.weight_vector(dimension_weights)
+    categories = list(all_dimensions)
+    weighted = scoring.apply_weights(responses.dimension_scores(), weights)
+    values = weighted.tolist()
+    # The final readiness score is the weighted average of all weighted dimensions (0 if all weights are zero)
+    final_readiness_score = float(scoring.readiness_scores(weighted, weights))
 
-# Ensure responses exist in session_state
-if 'responses' in st.session_state:
-    responses = st.session_state.responses
-
-    # List of all dimensions that should appear in the chart
-    all_dimensions = [
-        "Accessibility",
-        "Use Case Specifics",
-        "Business & Economy",
-        "Collaboration & Interaction",
-        "Presence",
-        "Simulation & Modeling",
-        "Technical Infrastructure"
-    ]
-
-    # Allow users to customize the weight for each dimension
-    st.sidebar.header("Customize Weights for Each Dimension")
-    dimension_weights = {}
-    for dimension in all_dimensions:
-        dimension_weights[dimension] = st.sidebar.slider(
-            f"Weight for {dimension}", min_value=0.0, max_value=2.0, value=1.0, step=0.1
-        )
-
-    # Pre-fill all dimensions with a default score of 3 (neutral)
-    categories = all_dimensions.copy()
-    values = [3] * len(all_dimensions)
-
-    # Replace the default values with actual scores if available and apply weights
-    for i, dimension in enumerate(all_dimensions):
-        if dimension in responses and isinstance(responses[dimension], dict) and 'overall' in responses[dimension]:
-            original_score = responses[dimension]['overall']
-            weight = dimension_weights[dimension]
-            
-            # Adjust the score based on weighting logic
-            if original_score > 3:
-                # For positive scores, amplify the score with the weight
-                values[i] = min(original_score * weight, 5)  # Ensure the max value does not exceed 5
-            elif original_score < 3:
-                # For negative scores, apply a dampening factor, keeping it low or reducing further
-                values[i] = original_score * (1 - (weight / 2))
-            else:
-                # Neutral scores remain neutral regardless of weight
-                values[i] = original_score
-
-    # Explanation about weighting
-    st.write("""
-        ### Customizing Weights for Dimensions
-        You have the ability to adjust the weights for each dimension using the sliders in the sidebar. This feature allows you to place more importance on certain aspects of your use case, depending on your business needs and priorities. For instance, if **Collaboration** is crucial to your operations, you can increase its weight to see how it affects the overall readiness of your use case for an immersive platform. Adjusting these weights helps provide a more tailored and strategic assessment outcome.
-        
-        Note: If a dimension receives a low score but is marked as very important, it will be weighted down even more to emphasize that it is a critical area that needs attention before proceeding with an immersive transformation. If the dimension is marked as less important, it will have a reduced impact on the final assessment but will not improve artificially.
+# Explanation about weighting
+st.write("""
+    ### Customizing Weights for Dimensions
+    You have the ability to adjust the weights for each dimension using the sliders in the sidebar. This feature allows you to place more importance on certain aspects of your use case, depending on your business needs and priorities. For instance, if **Collaboration** is crucial to your operations, you can increase its weight to see how it affects the overall readiness of your use case for an immersive platform. Adjusting these weights helps provide a more tailored and strategic assessment outcome.
+    
+    Note: If a dimension receives a low score but is marked as very important, it will be weighted down even more to emphasize that it is a critical area that needs attention before proceeding with an immersive transformation. If the dimension is marked as less important, it will have a reduced impact on the final assessment but will not improve artificially.
+""")
+
+# Radar chart for the results
+st.subheader("Results - Radar Chart for Overall Dimensions")
+plot_interactive_radar(categories, values, title="Weighted Dimension Averages")
+
+# Display the final readiness score
+st.write("""
+    ### Final Readiness Score
+    The final readiness score represents an overall assessment of your use case's suitability for immersive transformation, taking into account the importance you assigned to each dimension. 
+    \n 
+    ***WARNING:*** This score represents only an average value. This score is influenced by your personalized weights.
+""")
+st.metric(label="Final Readiness Score", value=f"{final_readiness_score:.2f} / 5")
+
+
+# Shared assessment: the consensus of all raters (with this session's weights) and how far apart they are
+def consensus_section(shared, rater, weights):
+    consensus = shared.consensus()
+    with instrumentation.stage("score_aggregation"):
+        consensus_weighted, consensus_readiness, rater_weighted = consensus.weighted(weights)
+        lowest, highest, spread = consensus.dimension_spread()
+    st.write(f"""
+    ### Consensus of {len(consensus)} Raters
+    Everyone who joined the shared assessment `{shared.shared_id}` answers on their own. The consensus scores use the mean answer of all raters to every question; the lines show the lowest and highest weighted score any single rater gives a dimension. Agreement is Fleiss' kappa over the questions answered by at least two raters: 1 means everyone gives the same answers, 0 no more agreement than by chance.
     """)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Consensus readiness", f"{consensus_readiness:.2f} / 5",
+                delta=f"{final_readiness_score - consensus_readiness:+.2f} you", delta_color="off")
+    col2.metric("Agreement (kappa)", "–" if np.isnan(consensus.kappa) else f"{consensus.kappa:.2f}")
+    col3.metric("Most disputed dimension", consensus.index.dimensions[int(np.argmax(spread))] if len(consensus) > 1 else "–")
+    with instrumentation.stage("plotly_figure"):
+        fig = charts.consensus_radar_figure(categories, consensus_weighted.tolist(),
+                                            rater_weighted.min(axis=0).tolist(), rater_weighted.max(axis=0).tolist())
+    st.plotly_chart(fig)
+    st.dataframe({
+        "Dimension": consensus.index.dimensions,
+        "Consensus": consensus.dimension_scores().round(2),
+        f"You ({rater})": responses.dimension_scores().round(2),
+        "Lowest rater": lowest.round(2),
+        "Highest rater": highest.round(2),
+        "Standard deviation": spread.round(2),
+    }, hide_index=True)
 
-    # Radar chart for the results
-    st.subheader("Results - Radar Chart for Overall Dimensions")
-    plot_interactive_radar(categories, values, title="Weighted Dimension Averages")
 
-    # Calculate the final readiness score as a weighted average of all dimensions
-    weighted_sum = sum(values[i] * dimension_weights[dimension] for i, dimension in enumerate(all_dimensions))
-    total_weight = sum(dimension_weights.values())
-    if total_weight == 0:
-        final_readiness_score = 0  # Prevent division by zero if all weights are zero
-    else:
-        final_readiness_score = weighted_sum / total_weight
+joined = session.shared_assessment()
+if joined is not None:
+    consensus_section(*joined, weights)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def weight_sensitivity(dimension_scores, weights, samples, method, levels, threshold):
+    # A million sampled weightings take a noticeable share of a second; every full rerun with the section open
+    # (e.g. each weight slider change) would otherwise compute them again
+    with instrumentation.stage("sensitivity_analysis"):
+        return scoring.sensitivity(dimension_scores, weights, samples=samples, method=method, levels=levels,
+                                   threshold=threshold, seed=0)
+
 
-    # Display the final readiness score
+# How robust is the score to the weights? Sample many weight vectors on the slider grid and re-score them.
+# As a fragment, changing the analysis settings does not rerun the rest of the page.
+@st.fragment
+def sensitivity_section(dimension_scores, weights):
+    session.restore_metrics_context()
     st.write("""
-        ### Final Readiness Score
-        The final readiness score represents an overall assessment of your use case's suitability for immersive transformation, taking into account the importance you assigned to each dimension. 
-        \n 
-        ***WARNING:*** This score represents only an average value. This score is influenced by your personalized weights.
+    ### Sensitivity to the Weights
+    The readiness score above depends on the weights you chose. The sensitivity analysis re-computes the score for a large number of alternative weight settings on the slider grid (0.0 to 2.0) and shows how much the score moves, which weights matter most and where the verdict would change.
     """)
-    st.metric(label="Final Readiness Score", value=f"{final_readiness_score:.2f} / 5")
+    col1, col2, col3 = st.columns(3)
+    method = col1.radio("Sampling", ["Monte Carlo", "Grid"], horizontal=True)
+    if method == "Monte Carlo":
+        samples = col2.select_slider("Samples", options=[10_000, 100_000, 1_000_000], value=1_000_000)
+        levels = 7
+    else:
+        levels = col2.select_slider("Weight levels per dimension", options=[3, 4, 5, 6, 7], value=5)
+        samples = levels ** len(weights)
+    threshold = col3.number_input("Ready if the score is at least", min_value=0.0, max_value=5.0, value=3.0, step=0.1)
 
-    
-else:
-    st.write("No responses found. Please complete the assessment first.")
+    analysis = weight_sensitivity(dimension_scores, weights, samples, "grid" if method == "Grid" else "monte_carlo",
+                                  levels, threshold)
+    verdict = "ready" if analysis.ready else "not ready"
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Median score", f"{analysis.percentiles[50]:.2f} / 5")
+    col2.metric("90% of weightings", f"{analysis.percentiles[5]:.2f} – {analysis.percentiles[95]:.2f}")
+    col3.metric(f"Verdict flips ({verdict} now)", f"{analysis.flip_share:.1%}")
+
+    # Distribution of the readiness score over all sampled weightings
+    centers = (analysis.histogram_edges[:-1] + analysis.histogram_edges[1:]) / 2
+    fig = go.Figure(go.Bar(x=centers, y=analysis.histogram / analysis.samples, marker_color='blue'))
+    fig.add_vline(x=threshold, line_dash="dash", line_color="darkred", annotation_text="threshold")
+    fig.add_vline(x=analysis.readiness, line_color="black", annotation_text="your weights")
+    fig.update_layout(title=f"Readiness Score over {analysis.samples:,} Weightings", xaxis_title="Readiness score",
+                      yaxis_title="Share of weightings", xaxis_range=[0, 5], bargap=0)
+    st.plotly_chart(fig)
+
+    # Elasticity: % change of the score for a 1% change of the weight, at the current weights
+    st.dataframe({
+        "Dimension": analysis.index.dimensions,
+        "Score change per +0.1 weight": (analysis.slopes * scoring.WEIGHT_STEP).round(3),
+        "Elasticity": analysis.elasticities.round(3),
+        "Verdict flips at weight": [", ".join(f"{w:.1f}" for w in analysis.flip_points[dimension]) or "–"
+                                    for dimension in analysis.index.dimensions],
+    }, hide_index=True)
+
+    # Where in weight space the verdict flips: share of flipped weightings per dimension and slider value
+    fig = go.Figure(go.Heatmap(z=analysis.flip_rates, x=analysis.weight_levels, y=analysis.index.dimensions,
+                               zmin=0, zmax=1, colorscale="Reds", colorbar=dict(title="Flipped")))
+    fig.update_layout(title=f"Share of Weightings with the Opposite Verdict ({'not ready' if analysis.ready else 'ready'})",
+                      xaxis_title="Weight", xaxis_dtick=0.2)
+    st.plotly_chart(fig)
+
+
+if st.toggle("Show sensitivity analysis", help="Sample alternative weightings to see how robust the readiness score is."):
+    sensitivity_section(responses.dimension_scores().copy(), weights)
@@ -1,63 +1,40 @@
-import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-from textwrap import shorten
-from fpdf import FPDF
-import tempfile
+import streamlit as st
 import os
+import scoring
+import charts
+import export
+import reports
+import instrumentation
+import jobs
+import session
+
+EXPORT_POLL_SECONDS = 0.5
 
 # Function to create a new detailed breakdown page
 def detailed_breakdown_page():
     st.title("Detailed Dimension Breakdown")
     st.write("Below, you'll find a deeper analysis of each dimension with a breakdown of individual subdimensions.")
 
-    if 'responses' not in st.session_state:
-        st.session_state.responses = {}  # Initialize with empty responses if none exist
-
-    responses = st.session_state.responses
-    all_dimensions = [
-        "Accessibility",
-        "Use Case Specifics",
-        "Business & Economy",
-        "Collaboration & Interaction",
-        "Presence",
-        "Simulation & Modeling",
-        "Technical Infrastructure"
-    ]
-
-    detailed_info = []
-    charts = []
+    responses = session.init_session(page="Summary & Export")  # Initialize with empty responses if none exist
+    # Breakdown and chart of every dimension from the last rerun, tagged with the dimension's version
+    rendered = st.session_state.setdefault('_rendered_breakdowns', {})
 
     # Display bar charts for each dimension's subdimension score (without weights)
-    for dimension in all_dimensions:
-        if dimension in responses and isinstance(responses[dimension], dict) and 'questions' in responses[dimension]:
-            subdimensions = responses[dimension]['questions']
-        else:
-            # Default values for subdimensions if not available
-            subdimensions = {f"{dimension}-Default": 3}
+    for dimension in scoring.DIMENSIONS:
+        version = responses.dimension_version(dimension)
+        if dimension not in rendered or rendered[dimension][0] != version:
+            # Only dimensions whose answers changed are rebuilt; the chart itself may still come from the shared cache
+            dimension_info = reports.dimension_breakdown(responses, dimension)
+            rendered[dimension] = (version, dimension_info, charts.breakdown_png(*dimension_info))
+        _, _, chart_png = rendered[dimension]
 
         st.subheader(f"{dimension} Breakdown")
+        st.image(chart_png, width="stretch")
 
-        # Shorten subdimension names for visualization purposes by extracting the part after the first dash
-        sub_names = [key.split('-', 1)[-1].split(':', 1)[0].strip() for key in subdimensions.keys()]
-        sub_scores = list(subdimensions.values())
-
-        # Collecting information for PDF export
-        detailed_info.append((dimension, sub_names, sub_scores))
-
-        # Plotting each subdimension using matplotlib
-        fig, ax = plt.subplots()
-        ax.barh(sub_names, sub_scores, color='darkblue')
-        ax.set_xlabel('Score')
-        ax.set_xlim(0, 5)
-        ax.set_title(f"Subdimension Scores for {dimension}")
-
-        st.pyplot(fig)
-        # Save figure for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-            chart_path = tmp_file.name
-            plt.savefig(chart_path)
-            charts.append((dimension, chart_path))
+    joined = session.shared_assessment()
+    if joined is not None:
+        consensus_section(joined[0].consensus())
 
     st.write("### Download Report")
     st.write("""
@@ -66,109 +43,124 @@ def detailed_breakdown_page():
              \n**Please make sure that you've completed the entire assessment, or else the download might not work!**
              \n---
              """)
-    # Button to export results as PDF
+    # Button to export results as PDF; the report is rendered in the background and offered once it is ready
+    pdf_export_section(responses)
+
+    # Save the raw answers so the assessment can be included in a batch export later
+    st.download_button(label="Download Assessment (JSON)",
+                       data=reports.dump_assessment(responses, st.session_state.get('dimension_weights')),
+                       file_name="assessment.json", mime="application/json")
+
+    data_export_section(responses)
+    batch_export_section()
+
+# Shared assessment: mean answer and spread of every question over all raters, least agreement first
+def consensus_section(consensus):
+    st.write(f"### Consensus of {len(consensus)} Raters")
+    st.write("Mean answer and standard deviation of every question over the raters who answered it. Agreement is the "
+             "share of rater pairs that gave the same answer; the questions the raters agree on least come first.")
+    asked = consensus.index.bank.ordered
+    ids = consensus.index.ordered_ids
+    table = {
+        "Dimension": [question.dimension for question in asked],
+        "Question": [f"{question.subdimension}-{question.title}" for question in asked],
+        "Raters": consensus.counts[ids],
+        "Mean": consensus.means[ids].round(2),
+        "Std": consensus.stds()[ids].round(2),
+        "Agreement": consensus.agreement[ids].round(2),
+    }
+    order = np.argsort(np.nan_to_num(consensus.agreement[ids], nan=2.0), kind="stable")
+    st.dataframe({column: [values[i] for i in order] for column, values in table.items()}, hide_index=True)
+
+# Raw answers and all scores as a machine-readable table, for this assessment or every saved one
+def data_export_section(responses):
+    st.write("### Data Export")
+    st.write("Download the raw answers together with the subdimension, dimension and weighted scores, the weights and the readiness score as a table.")
+    col1, col2 = st.columns(2)
+    scope = col1.radio("Assessments", ["This assessment", "All saved assessments"])
+    fmt = col2.radio("Format", list(export.FORMATS), format_func={"csv": "CSV", "jsonl": "JSON lines", "parquet": "Parquet"}.get)
+    mime, extension = export.FORMATS[fmt]
+
+    def build():
+        # Runs only when the button is clicked; saved assessments are streamed from storage in chunks
+        with instrumentation.stage("download_preparation"):
+            if scope == "This assessment":
+                chunks = export.session_chunks(st.session_state.assessment_id, responses,
+                                               st.session_state.get('dimension_weights'))
+            else:
+                chunks = session.get_storage().iter_chunks()
+            return export.export_file(chunks, fmt)
+
+    file_name = "assessment" if scope == "This assessment" else "assessments"
+    st.download_button(label=f"Download Data ({extension[1:].upper()})", data=build,
+                       file_name=file_name + extension, mime=mime)
+
+# Batch export: render the PDF reports of many saved assessments in parallel worker processes
+def batch_export_section():
+    st.write("### Batch Export")
+    st.write("Upload several assessments saved with the button above to receive all of their PDF reports as one ZIP archive.")
+    uploaded_files = st.file_uploader("Assessment files", type="json", accept_multiple_files=True)
+    workers = st.number_input("Worker processes", min_value=1, max_value=os.cpu_count() or 1,
+                              value=min(4, os.cpu_count() or 1))
+
+    if uploaded_files and st.button("Export Batch as ZIP"):
+        assessments = []
+        for uploaded_file in uploaded_files:
+            try:
+                responses, dimension_weights = reports.load_assessment(uploaded_file.getvalue())
+            except ValueError:
+                st.warning(f"Skipped {uploaded_file.name}: not a valid assessment file.")
+                continue
+            assessments.append((os.path.splitext(uploaded_file.name)[0], responses, dimension_weights))
+
+        with st.spinner(f"Rendering {len(assessments)} reports..."):
+            archive, stats = reports.batch_reports(assessments, max_workers=int(workers))
+
+        st.write(f"Rendered {stats['reports']} reports in {stats['seconds']:.1f}s "
+                 f"({stats['reports_per_second']:.2f} reports/second).")
+        st.table({"Worker PID": list(stats["peak_rss_mb_per_worker"].keys()),
+                  "Peak RSS (MB)": list(stats["peak_rss_mb_per_worker"].values())})
+        st.download_button(label="Download Reports (ZIP)", data=archive, file_name="assessment_reports.zip",
+                           mime="application/zip")
+
+# PDF export as a background job: reruns are not blocked while it renders, and the finished report
+# stays available across reruns until the answers or weights change
+def pdf_export_section(responses):
+    export_queue = session.get_export_queue()
+    dimension_weights = st.session_state.get('dimension_weights')  # Use weights from the Results page if available
     if st.button("Export Detailed Breakdown as PDF"):
-        create_pdf_report(detailed_info, charts)
-
-# Function to create a PDF report of the detailed breakdown
-def create_pdf_report(detailed_info, charts):
-    # Create radar plot for PDF export
-    responses = st.session_state.responses
-    all_dimensions = [
-        "Accessibility",
-        "Use Case Specifics",
-        "Business & Economy",
-        "Collaboration & Interaction",
-        "Presence",
-        "Simulation & Modeling",
-        "Technical Infrastructure"
-    ]
-    dimension_weights = st.session_state.get('dimension_weights', {dimension: 1.0 for dimension in all_dimensions})  # Use weights from session_state if available
-    values = [responses.get(dimension, {}).get('overall', 3) for dimension in all_dimensions]
-    weighted_sum = sum(values[i] * dimension_weights[dimension] for i, dimension in enumerate(all_dimensions))
-    total_weight = sum(dimension_weights.values())
-    final_readiness_score = weighted_sum / total_weight if total_weight != 0 else 0
-
-    # Radar plot for the final readiness score
-    # Apply the manager-defined weights to the radar values
-    weighted_values = [values[i] * dimension_weights[dimension] for i, dimension in enumerate(all_dimensions)]
-    # Ensure values do not exceed 5
-    weighted_values = [min(5, value) for value in weighted_values]
-    categories = all_dimensions + [all_dimensions[0]]  # Close the radar chart loop
-    radar_values = weighted_values + [weighted_values[0]]
-
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
-    ax.fill(angles, radar_values, color='darkblue', alpha=0.25)
-    ax.plot(angles, radar_values, color='darkblue', linewidth=2)
-    ax.set_yticks([1, 2, 3, 4, 5])
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(all_dimensions, fontsize=10)
-    ax.set_title("Weighted Dimension Averages")
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-        radar_chart_path = tmp_file.name
-        plt.savefig(radar_chart_path)
-    
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    # Title Page
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', size=20)
-    pdf.cell(200, 20, txt="IIP-Assessment Model Results", ln=True, align='C')
-    pdf.ln(10)
-    pdf.line(10, 30, 200, 30)
-    pdf.set_font("Arial", 'I', size=14)
-    pdf.cell(200, 10, txt="Evaluating Your Business Use Case for Immersive Platform Readiness", ln=True, align='C')
-    pdf.ln(20)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, txt="The Industrial Immersive Platform (IIP) Assessment Model is designed to evaluate the readiness of a business use case for transformation into an immersive environment. This report provides a detailed breakdown of the subdimension results, offering insights that contribute to the overall readiness score.")
-    pdf.multi_cell(0, 10, txt="The report is divided into two sections. First, you will receive a radar plot that reflects any adjustments you've made by applying weights to the dimensions. If no weights were added, you will receive the default radar plot, which displays the average results based on your assessment responses. As averages may not always capture the full picture, we encourage you to delve deeper into each dimension for a more nuanced understanding. In the second section, we provide a detailed breakdown of each dimension, presented through boxplots. This helps to visualize how your use case performs across various categories. If any category was left unanswered, the values will default to three.")
-    pdf.set_font("Arial", 'B', size=12)
-    pdf.ln(20)
-    pdf.cell(0,10, txt="DISCLAIMER:", align='C')
-    pdf.ln(10)
-    pdf.multi_cell(0,10, txt="This model was developed as part of a mastersthesis and is currently a prototype. For full reliability, further validation cycles are required.")
-    pdf.ln(20)
-    pdf.image(radar_chart_path, x=15, w=180)
-    pdf.ln(10)
-
-    # Adding Final Readiness Score
-    pdf.set_font("Arial", 'B', size=16)
-    pdf.cell(200, 10, txt="Final Readiness Score", ln=True, align='C')
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Your Overall Readiness Score: {final_readiness_score:.2f} / 5", ln=True, align='C')
-    pdf.ln(10)
-    pdf.multi_cell(0,10,txt="The Overall Readiness Score provides an average assessment based on the values you entered. We recommend conducting a detailed review of each subdimension to gain a deeper understanding. This tool is intended to support your decision-making process, but it is important not to rely solely on the overall score. Use the detailed insights provided to conduct a thorough analysis that suits the specifics of your case.")
-    pdf.ln(20)
-
-    # Adding Detailed Results
-    for (dimension, sub_names, sub_scores), (chart_dimension, chart_path) in zip(detailed_info, charts):
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(200, 10, txt=f"{dimension} - Detailed Breakdown", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=10)
-        for sub_name, sub_score in zip(sub_names, sub_scores):
-            pdf.cell(200, 8, txt=f"- {sub_name}: Score - {sub_score}", ln=True)
-        pdf.ln(10)
-        # Add the corresponding chart to the PDF
-        pdf.image(chart_path, x=30, w=160)
-        pdf.ln(10)
-
-    # Save the PDF to a temporary file and offer it for download
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        pdf.output(tmp_file.name)
-        with open(tmp_file.name, 'rb') as f:
-            st.download_button(label="Download PDF Report", data=f.read(), file_name="detailed_breakdown_report.pdf", mime="application/pdf")
-
-    # Clean up the temporary chart files
-    if os.path.exists(radar_chart_path):
-        os.remove(radar_chart_path)
-    for _, chart_path in charts:
-        if os.path.exists(chart_path):
-            os.remove(chart_path)
+        try:
+            st.session_state._export_job = export_queue.submit(responses, dimension_weights).key
+        except jobs.QueueFull:
+            st.warning("Many reports are being exported right now. Please try again in a moment.")
+    key = st.session_state.get('_export_job')
+    job = export_queue.get(key) if key is not None else None
+    if job is None:
+        return
+    current = key == export_queue.key(responses.answers, dimension_weights)
+    # Poll while the job is unfinished; a finished job is shown once more by a full rerun, which stops the polling
+    st.fragment(export_status, run_every=None if job.done else EXPORT_POLL_SECONDS)(key, current, not job.done)
+
+def export_status(key, current, polling):
+    session.restore_metrics_context()
+    export_queue = session.get_export_queue()
+    job = export_queue.get(key)
+    if job is None:
+        st.info("The exported report has expired. Please export it again.")
+    elif not job.done:
+        ahead = export_queue.position(job)
+        st.progress(export_queue.progress(job),
+                    text="Rendering the PDF report..." if not ahead else f"Waiting for {ahead} export(s) ahead of yours...")
+    elif polling:
+        st.rerun()
+    elif job.state == jobs.FAILED:
+        st.error(f"The PDF export failed: {job.error}")
+    else:
+        if not current:
+            st.caption("Answers or weights changed since this report was exported.")
+        with instrumentation.stage("download_preparation"):
+            st.download_button(label="Download PDF Report", data=job.result, file_name="detailed_breakdown_report.pdf",
+                               mime="application/pdf")
 
 # Main application logic
 detailed_breakdown_page()
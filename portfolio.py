@@ -0,0 +1,81 @@
+import numpy as np
+
+import scoring
+
+# Upper bounds on what the Portfolio page sends to the browser, independent of the portfolio size
+PAGE_SIZES = (10, 25, 50)
+MAX_HEATMAP_COLUMNS = 100
+
+
+class Portfolio:
+    """Scores of many assessments, aggregated on the server.
+
+    Every view (ranking page, radar overlay, heatmap) is cut down to a bounded size here,
+    so the browser payload does not grow with the number of use cases.
+    """
+
+    def __init__(self, ids, names, answers, dimension_weights, index=scoring.DEFAULT_INDEX):
+        self.ids = list(ids)
+        self.names = [name or assessment_id for assessment_id, name in zip(self.ids, names)]
+        self.index = index
+        # Each assessment is scored with its own saved weights, as its PDF report would be
+        weights = np.array([scoring.weight_vector(w, index) for w in dimension_weights]).reshape(-1, index.n_dimensions)
+        self.scores = scoring.score(scoring.answer_matrix(answers, index), weights, index)
+        self.readiness = self.scores.readiness
+        self.weighted = self.scores.weighted
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sort_keys(self):
+        return ["Readiness", "Name"] + list(self.index.dimensions)
+
+    def ranking(self, sort_by="Readiness", descending=True):
+        # Row order for a sort key; ties keep the storage order (most recently updated first)
+        if sort_by == "Name":
+            order = np.argsort(np.array([name.lower() for name in self.names], dtype=object), kind="stable")
+            return order[::-1] if descending else order
+        key = self.readiness if sort_by == "Readiness" else self.weighted[:, self.index.dimensions.index(sort_by)]
+        return np.argsort(-key if descending else key, kind="stable")
+
+    def page(self, order, page, page_size):
+        # Rows of one ranking page as table columns; `page` starts at 1
+        page_size = min(page_size, max(PAGE_SIZES))
+        start = (page - 1) * page_size
+        rows = order[start:start + page_size]
+        table = {
+            "Rank": (np.arange(len(rows)) + start + 1).tolist(),
+            "Use case": [self.names[row] for row in rows],
+            "Readiness": self.readiness[rows].round(2).tolist(),
+        }
+        for d, dimension in enumerate(self.index.dimensions):
+            table[dimension] = self.weighted[rows, d].round(2).tolist()
+        table["Assessment ID"] = [self.ids[row] for row in rows]
+        return rows, table
+
+    def page_count(self, page_size):
+        return max(1, -(-len(self) // page_size))
+
+    def envelope(self, percentiles=(10, 50, 90)):
+        # Per-dimension percentiles of the weighted scores over the whole portfolio, (len(percentiles), dimensions)
+        if not len(self):
+            return np.full((len(percentiles), self.index.n_dimensions), scoring.NEUTRAL, dtype=np.float64)
+        return np.percentile(self.weighted, percentiles, axis=0)
+
+    def heatmap(self, order, max_columns=MAX_HEATMAP_COLUMNS):
+        """Dimension x use-case matrix of weighted scores in ranking order, with column labels and names.
+
+        Labels start with the rank, so use cases of the same name keep their own columns. With more
+        use cases than `max_columns`, consecutive ranks are averaged into buckets (one `np.add.reduceat`),
+        so the matrix never has more than `max_columns` columns.
+        """
+        ranked = self.weighted[order]
+        if len(order) <= max_columns:
+            names = [self.names[row] for row in order]
+            return ranked.T, [f"{rank}. {name}" for rank, name in enumerate(names, start=1)], names
+        starts = np.linspace(0, len(order), max_columns, endpoint=False).astype(np.intp)
+        counts = np.diff(np.append(starts, len(order)))
+        buckets = np.add.reduceat(ranked, starts, axis=0) / counts[:, None]
+        labels = [f"#{start + 1}" if count == 1 else f"#{start + 1}–#{start + count}"
+                  for start, count in zip(starts, counts)]
+        return buckets.T, labels, labels
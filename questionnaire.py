@@ -0,0 +1,81 @@
+import streamlit as st
+
+import instrumentation
+import questions
+import session
+
+LIKERT_OPTIONS = ('Strongly Disagree', 'Somewhat Disagree', 'Neutral', 'Somewhat Agree', 'Strongly Agree')
+SCORE_VALUE = {option: value for value, option in enumerate(LIKERT_OPTIONS, start=1)}
+
+
+# One subdimension block; as a fragment, a click on one of its radios reruns and re-sends only this block
+@st.fragment
+@instrumentation.timed("question_rendering")
+def render_subdimension(subdimension, asked, submit_per_subdimension):
+    session.restore_metrics_context()
+    store = st.session_state.responses
+
+    # With batch submission the answers of the block only count once its form is submitted
+    block = st.form(f"form_{asked[0].id}", border=False) if submit_per_subdimension else st.container()
+    with block:
+        st.subheader(subdimension)
+        for question in asked:
+            # Check if this question already has a saved answer
+            saved_answer = store.get(question.id)
+            if saved_answer is not None:
+                initial_index = saved_answer - 1  # Convert saved score back to index (1-5 to 0-4)
+            else:
+                initial_index = 2  # Default to 'Neutral'
+
+            # Display the radio button with the previously selected value (if available)
+            score = st.radio(question.text, LIKERT_OPTIONS, index=initial_index, key=f"q{question.id}")
+
+            # Store the selected answer; the store keeps the dimension score up to date
+            store.set(question.id, SCORE_VALUE[score])
+
+        if submit_per_subdimension:
+            st.form_submit_button(f"Save {subdimension}")
+
+    # Persist changed answers through the debounced write-behind queue
+    session.save_session()
+
+
+# Generic assessment page; every "Assessment: (N) ..." page only names its dimension
+def render_assessment_page(dimension):
+    bank = questions.load_question_bank()
+
+    # Initialize session state for storing responses (or resume a saved assessment) if not already done
+    session.init_session(page=f"Assessment: {dimension}")
+
+    # Keep the toggle's value when navigating between pages
+    st.session_state.submit_per_subdimension = st.session_state.get('submit_per_subdimension', False)
+    submit_per_subdimension = st.sidebar.toggle(
+        "Submit answers per subdimension", key="submit_per_subdimension",
+        help="Collect the answers of each subdimension in a form and send them with one click instead of one request per answer.")
+
+    # Collect responses
+    st.title(f"Assessing the Dimension: {dimension}")
+    st.write(bank.descriptions[dimension])
+    all_answered = True  # A flag to track if all questions are answered
+
+    for subdimension, asked in bank.subdimensions[dimension].items():
+        render_subdimension(subdimension, asked, submit_per_subdimension)
+
+    # Display progress; the Results page counts as the final step
+    progress = (bank.dimensions.index(dimension) + 1) / (len(bank.dimensions) + 1)
+    st.progress(progress)
+
+    # Alert if not all questions are answered (optional)
+    if not all_answered:
+        st.warning("Some questions are not answered. You can continue, but it is recommended to answer all questions.")
+
+    # Navigation buttons
+    col1, col2 = st.columns([1, 1])
+
+    if col1.button("Previous"):
+        st.write("Navigate to the previous page using the sidebar.")
+
+    if col2.button("Next"):
+        st.write("Navigate to the next page using the sidebar.")
+
+    st.sidebar.write("IIP Assessment Model")
@@ -0,0 +1,67 @@
+import functools
+import json
+import os
+from collections import namedtuple
+
+# The questionnaire itself lives in questions.json; this module only parses and indexes it
+QUESTION_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.json")
+
+# `id` is the stable integer used as widget key and as key in st.session_state.responses[dimension]["questions"]
+Question = namedtuple("Question", ["id", "dimension", "subdimension", "text", "title"])
+
+
+class QuestionBank:
+    """Indexed, read-only view of the question bank."""
+
+    def __init__(self, document):
+        self.dimensions = []
+        self.descriptions = {}
+        self.subdimensions = {}  # dimension -> {subdimension: [Question, ...]} in asking order
+        questions = []
+        for dimension in document["dimensions"]:
+            name = dimension["name"]
+            self.dimensions.append(name)
+            self.descriptions[name] = dimension["description"]
+            self.subdimensions[name] = {}
+            for subdimension in dimension["subdimensions"]:
+                asked = []
+                for question in subdimension["questions"]:
+                    # The short title is the part of the statement before the first colon
+                    title = question["text"].split(':', 1)[0].strip()
+                    asked.append(Question(question["id"], name, subdimension["name"], question["text"], title))
+                self.subdimensions[name][subdimension["name"]] = asked
+                questions.extend(asked)
+
+        # Question ids must be unique and dense (0..n-1) so they can index arrays directly
+        ids = sorted(question.id for question in questions)
+        if ids != list(range(len(questions))):
+            raise ValueError("Question ids in the question bank must be unique and numbered 0..n-1")
+        self.questions = tuple(sorted(questions, key=lambda question: question.id))
+        # Questions in asking order (dimension, subdimension, question), i.e. scoring column order
+        self.ordered = tuple(questions)
+        self._legacy_keys = {f"{q.dimension}-{q.subdimension}-{q.text}": q.id for q in questions}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def dimension_questions(self, dimension):
+        return [question for asked in self.subdimensions[dimension].values() for question in asked]
+
+    def resolve(self, key):
+        """Map a stored answer key to its question id.
+
+        Accepts the integer id, its string form (as written by JSON) or the long
+        "dimension-subdimension-question" key used before question ids existed.
+        """
+        if isinstance(key, int):
+            return key if 0 <= key < len(self.questions) else None
+        if isinstance(key, str) and key.isdigit():
+            return self.resolve(int(key))
+        return self._legacy_keys.get(key)
+
+
+@functools.lru_cache(maxsize=None)
+def load_question_bank(path=QUESTION_BANK_PATH):
+    # Parsed once per process and shared by every page and session
+    with open(path, encoding="utf-8") as handle:
+        return QuestionBank(json.load(handle))
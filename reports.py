@@ -0,0 +1,256 @@
+import io
+import json
+import os
+import time
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import charts
+import instrumentation
+import scoring
+from response_store import ResponseStore
+
+# How charts are embedded in PDF reports (see charts.IMAGE_FORMATS); "png" reproduces the original reports
+CHART_FORMAT = os.environ.get("IIP_REPORT_CHARTS", "compact")
+
+try:
+    import resource  # Not available on Windows, peak RSS is then reported as unknown
+except ImportError:
+    resource = None
+
+
+def dimension_breakdown(responses, dimension, row=None):
+    # (dimension, question labels, scores) of one dimension as shown on the Summary page
+    index = scoring.DEFAULT_INDEX
+    if row is None:
+        row = scoring.response_matrix([responses], index)[0]
+    asked = index.bank.dimension_questions(dimension)
+
+    # Label each bar with its subdimension and the short title of the question; unanswered questions count as 3
+    sub_names = [f"{question.subdimension}-{question.title}" for question in asked]
+    sub_scores = [int(row[index.question_columns[question.id]]) for question in asked]
+    return dimension, sub_names, sub_scores
+
+
+def breakdown(responses):
+    # Per-dimension breakdown of all dimensions, in chart order
+    row = scoring.response_matrix([responses])[0]
+    return [dimension_breakdown(responses, dimension, row) for dimension in scoring.DIMENSIONS]
+
+
+# Lines of every multi_cell of the boilerplate, broken once per process: (text, width, font) -> lines
+LINE_BREAKS = {}
+
+
+def _lines(pdf, w, h, text):
+    from fpdf.enums import MethodReturnValue
+
+    key = (text, w, pdf.w - pdf.r_margin - pdf.x, pdf.font_family, pdf.font_style, pdf.font_size_pt)
+    lines = LINE_BREAKS.get(key)
+    if lines is None:
+        lines = LINE_BREAKS[key] = pdf.multi_cell(w, h, text=text, dry_run=True, output=MethodReturnValue.LINES)
+    return lines
+
+
+def _draw(pdf, operations):
+    # Lay out a list of ("font" | "cell" | "multi_cell" | "ln" | "line", *arguments) operations.
+    # The text of a multi_cell is measured and line-broken on its first draw only; every report then writes
+    # the same lines as cells (left-aligned, cell() cannot justify)
+    from fpdf.enums import XPos, YPos
+
+    for name, *args in operations:
+        if name == "font":
+            family, style, size = args
+            pdf.set_font(family, style, size=size)
+        elif name == "cell":
+            w, h, text, align, next_line = args
+            if next_line:
+                pdf.cell(w, h, text=text, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align=align)
+            else:
+                pdf.cell(w, h, text=text, align=align)
+        elif name == "multi_cell":
+            w, h, text = args
+            for line in _lines(pdf, w, h, text):
+                pdf.cell(w, h, text=line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        elif name == "ln":
+            pdf.ln(*args)
+        elif name == "line":
+            pdf.line(*args)
+
+
+# Boilerplate of the report, identical for every assessment
+TITLE_SECTION = [
+    ("font", "Helvetica", "B", 20),
+    ("cell", 200, 20, "IIP-Assessment Model Results", "C", True),
+    ("ln", 10),
+    ("line", 10, 30, 200, 30),
+    ("font", "Helvetica", "I", 14),
+    ("cell", 200, 10, "Evaluating Your Business Use Case for Immersive Platform Readiness", "C", True),
+    ("ln", 20),
+    ("font", "Helvetica", "", 12),
+    ("multi_cell", 0, 10, "The Industrial Immersive Platform (IIP) Assessment Model is designed to evaluate the readiness of a business use case for transformation into an immersive environment. This report provides a detailed breakdown of the subdimension results, offering insights that contribute to the overall readiness score."),
+    ("multi_cell", 0, 10, "The report is divided into two sections. First, you will receive a radar plot that reflects any adjustments you've made by applying weights to the dimensions. If no weights were added, you will receive the default radar plot, which displays the average results based on your assessment responses. As averages may not always capture the full picture, we encourage you to delve deeper into each dimension for a more nuanced understanding. In the second section, we provide a detailed breakdown of each dimension, presented through boxplots. This helps to visualize how your use case performs across various categories. If any category was left unanswered, the values will default to three."),
+    ("font", "Helvetica", "B", 12),
+    ("ln", 20),
+    ("cell", 0, 10, "DISCLAIMER:", "C", False),
+    ("ln", 10),
+    ("multi_cell", 0, 10, "This model was developed as part of a mastersthesis and is currently a prototype. For full reliability, further validation cycles are required."),
+    ("ln", 20),
+]
+
+SCORE_NOTE_SECTION = [
+    ("ln", 10),
+    ("multi_cell", 0, 10, "The Overall Readiness Score provides an average assessment based on the values you entered. We recommend conducting a detailed review of each subdimension to gain a deeper understanding. This tool is intended to support your decision-making process, but it is important not to rely solely on the overall score. Use the detailed insights provided to conduct a thorough analysis that suits the specifics of your case."),
+    ("ln", 20),
+]
+
+
+def _new_pdf():
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
+
+
+@instrumentation.timed("pdf_assembly")
+def build_pdf(detailed_info, chart_images, radar_png, final_readiness_score):
+    # Lay out the report; `chart_images` holds one (dimension, image bytes) pair per entry in `detailed_info`.
+    # Images may be PNG or SVG; fpdf2 stores each distinct image once and shares it across pages.
+    # fpdf2 is only imported once a report is actually built
+    from fpdf.enums import XPos, YPos
+
+    pdf = _new_pdf()
+
+    # Title Page
+    pdf.add_page()
+    _draw(pdf, TITLE_SECTION)
+    pdf.image(io.BytesIO(radar_png), x=15, w=180)
+    pdf.ln(10)
+
+    # Adding Final Readiness Score
+    pdf.set_font("Helvetica", 'B', size=16)
+    pdf.cell(200, 10, text="Final Readiness Score", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(200, 10, text=f"Your Overall Readiness Score: {final_readiness_score:.2f} / 5", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    _draw(pdf, SCORE_NOTE_SECTION)
+
+    # Adding Detailed Results
+    for (dimension, sub_names, sub_scores), (chart_dimension, chart_png) in zip(detailed_info, chart_images):
+        pdf.add_page()
+        pdf.set_font("Helvetica", 'B', size=16)
+        pdf.cell(200, 10, text=f"{dimension} - Detailed Breakdown", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        pdf.ln(10)
+        pdf.set_font("Helvetica", size=10)
+        for sub_name, sub_score in zip(sub_names, sub_scores):
+            pdf.cell(200, 8, text=f"- {sub_name}: Score - {sub_score}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.ln(10)
+        # Add the corresponding chart to the PDF
+        pdf.image(io.BytesIO(chart_png), x=30, w=160)
+        pdf.ln(10)
+
+    return pdf
+
+
+@instrumentation.timed("pdf_assembly")
+def pdf_bytes(pdf):
+    # fpdf2 assembles the document in memory and returns a bytearray
+    return bytes(pdf.output())
+
+
+def chart_images(detailed_info, fmt=None):
+    # (dimension, image bytes) of every breakdown chart of a report
+    fmt = fmt or CHART_FORMAT
+    return [(dimension, charts.breakdown_image(dimension, sub_names, sub_scores, fmt))
+            for dimension, sub_names, sub_scores in detailed_info]
+
+
+def render_report(responses, dimension_weights=None, chart_format=None):
+    """Render the complete PDF report for one assessment and return its bytes.
+
+    Uses only Figure/Agg canvases, so it is safe to call from worker processes. Charts come from
+    the process-wide chart cache, so identical assessments in a batch are rendered once per worker.
+    """
+    scores = scoring.score_responses(responses, dimension_weights)
+    detailed_info = breakdown(responses)
+
+    radar_image = charts.radar_image(scores.weighted[0].tolist(), fmt=chart_format or CHART_FORMAT)
+    pdf = build_pdf(detailed_info, chart_images(detailed_info, chart_format), radar_image, float(scores.readiness[0]))
+    return pdf_bytes(pdf)
+
+
+@instrumentation.timed("download_preparation")
+def dump_assessment(responses, dimension_weights=None):
+    # JSON document of one assessment, as offered for download on the Summary page
+    if isinstance(responses, ResponseStore):
+        responses = responses.to_dict()
+    return json.dumps({"responses": responses, "dimension_weights": dimension_weights or {}}, default=float, indent=2)
+
+
+def load_assessment(data):
+    # Accepts a JSON document from `dump_assessment` or a bare responses dict
+    document = json.loads(data)
+    if "responses" in document:
+        layout, dimension_weights = document["responses"], document.get("dimension_weights") or None
+    else:
+        layout, dimension_weights = document, None
+    # JSON turns question ids into strings; older files use the long question keys, both are resolved here
+    return ResponseStore.from_dict(layout), dimension_weights
+
+
+def warm_up():
+    # Import fpdf2, load the Helvetica metrics and break the boilerplate into lines once per process,
+    # before the first report
+    pdf = _new_pdf()
+    pdf.add_page()
+    _draw(pdf, TITLE_SECTION)
+    pdf.set_font("Helvetica", size=12)
+    _draw(pdf, SCORE_NOTE_SECTION)
+    pdf.output()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def render_job(job):
+    # (name, PDF bytes, worker pid, peak RSS) of one (name, responses, weights) job, run in a worker process
+    name, responses, dimension_weights = job
+    return name, render_report(responses, dimension_weights), os.getpid(), peak_rss_mb()
+
+
+def batch_reports(assessments, max_workers=None):
+    """Render reports for many assessments in a process pool and bundle them in a ZIP.
+
+    `assessments` is a list of (name, responses, dimension_weights) tuples. Returns the ZIP
+    bytes and a stats dict with throughput and the peak RSS (MB) of every worker process.
+    """
+    start = time.perf_counter()
+    worker_rss = {}
+    buffer = io.BytesIO()
+    # Spawned workers do not inherit the Streamlit server's threads or state
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool, \
+            zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, report, pid, rss in pool.map(render_job, assessments):
+            # Keep every report when several assessments share a name
+            filename, n = f"{name}.pdf", 1
+            while filename in archive.NameToInfo:
+                n += 1
+                filename = f"{name} ({n}).pdf"
+            archive.writestr(filename, report)
+            worker_rss[pid] = rss if rss is None else max(rss, worker_rss.get(pid) or 0)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "reports": len(assessments),
+        "seconds": elapsed,
+        "reports_per_second": len(assessments) / elapsed if elapsed else 0.0,
+        "peak_rss_mb_per_worker": worker_rss,
+    }
+    return buffer.getvalue(), stats
@@ -0,0 +1,129 @@
+import itertools
+
+import numpy as np
+
+import questions
+import scoring
+
+UNANSWERED = 0
+
+# Process-wide version stamps, so a version never repeats even when a session swaps its store
+_stamps = itertools.count(1)
+
+
+def _effective(value):
+    # Unanswered questions count as neutral in every score
+    return scoring.NEUTRAL if value == UNANSWERED else value
+
+
+class ResponseStore:
+    """Answers of one assessment as a fixed-size int8 array indexed by question id.
+
+    0 means unanswered, 1-5 is the Likert answer. Subdimension sums and dimension scores are
+    maintained incrementally: changing one answer updates only its subdimension sum and its
+    dimension score, and stamps that dimension with a new version. `version` is the latest
+    stamp of the whole store, so callers can skip work while it is unchanged.
+    """
+
+    __slots__ = ("answers", "_subdimension_sums", "_dimension_scores", "versions", "version")
+
+    def __init__(self, answers=None):
+        bank = questions.load_question_bank()
+        if answers is None:
+            answers = np.zeros(len(bank), dtype=np.int8)
+        self.answers = np.asarray(answers, dtype=np.int8)
+        if self.answers.shape != (len(bank),):
+            raise ValueError(f"Expected {len(bank)} answers, got {self.answers.shape}")
+        index = scoring.DEFAULT_INDEX
+        # Exact integer sums per subdimension; means are derived from them on update
+        self._subdimension_sums = np.add.reduceat(self.matrix_row(index), index.subdimension_starts).astype(np.int32)
+        self._dimension_scores = scoring.dimension_means(self._subdimension_sums / index.question_counts, index)
+        self.version = next(_stamps)
+        self.versions = np.full(index.n_dimensions, self.version, dtype=np.int64)
+
+    def get(self, question_id):
+        # Likert value of a question, or None while it is unanswered
+        value = int(self.answers[question_id])
+        return None if value == UNANSWERED else value
+
+    def set(self, question_id, value):
+        if not UNANSWERED <= value <= scoring.MAX_SCORE:
+            raise ValueError(f"Answer must be between 1 and {scoring.MAX_SCORE} (or 0 for unanswered), got {value}")
+        previous = int(self.answers[question_id])
+        if previous == value:
+            return
+        index = scoring.DEFAULT_INDEX
+        self.answers[question_id] = value
+        self._subdimension_sums[index.id_subdimension[question_id]] += _effective(value) - _effective(previous)
+
+        # Re-average only the subdimensions of the affected dimension
+        d = index.id_dimension[question_id]
+        first = index.dimension_starts[d]
+        subdimensions = slice(first, first + index.subdimension_counts[d])
+        sub_means = self._subdimension_sums[subdimensions] / index.question_counts[subdimensions]
+        # Same reduction as scoring.dimension_means, so batch and incremental scores agree bit for bit
+        self._dimension_scores[d] = np.add.reduceat(sub_means, [0])[0] / index.subdimension_counts[d]
+
+        self.version = next(_stamps)
+        self.versions[d] = self.version
+
+    def answered(self, dimension=None):
+        # Number of answered questions, overall or for one dimension
+        if dimension is None:
+            return int(np.count_nonzero(self.answers))
+        in_dimension = scoring.DEFAULT_INDEX.id_dimension == scoring.DIMENSIONS.index(dimension)
+        return int(np.count_nonzero(self.answers[in_dimension]))
+
+    def matrix_row(self, index=scoring.DEFAULT_INDEX):
+        # Answers in scoring column order, with unanswered questions counted as neutral
+        row = self.answers[index.ordered_ids].astype(np.float64)
+        row[row == UNANSWERED] = scoring.NEUTRAL
+        return row
+
+    def subdimension_scores(self):
+        return self._subdimension_sums / scoring.DEFAULT_INDEX.question_counts
+
+    def dimension_scores(self):
+        # Read-only view; updated in place by `set`
+        scores = self._dimension_scores.view()
+        scores.flags.writeable = False
+        return scores
+
+    def dimension_score(self, dimension):
+        return float(self._dimension_scores[scoring.DIMENSIONS.index(dimension)])
+
+    def dimension_version(self, dimension):
+        return int(self.versions[scoring.DIMENSIONS.index(dimension)])
+
+    def to_dict(self):
+        """Convert to the nested dict layout of `st.session_state.responses` used before this store.
+
+        Dimensions without any answer are stored as the plain neutral score 3, as on the start page.
+        """
+        bank = questions.load_question_bank()
+        layout = {}
+        for dimension in bank.dimensions:
+            answers = {question.id: int(self.answers[question.id]) for question in bank.dimension_questions(dimension)
+                       if self.answers[question.id] != UNANSWERED}
+            layout[dimension] = {"questions": answers, "overall": self.dimension_score(dimension)} if answers else scoring.NEUTRAL
+        return layout
+
+    @classmethod
+    def from_dict(cls, layout):
+        # Accepts question ids, their string form or the legacy long question keys
+        bank = questions.load_question_bank()
+        store = cls()
+        for entry in layout.values():
+            if not isinstance(entry, dict):
+                continue
+            for key, value in entry.get("questions", {}).items():
+                question_id = bank.resolve(key)
+                if question_id is not None:
+                    store.set(question_id, int(value))
+        return store
+
+    def __eq__(self, other):
+        return isinstance(other, ResponseStore) and np.array_equal(self.answers, other.answers)
+
+    def __repr__(self):
+        return f"ResponseStore(answered={self.answered()}/{len(self.answers)})"
@@ -0,0 +1,285 @@
+import numpy as np
+
+import questions
+
+# Order in which the dimensions appear in charts, reports and score matrices
+DIMENSIONS = list(questions.load_question_bank().dimensions)
+
+# Score used for every question that has not been answered yet
+NEUTRAL = 3
+MAX_SCORE = 5
+
+
+class ScoringIndex:
+    """Precomputed question -> subdimension -> dimension index.
+
+    Questions are laid out as contiguous columns per subdimension and subdimensions
+    as contiguous runs per dimension, so every aggregation is a single `np.add.reduceat`.
+    """
+
+    def __init__(self, bank=None):
+        self.bank = questions.load_question_bank() if bank is None else bank
+        self.dimensions = list(self.bank.dimensions)
+
+        self.subdimensions = []  # (dimension, subdimension) pairs in column order
+        question_counts = []
+        subdimension_dimension = []
+        for d, dimension in enumerate(self.dimensions):
+            for subdimension, asked in self.bank.subdimensions[dimension].items():
+                self.subdimensions.append((dimension, subdimension))
+                question_counts.append(len(asked))
+                subdimension_dimension.append(d)
+
+        # Question id of every matrix column, and the inverse: matrix column of every question id
+        self.ordered_ids = np.array([question.id for question in self.bank.ordered], dtype=np.intp)
+        self.question_columns = np.empty(len(self.bank), dtype=np.intp)
+        self.question_columns[self.ordered_ids] = np.arange(len(self.bank))
+
+        self.question_counts = np.array(question_counts, dtype=np.intp)
+        self.subdimension_dimension = np.array(subdimension_dimension, dtype=np.intp)
+        self.subdimension_counts = np.bincount(self.subdimension_dimension, minlength=len(self.dimensions))
+        self.question_subdimension = np.repeat(np.arange(len(question_counts)), self.question_counts)
+        self.question_dimension = self.subdimension_dimension[self.question_subdimension]
+        self.id_dimension = self.question_dimension[self.question_columns]  # dimension of every question id
+        self.id_subdimension = self.question_subdimension[self.question_columns]  # subdimension of every question id
+
+        # Column offsets of the first question of each subdimension / first subdimension of each dimension
+        self.subdimension_starts = np.concatenate(([0], np.cumsum(self.question_counts)[:-1]))
+        self.dimension_starts = np.concatenate(([0], np.cumsum(self.subdimension_counts)[:-1]))
+
+        self.n_questions = int(self.question_counts.sum())
+        self.n_subdimensions = len(self.subdimensions)
+        self.n_dimensions = len(self.dimensions)
+
+
+DEFAULT_INDEX = ScoringIndex()
+
+
+class Scores:
+    """Batched scores for N assessments; every array has the assessments along axis 0."""
+
+    def __init__(self, subdimension_means, dimension_means, weighted, readiness, index):
+        self.subdimension_means = subdimension_means  # (N, subdimensions)
+        self.dimension_means = dimension_means        # (N, dimensions)
+        self.weighted = weighted                      # (N, dimensions), after the weighting rule
+        self.readiness = readiness                    # (N,)
+        self.index = index
+
+    def dimension(self, dimension, row=0):
+        return float(self.dimension_means[row, self.index.dimensions.index(dimension)])
+
+
+def weight_vector(dimension_weights=None, index=DEFAULT_INDEX):
+    # Turn a {dimension: weight} dict (as stored by the Results page) into an array in index order
+    if dimension_weights is None:
+        return np.ones(index.n_dimensions)
+    return np.array([float(dimension_weights.get(dimension, 1.0)) for dimension in index.dimensions])
+
+
+def response_matrix(assessments, index=DEFAULT_INDEX):
+    """Build an (assessments x questions) matrix from response stores or nested response dicts.
+
+    Unanswered questions and dimensions that were never visited stay neutral (3).
+    """
+    matrix = np.full((len(assessments), index.n_questions), NEUTRAL, dtype=np.float64)
+    for row, responses in enumerate(assessments):
+        if not isinstance(responses, dict):
+            # A responses.ResponseStore already holds a dense answer array
+            matrix[row] = responses.matrix_row(index)
+            continue
+        for dimension in index.dimensions:
+            entry = responses.get(dimension)
+            if not isinstance(entry, dict) or not entry.get("questions"):
+                continue
+            for key, value in entry["questions"].items():
+                question_id = index.bank.resolve(key)
+                if question_id is not None:
+                    matrix[row, index.question_columns[question_id]] = value
+    return matrix
+
+
+def answer_matrix(answers, index=DEFAULT_INDEX):
+    # (assessments x question ids) int8 answers as stored by ResponseStore -> scoring matrix, unanswered (0) as neutral
+    matrix = np.asarray(answers)[:, index.ordered_ids].astype(np.float64)
+    matrix[matrix == 0] = NEUTRAL
+    return matrix
+
+
+def subdimension_means(matrix, index=DEFAULT_INDEX):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return np.add.reduceat(matrix, index.subdimension_starts, axis=-1) / index.question_counts
+
+
+def dimension_means(sub_means, index=DEFAULT_INDEX):
+    # A dimension is the plain average of its subdimension averages, as on the assessment pages
+    return np.add.reduceat(sub_means, index.dimension_starts, axis=-1) / index.subdimension_counts
+
+
+def apply_weights(dimension_scores, weights):
+    """Results-page weighting rule, broadcast over any leading axes.
+
+    Positive scores (> 3) are amplified by the weight and capped at 5, negative scores (< 3)
+    are dampened by `1 - weight / 2`, neutral scores stay neutral.
+    """
+    scores = np.asarray(dimension_scores, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    amplified = np.minimum(scores * weights, MAX_SCORE)
+    dampened = scores * (1 - weights / 2)
+    return np.where(scores > NEUTRAL, amplified, np.where(scores < NEUTRAL, dampened, scores))
+
+
+def readiness_scores(weighted, weights):
+    # Weighted average of the weighted dimension scores; 0 when every weight is 0
+    weighted = np.asarray(weighted, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    total_weight = weights.sum(axis=-1)
+    weighted_sum = (weighted * weights).sum(axis=-1)
+    return np.divide(weighted_sum, total_weight, out=np.zeros(np.broadcast(weighted_sum, total_weight).shape),
+                     where=total_weight != 0)
+
+
+def score(matrix, weights=None, index=DEFAULT_INDEX):
+    """Score every assessment in `matrix` in a single batched call.
+
+    `weights` is either one weight per dimension or one row of weights per assessment.
+    """
+    weights = np.ones(index.n_dimensions) if weights is None else np.asarray(weights, dtype=np.float64)
+    sub_means = subdimension_means(matrix, index)
+    dim_means = dimension_means(sub_means, index)
+    weighted = apply_weights(dim_means, weights)
+    readiness = readiness_scores(weighted, weights)
+    return Scores(sub_means, dim_means, weighted, readiness, index)
+
+
+def score_responses(responses, dimension_weights=None, index=DEFAULT_INDEX):
+    # Convenience wrapper for a single assessment (a ResponseStore or a nested responses dict)
+    return score(response_matrix([responses], index), weight_vector(dimension_weights, index), index)
+
+
+def dimension_score(responses, dimension, index=DEFAULT_INDEX):
+    # Overall score of one dimension, i.e. the mean of its subdimension means
+    matrix = response_matrix([responses], index)
+    return score(matrix, index=index).dimension(dimension)
+
+
+# Slider range and step of the dimension weights on the Results page
+WEIGHT_RANGE = (0.0, 2.0)
+WEIGHT_STEP = 0.1
+WEIGHT_POSITIONS = int(round((WEIGHT_RANGE[1] - WEIGHT_RANGE[0]) / WEIGHT_STEP)) + 1  # 21 slider positions
+
+
+class Sensitivity:
+    """Summary of how the readiness score of one assessment reacts to the dimension weights.
+
+    Only summaries are kept; the sampled weight vectors are discarded after the run.
+    """
+
+    def __init__(self, **fields):
+        self.samples = fields["samples"]                # number of weight vectors evaluated
+        self.readiness = fields["readiness"]            # readiness at the current weights
+        self.threshold = fields["threshold"]            # verdict: ready if readiness >= threshold
+        self.ready = fields["ready"]
+        self.mean = fields["mean"]
+        self.std = fields["std"]
+        self.percentiles = fields["percentiles"]        # {5: ..., 25: ..., 50: ..., 75: ..., 95: ...}
+        self.histogram = fields["histogram"]            # counts over `histogram_edges`
+        self.histogram_edges = fields["histogram_edges"]
+        self.flip_share = fields["flip_share"]          # share of samples with the opposite verdict
+        self.slopes = fields["slopes"]                  # (dimensions,) d readiness / d weight at the current weights
+        self.elasticities = fields["elasticities"]      # (dimensions,) % change of readiness per % change of weight
+        self.flip_rates = fields["flip_rates"]          # (dimensions, slider positions) share of flipped samples
+        self.weight_levels = fields["weight_levels"]    # weight of every slider position
+        self.flip_points = fields["flip_points"]        # {dimension: [weights where the verdict flips, others fixed]}
+        self.index = fields["index"]
+
+
+def weight_levels():
+    # Weight of every slider position: 0.0, 0.1, ..., 2.0
+    return WEIGHT_RANGE[0] + np.arange(WEIGHT_POSITIONS) * WEIGHT_STEP
+
+
+def sample_positions(samples, method="monte_carlo", levels=7, seed=None, index=DEFAULT_INDEX):
+    """Weight vectors as slider positions (int8, 0..20), one vector per row.
+
+    "monte_carlo" draws `samples` uniform vectors; "grid" is the full factorial grid over `levels`
+    evenly spaced slider positions per dimension, i.e. levels ** dimensions rows.
+    """
+    if method == "grid":
+        axis = np.unique(np.linspace(0, WEIGHT_POSITIONS - 1, levels).round().astype(np.int8))
+        grid = np.meshgrid(*[axis] * index.n_dimensions, indexing="ij")
+        return np.stack(grid, axis=-1).reshape(-1, index.n_dimensions)
+    if method != "monte_carlo":
+        raise ValueError(f"Unknown sampling method {method!r}")
+    return np.random.default_rng(seed).integers(0, WEIGHT_POSITIONS, (samples, index.n_dimensions), dtype=np.int8)
+
+
+def is_ready(readiness, threshold=NEUTRAL):
+    # Verdict of a readiness score; the tolerance keeps e.g. all-neutral answers (3.0 up to rounding) on one side
+    return np.asarray(readiness) >= threshold - 1e-9
+
+
+def _readiness(dimension_scores, weights):
+    return readiness_scores(apply_weights(dimension_scores, weights), weights)
+
+
+def sensitivity(dimension_scores, weights, samples=1_000_000, method="monte_carlo", levels=7, threshold=NEUTRAL,
+                seed=None, chunk_size=1 << 17, index=DEFAULT_INDEX):
+    """Readiness of one assessment under many weight vectors on the slider grid.
+
+    The weighting rule is broadcast once over (slider positions x dimensions); every sampled vector
+    then only gathers its per-dimension terms from that table, so a million samples stay well
+    below a second. Samples are processed in chunks of `chunk_size` rows to bound memory.
+    """
+    scores = np.asarray(dimension_scores, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    current = float(_readiness(scores, weights))
+    ready = bool(is_ready(current, threshold))
+
+    # terms[d * positions + p]: weighted score times weight of dimension d at slider position p
+    levels_ = weight_levels()
+    terms = (apply_weights(scores, levels_[:, None]) * levels_[:, None]).T.ravel()
+    offsets = np.arange(index.n_dimensions, dtype=np.intp) * WEIGHT_POSITIONS
+
+    positions = sample_positions(samples, method, levels, seed, index)
+    n = len(positions)
+    readiness = np.empty(n)
+    totals = np.zeros(terms.size)
+    flips = np.zeros(terms.size)
+    for start in range(0, n, chunk_size):
+        cells = positions[start:start + chunk_size] + offsets
+        total_weight = cells.sum(axis=1) - offsets.sum()
+        chunk = np.divide(terms[cells].sum(axis=1), total_weight * WEIGHT_STEP,
+                          out=np.zeros(len(cells)), where=total_weight != 0)
+        readiness[start:start + chunk_size] = chunk
+        # Count samples and verdict flips per (dimension, slider position)
+        totals += np.bincount(cells.ravel(), minlength=terms.size)
+        flips += np.bincount(cells[is_ready(chunk, threshold) != ready].ravel(), minlength=terms.size)
+
+    histogram, histogram_edges = np.histogram(readiness, bins=50, range=(0, MAX_SCORE))
+    percentiles = dict(zip((5, 25, 50, 75, 95), np.percentile(readiness, (5, 25, 50, 75, 95)).tolist()))
+    shape = (index.n_dimensions, WEIGHT_POSITIONS)
+
+    # Local slopes by central differences (one-sided at the slider bounds)
+    h = WEIGHT_STEP / 10
+    eye = np.eye(index.n_dimensions)
+    upper = np.minimum(weights + h * eye, WEIGHT_RANGE[1])
+    lower = np.maximum(weights - h * eye, WEIGHT_RANGE[0])
+    slopes = (_readiness(scores, upper) - _readiness(scores, lower)) / np.diag(upper - lower)
+    elasticities = slopes * weights / current if current else np.full(index.n_dimensions, np.nan)
+
+    # Move one slider at a time over all positions, the others fixed, and record where the verdict changes
+    swept = np.repeat(weights[None, None, :], WEIGHT_POSITIONS, axis=1).repeat(index.n_dimensions, axis=0)
+    swept[np.arange(index.n_dimensions), :, np.arange(index.n_dimensions)] = levels_
+    verdicts = is_ready(_readiness(scores, swept), threshold)
+    flip_points = {}
+    for d, dimension in enumerate(index.dimensions):
+        changes = np.flatnonzero(verdicts[d, 1:] != verdicts[d, :-1]) + 1
+        flip_points[dimension] = [round(float(levels_[i]), 1) for i in changes]
+
+    return Sensitivity(
+        samples=n, readiness=current, threshold=threshold, ready=ready,
+        mean=float(readiness.mean()), std=float(readiness.std()), percentiles=percentiles,
+        histogram=histogram, histogram_edges=histogram_edges,
+        flip_share=float(flips[:WEIGHT_POSITIONS].sum() / n), slopes=slopes, elasticities=elasticities,
+        flip_rates=np.divide(flips, totals, out=np.zeros_like(flips), where=totals > 0).reshape(shape),
+        weight_levels=levels_, flip_points=flip_points, index=index)
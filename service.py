@@ -0,0 +1,323 @@
+"""Local HTTP service for scores, weighting and PDF reports, for other internal tools.
+
+    python service.py [--host 127.0.0.1] [--port 8600] [--workers 2] [--profiles profiles.json]
+
+Endpoints (JSON in and out unless noted):
+    POST /score    {"responses": {...}} or {"answers": [61 answers by question id, 0 = unanswered]},
+                   optional "dimension_weights" or "profile"; or {"assessments": [...]} for a batch
+    POST /weights  {"dimension_scores": {dimension: score}, "dimension_weights": {...}} -> weighted scores, readiness
+    POST /report   one assessment as for /score -> application/pdf
+    GET  /profiles, /health, /metrics (Prometheus text)
+
+Concurrent /score requests are coalesced into one vectorized scoring call. Reports are rendered in
+a process pool; identical report requests in flight share one rendering, and when more distinct
+reports are queued than MAX_QUEUED_REPORTS per worker the service answers 503 with Retry-After
+instead of queueing without bound. uvicorn additionally caps open connections (--max-connections).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+import cli
+import instrumentation
+import reports
+import scoring
+from response_store import ResponseStore
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH = 512  # /score requests scored in one call
+BATCH_DELAY = 0.002  # seconds a /score request waits for others to join its batch
+MAX_QUEUED_REPORTS = 8  # distinct reports waiting per worker before new ones are refused
+REPORT_CACHE_SIZE = 64  # finished reports kept for repeated requests
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ScoreBatcher:
+    """Coalesces concurrent score requests into one scoring.score call on the event loop."""
+
+    def __init__(self, max_batch=MAX_BATCH, delay=BATCH_DELAY, index=scoring.DEFAULT_INDEX):
+        self.max_batch = max_batch
+        self.delay = delay
+        self.index = index
+        self.batches = 0
+        self._pending = []  # (answers, weight vector, future)
+        self._timer = None
+
+    async def score(self, answers, weights):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((answers, weights, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        answers, weights, futures = zip(*batch)
+        try:
+            with instrumentation.stage("score_aggregation"):
+                weights = np.stack(weights)
+                scores = scoring.score(scoring.answer_matrix(np.stack(answers), self.index), weights, self.index)
+                results = [result(scores, weights, row) for row in range(len(futures))]
+        except Exception as error:
+            # Every request of the batch fails with the error instead of waiting forever
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, scored in zip(futures, results):
+            if not future.done():  # the client may have gone away
+                future.set_result(scored)
+
+
+class ReportRenderer:
+    """PDF reports in a process pool, with coalescing of identical requests and a bounded queue."""
+
+    def __init__(self, workers, max_queued=MAX_QUEUED_REPORTS, cache_size=REPORT_CACHE_SIZE):
+        self.workers = workers
+        self.limit = workers * (1 + max_queued)
+        self.cache_size = cache_size
+        self.coalesced = 0
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._inflight = {}  # key -> future of the rendering
+        self._cache = OrderedDict()  # key -> PDF bytes, least recently used first
+
+    def queued(self):
+        return len(self._inflight)
+
+    async def render(self, answers, dimension_weights):
+        key = hashlib.sha256(answers.tobytes() + json.dumps(dimension_weights, sort_keys=True).encode()).hexdigest()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            instrumentation.count("report_cache_hit")
+            return self._cache[key]
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            instrumentation.count("report_coalesced")
+            return (await asyncio.shield(future))[1]
+        if len(self._inflight) >= self.limit:
+            raise Overloaded
+        future = asyncio.get_running_loop().run_in_executor(
+            self._pool, reports.render_job, (key, ResponseStore(answers), dimension_weights))
+        self._inflight[key] = future
+        # Bookkeeping on completion rather than in this coroutine, which is cancelled if its client goes away
+        future.add_done_callback(lambda done: self._finished(key, done))
+        with instrumentation.stage("report_rendering"):
+            _, pdf, _, _ = await asyncio.shield(future)
+        return pdf
+
+    def _finished(self, key, future):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._cache[key] = future.result()[1]
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+
+def result(scores, weights, row=0):
+    # JSON document of one scored assessment
+    index = scores.index
+    return {
+        "readiness": float(scores.readiness[row]),
+        "ready": bool(scoring.is_ready(scores.readiness[row])),
+        "dimension_weights": dict(zip(index.dimensions, weights[row].tolist())),
+        "dimensions": dict(zip(index.dimensions, scores.dimension_means[row].tolist())),
+        "weighted": dict(zip(index.dimensions, scores.weighted[row].tolist())),
+        "subdimensions": {f"{dimension}/{subdimension}": value for (dimension, subdimension), value
+                          in zip(index.subdimensions, scores.subdimension_means[row].tolist())},
+    }
+
+
+def parse_weights(document, profiles, index=scoring.DEFAULT_INDEX):
+    # {dimension: weight} from "dimension_weights" or a named "profile"; None means all 1.0
+    name = document.get("profile")
+    if name is not None:
+        if name not in profiles:
+            raise ValueError(f"Unknown profile {name!r}")
+        if profiles[name] is not None:
+            return profiles[name]  # "own" falls through to the weights sent with the assessment
+    weights = document.get("dimension_weights")
+    if weights is None:
+        return None
+    if not isinstance(weights, dict):
+        raise ValueError("dimension_weights must be an object of dimension: weight")
+    unknown = set(weights) - set(index.dimensions)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s) {', '.join(sorted(unknown))}")
+    if not all(isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in weights.values()):
+        raise ValueError("Weights must be numbers")
+    low, high = scoring.WEIGHT_RANGE
+    weights = {dimension: float(weight) for dimension, weight in weights.items()}
+    if not all(low <= weight <= high for weight in weights.values()):
+        raise ValueError(f"Weights must be between {low} and {high}")
+    return weights
+
+
+def parse_assessment(document, profiles, index=scoring.DEFAULT_INDEX):
+    # (int8 answers by question id, dimension_weights) of one assessment document; raises ValueError
+    if not isinstance(document, dict):
+        raise ValueError("Expected a JSON object")
+    if "answers" in document:
+        answers = np.asarray(document["answers"])
+        if answers.dtype.kind not in "iu" or answers.shape != (index.n_questions,) or not np.isin(answers, (0, 1, 2, 3, 4, 5)).all():
+            raise ValueError(f"answers must be {index.n_questions} integers 0-5 indexed by question id")
+        answers = answers.astype(np.int8)
+    elif isinstance(document.get("responses"), dict):
+        answers = ResponseStore.from_dict(document["responses"]).answers
+    else:
+        raise ValueError('Expected "answers" or "responses"')
+    return answers, parse_weights(document, profiles, index)
+
+
+async def read_json(request):
+    # The body is counted while it arrives, so chunked requests and ones without Content-Length are limited too
+    if int(request.headers.get("content-length") or 0) > MAX_BODY_BYTES:
+        raise ValueError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as error:
+        raise ValueError(f"Invalid JSON: {error}") from error
+
+
+def error(message, status=400, **headers):
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+async def score_endpoint(request):
+    state = request.app.state
+    try:
+        document = await read_json(request)
+        if isinstance(document, dict) and "assessments" in document:
+            if not isinstance(document["assessments"], list):
+                raise ValueError("assessments must be a list of assessment objects")
+            # A batch is already one vectorized call, it does not wait for other requests
+            parsed = [parse_assessment(entry, state.profiles) for entry in document["assessments"]]
+            if not parsed:
+                return JSONResponse({"results": []})
+            answers = np.stack([answers for answers, _ in parsed])
+            weights = np.stack([scoring.weight_vector(dimension_weights) for _, dimension_weights in parsed])
+            with instrumentation.stage("score_aggregation"):
+                scores = scoring.score(scoring.answer_matrix(answers), weights)
+            return JSONResponse({"results": [result(scores, weights, row) for row in range(len(parsed))]})
+        answers, dimension_weights = parse_assessment(document, state.profiles)
+    except (ValueError, TypeError) as exception:
+        return error(str(exception))
+    return JSONResponse(await state.batcher.score(answers, scoring.weight_vector(dimension_weights)))
+
+
+async def weights_endpoint(request):
+    try:
+        document = await read_json(request)
+        dimension_scores = document.get("dimension_scores") if isinstance(document, dict) else None
+        if not isinstance(dimension_scores, dict) or set(dimension_scores) != set(scoring.DIMENSIONS):
+            raise ValueError(f"dimension_scores must have a score for each of: {', '.join(scoring.DIMENSIONS)}")
+        scores = np.array([float(dimension_scores[dimension]) for dimension in scoring.DIMENSIONS])
+        weights = scoring.weight_vector(parse_weights(document, request.app.state.profiles))
+    except (ValueError, TypeError) as exception:
+        return error(str(exception))
+    weighted = scoring.apply_weights(scores, weights)
+    readiness = float(scoring.readiness_scores(weighted, weights))
+    return JSONResponse({"readiness": readiness, "ready": bool(scoring.is_ready(readiness)),
+                         "weighted": dict(zip(scoring.DIMENSIONS, weighted.tolist()))})
+
+
+async def report_endpoint(request):
+    state = request.app.state
+    try:
+        answers, dimension_weights = parse_assessment(await read_json(request), state.profiles)
+        pdf = await state.renderer.render(answers, dimension_weights)
+    except (ValueError, TypeError) as exception:
+        return error(str(exception))
+    except Overloaded:
+        return error("Too many reports queued, retry later", status=503, **{"Retry-After": "5"})
+    return Response(pdf, media_type="application/pdf",
+                    headers={"Content-Disposition": 'attachment; filename="assessment_report.pdf"'})
+
+
+async def profiles_endpoint(request):
+    return JSONResponse({name: weights for name, weights in request.app.state.profiles.items() if weights is not None})
+
+
+async def health_endpoint(request):
+    state = request.app.state
+    return JSONResponse({"status": "ok", "score_batches": state.batcher.batches, "reports_queued": state.renderer.queued(),
+                         "reports_coalesced": state.renderer.coalesced, "report_workers": state.renderer.workers})
+
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(instrumentation.metrics.prometheus_text())
+
+
+def create_app(workers=2, profiles_path=None):
+    @asynccontextmanager
+    async def lifespan(app):
+        instrumentation.set_context("service")
+        app.state.profiles = cli.load_profiles(profiles_path)
+        app.state.batcher = ScoreBatcher()
+        app.state.renderer = ReportRenderer(workers)
+        try:
+            yield
+        finally:
+            app.state.renderer.close()
+
+    return Starlette(routes=[
+        Route("/score", score_endpoint, methods=["POST"]),
+        Route("/weights", weights_endpoint, methods=["POST"]),
+        Route("/report", report_endpoint, methods=["POST"]),
+        Route("/profiles", profiles_endpoint),
+        Route("/health", health_endpoint),
+        Route("/metrics", metrics_endpoint),
+    ], lifespan=lifespan)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=2, help="report rendering processes")
+    parser.add_argument("--profiles", metavar="FILE", help="JSON file with named weight profiles (see cli.py)")
+    parser.add_argument("--max-connections", type=int, default=1000,
+                        help="open connections before new ones get 503")
+    args = parser.parse_args()
+    try:
+        cli.load_profiles(args.profiles)  # fail with a message before the server starts, not in its lifespan
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    uvicorn.run(create_app(args.workers, args.profiles), host=args.host, port=args.port,
+                limit_concurrency=args.max_connections, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import threading
+import uuid
+
+import streamlit as st
+
+import collaboration
+import instrumentation
+import jobs
+import questions
+import scoring
+import storage
+from response_store import ResponseStore
+
+
+@st.cache_resource
+def warm_up():
+    # Once per server process, in the background: the first visit of a chart or export page then finds
+    # Matplotlib, its fonts, the Plotly template and fpdf2 already loaded
+    if os.environ.get("IIP_WARM_UP", "1") != "1":
+        return None
+    # pandas is imported up front, not in the thread: Plotly looks it up in sys.modules without the import
+    # lock, so a half-imported pandas in one thread breaks figure construction in the other
+    import pandas  # noqa: F401
+
+    def run():
+        with instrumentation.stage("warm_up"):
+            import charts
+            import reports
+
+            charts.warm_up()
+            reports.warm_up()
+
+    thread = threading.Thread(target=run, name="iip-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource
+def get_storage():
+    # One SQLite repository and write-behind queue per server process, shared by all sessions
+    return storage.AssessmentStorage(storage.SQLiteRepository())
+
+
+@st.cache_resource
+def get_export_queue():
+    # Background PDF exports of all sessions, rendered by a small pool of worker processes
+    return jobs.ExportQueue()
+
+
+@st.cache_resource
+def get_collaboration():
+    # Shared (multi-rater) assessments of this process, kept in memory and shared by all sessions
+    return collaboration.SharedAssessments(get_storage())
+
+
+def init_session(page=None):
+    # Make sure every session has a response store and an assessment id, and show the resume controls
+    if '_metrics_session' not in st.session_state:
+        st.session_state._metrics_session = uuid.uuid4().hex[:8]
+    # Everything timed during this run is recorded for this page and session
+    st.session_state._metrics_page = page
+    restore_metrics_context()
+    warm_up()
+    instrumentation.count("reruns")
+    with instrumentation.stage("session_init"):
+        if 'responses' not in st.session_state:
+            st.session_state.responses = ResponseStore()
+        if 'assessment_id' not in st.session_state:
+            st.session_state.assessment_id = uuid.uuid4().hex[:12]
+        assessment_sidebar()
+    if debug_panel_enabled():
+        debug_panel()
+    return st.session_state.responses
+
+
+def restore_metrics_context():
+    # Fragment reruns run on a new script thread without passing through init_session
+    instrumentation.set_context(st.session_state.get('_metrics_page'), st.session_state.get('_metrics_session'))
+
+
+def save_session():
+    # Queue the current answers for the write-behind; nothing is written while the store version and weights are unchanged
+    store = st.session_state.responses
+    weights = st.session_state.get('dimension_weights')
+    snapshot = (store.version, tuple(sorted((weights or {}).items())))
+    if store.answered() and st.session_state.get('_saved_snapshot') != snapshot:
+        get_storage().save(st.session_state.assessment_id, store, weights)
+        st.session_state._saved_snapshot = snapshot
+    # The other raters see a changed answer right away; an unchanged store is a no-op
+    joined = shared_assessment()
+    if joined is not None:
+        joined[0].submit(joined[1], store.answers)
+
+
+def shared_assessment():
+    # (SharedAssessment, rater name) this session rates, or None
+    joined = st.session_state.get('_shared')
+    if joined is None:
+        return None
+    shared_id, rater = joined
+    return get_collaboration().get(shared_id), rater
+
+
+def join_shared_assessment(shared_id, rater):
+    # Rate `shared_id` as `rater`: a rater who joined before continues with their own earlier answers
+    save_session()
+    _, assessment_id = get_collaboration().join(shared_id, rater, st.session_state.assessment_id)
+    if assessment_id != st.session_state.assessment_id and not resume_assessment(assessment_id):
+        # Joined before but never answered anything, so nothing was saved
+        st.session_state.responses = ResponseStore()
+        st.session_state.assessment_id = assessment_id
+        reset_answer_widgets()
+    st.session_state._shared = (shared_id, rater)
+    save_session()
+
+
+def resume_assessment(assessment_id):
+    loaded = get_storage().load(assessment_id)
+    if loaded is None:
+        return False
+    store, dimension_weights, _ = loaded
+    st.session_state.responses = store
+    st.session_state.assessment_id = assessment_id
+    st.session_state._saved_snapshot = None
+    st.session_state.pop('_shared', None)  # the resumed answers are not this session's rating
+    if dimension_weights:
+        st.session_state.dimension_weights = dimension_weights
+    reset_answer_widgets()
+    reset_weight_widgets()
+    return True
+
+
+def reset_answer_widgets():
+    # Drop the widget state of the radios so they show the answers of the current store
+    for question in questions.load_question_bank().questions:
+        st.session_state.pop(f"q{question.id}", None)
+
+
+def weight_key(dimension):
+    # Session state key of a dimension's weight slider on the Results page
+    return f"weight_{dimension}"
+
+
+def reset_weight_widgets():
+    # Drop the state of the weight sliders so they show the weights of the current assessment
+    for dimension in scoring.DIMENSIONS:
+        st.session_state.pop(weight_key(dimension), None)
+
+
+def assessment_sidebar():
+    st.sidebar.caption(f"Assessment ID: `{st.session_state.assessment_id}`")
+    with st.sidebar.expander("Resume an assessment"):
+        with st.form("resume_assessment", clear_on_submit=True, border=False):
+            assessment_id = st.text_input("Assessment ID").strip()
+            if st.form_submit_button("Resume") and assessment_id:
+                if resume_assessment(assessment_id):
+                    st.rerun()
+                else:
+                    st.error(f"No saved assessment with ID {assessment_id}.")
+    shared_sidebar()
+
+
+def shared_sidebar():
+    # Join a shared assessment to rate one use case together with others; everyone's answers stay separate
+    joined = st.session_state.get('_shared')
+    with st.sidebar.expander("Rate together", expanded=joined is not None):
+        if joined is not None:
+            shared_id, rater = joined
+            st.caption(f"Rating shared assessment `{shared_id}` as **{rater}**. Results and Summary show the "
+                       f"consensus of all raters.")
+            if st.button("Leave", help="Your answers stay part of the shared assessment"):
+                del st.session_state._shared
+                st.rerun()
+            return
+        with st.form("join_shared", clear_on_submit=True, border=False):
+            shared_id = st.text_input("Shared assessment ID", help="Leave empty to start a new shared assessment").strip()
+            rater = st.text_input("Your name", help="Joining again under the same name continues your answers").strip()
+            if st.form_submit_button("Join") and rater:
+                join_shared_assessment(shared_id or uuid.uuid4().hex[:12], rater)
+                st.rerun()
+
+
+def debug_panel_enabled():
+    # Opened with ?debug=1 in the URL, or for every session with IIP_DEBUG_PANEL=1
+    return os.environ.get("IIP_DEBUG_PANEL") == "1" or st.query_params.get("debug") == "1"
+
+
+def debug_panel():
+    # Timings recorded so far (i.e. up to the previous rerun) for this session and for the whole server process
+    def table(rows):
+        return {"Page": [row[0] for row in rows], "Stage": [row[1] for row in rows], "Runs": [row[2] for row in rows],
+                "Mean (ms)": [round(row[3] / row[2] * 1000, 2) for row in rows],
+                "Max (ms)": [round(row[4] * 1000, 2) for row in rows],
+                "Last (ms)": [round(row[5] * 1000, 2) for row in rows]}
+
+    with st.sidebar.expander("Performance"):
+        st.caption("This session")
+        st.dataframe(table(instrumentation.metrics.timings(st.session_state._metrics_session)), hide_index=True)
+        st.caption("All sessions")
+        st.dataframe(table(instrumentation.metrics.timings()), hide_index=True)
+        counters = instrumentation.metrics.counters()
+        st.dataframe({"Page": [row[0] for row in counters], "Counter": [row[1] for row in counters],
+                      "Value": [row[2] for row in counters]}, hide_index=True)
@@ -0,0 +1,428 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import history
+import instrumentation
+import questions
+from response_store import ResponseStore
+
+logger = logging.getLogger(__name__)
+
+# Default database next to the app; override with IIP_DB_PATH
+DEFAULT_DB_PATH = os.environ.get("IIP_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assessments.db"))
+
+
+def _answer_matrix(rows):
+    if not rows:
+        return np.zeros((0, len(questions.load_question_bank())), dtype=np.int8)
+    return np.stack(rows).astype(np.int8, copy=False)
+
+
+class AssessmentRepository:
+    """Minimal storage interface for assessments, keyed by assessment id."""
+
+    def save(self, assessment_id, store, dimension_weights=None, name=None):
+        self.save_many([(assessment_id, store.answers, dimension_weights, name)])
+
+    def save_many(self, records):
+        # records: iterable of (assessment_id, answers array, dimension_weights, name)
+        raise NotImplementedError
+
+    def load(self, assessment_id):
+        # Returns (ResponseStore, dimension_weights, name) or None if the id is unknown
+        raise NotImplementedError
+
+    def list(self):
+        # Returns [(assessment_id, name, updated_at)] with the most recently updated first
+        raise NotImplementedError
+
+    def version(self):
+        # Returns (number of assessments, latest updated_at); changes whenever an assessment is saved or deleted
+        saved = self.list()
+        return len(saved), max((updated_at for _, _, updated_at in saved), default=None)
+
+    def load_all(self):
+        # Returns (ids, names, answers matrix (N x questions, int8), [dimension_weights]) of every assessment
+        ids, names, rows, weights = [], [], [], []
+        for assessment_id, name, _ in self.list():
+            store, dimension_weights, _ = self.load(assessment_id)
+            ids.append(assessment_id)
+            names.append(name)
+            rows.append(store.answers)
+            weights.append(dimension_weights)
+        return ids, names, _answer_matrix(rows), weights
+
+    def iter_chunks(self, chunk_size=1000):
+        # Yields (ids, names, answers, [dimension_weights]) of at most chunk_size assessments at a time
+        ids, names, answers, weights = self.load_all()
+        for start in range(0, len(ids), chunk_size):
+            stop = start + chunk_size
+            yield ids[start:stop], names[start:stop], answers[start:stop], weights[start:stop]
+
+    def delete(self, assessment_id):
+        raise NotImplementedError
+
+    def revisions(self, assessment_id, first=1, last=None):
+        # Returns [(revision, created_at, checkpoint, changes, weights)] of the saved revisions first..last
+        # (to the latest if last is None) as encoded by history.encode, oldest first
+        raise NotImplementedError
+
+    def latest_checkpoint(self, assessment_id, revision=None):
+        # Number of the last checkpoint revision at or before `revision` (or of all), 0 if there is none
+        raise NotImplementedError
+
+    def add_rater(self, shared_id, rater, assessment_id):
+        # Records that `rater` rates shared assessment `shared_id` with the answers saved under `assessment_id`;
+        # returns the assessment id recorded earlier if the rater already joined
+        raise NotImplementedError
+
+    def raters(self, shared_id):
+        # Returns [(rater, assessment_id)] of a shared assessment in the order they joined
+        raise NotImplementedError
+
+
+class SQLiteRepository(AssessmentRepository):
+    """SQLite in WAL mode; answers are stored as the raw int8 array of the response store."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        # One connection shared by all sessions of this process, serialized by a lock
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL lets readers (other server processes, the CLI) work while a batch is being written
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS assessments (
+                    id TEXT PRIMARY KEY,
+                    name TEXT,
+                    answers BLOB NOT NULL,
+                    weights TEXT,
+                    updated_at REAL NOT NULL
+                )""")
+            # Every save that changes answers or weights adds a revision: a full checkpoint or a delta
+            # against the one before (see history.py); `revision` in assessments is the latest one
+            if "revision" not in {row[1] for row in self._connection.execute("PRAGMA table_info(assessments)")}:
+                self._connection.execute("ALTER TABLE assessments ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS revisions (
+                    assessment_id TEXT NOT NULL,
+                    revision INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    checkpoint INTEGER NOT NULL,
+                    changes BLOB NOT NULL,
+                    weights TEXT,
+                    PRIMARY KEY (assessment_id, revision)
+                ) WITHOUT ROWID""")
+            # Raters of shared assessments; each rater's answers are an ordinary assessment
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS raters (
+                    shared_id TEXT NOT NULL,
+                    rater TEXT NOT NULL,
+                    assessment_id TEXT NOT NULL,
+                    PRIMARY KEY (shared_id, rater)
+                )""")
+
+    def save_many(self, records):
+        now = time.time()
+        rows = [(assessment_id, name, np.asarray(answers, dtype=np.int8).tobytes(), json.dumps(dimension_weights or {}), now)
+                for assessment_id, answers, dimension_weights, name in records]
+        with self._lock:
+            # A single transaction per batch instead of one commit per answer; revisions are written in the same one
+            self._connection.execute("BEGIN")
+            try:
+                latest = self._latest_states({row[0] for row in rows})
+                revisions = []
+                for assessment_id, _, answers, weights, _ in rows:
+                    previous_answers, previous_weights, revision = latest.get(assessment_id, (None, None, 0))
+                    if answers == previous_answers and weights == previous_weights:
+                        continue
+                    revision += 1
+                    checkpoint, changes, changed_weights = history.encode(revision, answers, weights,
+                                                                          previous_answers, previous_weights)
+                    revisions.append((assessment_id, revision, now, checkpoint, changes, changed_weights))
+                    latest[assessment_id] = (answers, weights, revision)
+                self._connection.executemany("""
+                    INSERT INTO assessments (id, name, answers, weights, updated_at, revision) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET name = COALESCE(excluded.name, name), answers = excluded.answers,
+                                                  weights = excluded.weights, updated_at = excluded.updated_at,
+                                                  revision = excluded.revision""",
+                                             [row + (latest[row[0]][2],) for row in rows])
+                self._connection.executemany("""
+                    INSERT INTO revisions (assessment_id, revision, created_at, checkpoint, changes, weights)
+                    VALUES (?, ?, ?, ?, ?, ?)""", revisions)
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _latest_states(self, assessment_ids, chunk_size=500):
+        # {assessment_id: (answers, weights, revision)} as currently stored; the caller holds the lock
+        latest = {}
+        assessment_ids = list(assessment_ids)
+        for start in range(0, len(assessment_ids), chunk_size):
+            chunk = assessment_ids[start:start + chunk_size]
+            latest.update((row[0], row[1:]) for row in self._connection.execute(
+                f"SELECT id, answers, weights, revision FROM assessments WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk))
+        return latest
+
+    def load(self, assessment_id):
+        with self._lock:
+            row = self._connection.execute("SELECT answers, weights, name FROM assessments WHERE id = ?",
+                                           (assessment_id,)).fetchone()
+        if row is None:
+            return None
+        answers, weights, name = row
+        return ResponseStore(np.frombuffer(answers, dtype=np.int8).copy()), json.loads(weights) or None, name
+
+    def list(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT id, name, updated_at FROM assessments ORDER BY updated_at DESC").fetchall()
+
+    def version(self):
+        with self._lock:
+            return tuple(self._connection.execute("SELECT COUNT(*), MAX(updated_at) FROM assessments").fetchone())
+
+    def load_all(self):
+        # One query for the whole table instead of one load per assessment
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, name, answers, weights FROM assessments ORDER BY updated_at DESC").fetchall()
+        answers = _answer_matrix([np.frombuffer(row[2], dtype=np.int8) for row in rows])
+        return [row[0] for row in rows], [row[1] for row in rows], answers, [json.loads(row[3]) or None for row in rows]
+
+    def iter_chunks(self, chunk_size=1000):
+        # Keyset pagination: one short query per chunk, so the lock is never held while the caller works on a chunk
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT id, name, answers, weights FROM assessments WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield ([row[0] for row in rows], [row[1] for row in rows],
+                   _answer_matrix([np.frombuffer(row[2], dtype=np.int8) for row in rows]),
+                   [json.loads(row[3]) or None for row in rows])
+            last_id = rows[-1][0]
+
+    def delete(self, assessment_id):
+        # The assessment with its revisions and shared-assessment ratings, in one transaction
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute("DELETE FROM assessments WHERE id = ?", (assessment_id,))
+                self._connection.execute("DELETE FROM revisions WHERE assessment_id = ?", (assessment_id,))
+                self._connection.execute("DELETE FROM raters WHERE assessment_id = ?", (assessment_id,))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def revisions(self, assessment_id, first=1, last=None):
+        with self._lock:
+            return self._connection.execute("""
+                SELECT revision, created_at, checkpoint, changes, weights FROM revisions
+                WHERE assessment_id = ? AND revision >= ? AND revision <= ? ORDER BY revision""",
+                (assessment_id, first, last if last is not None else 2 ** 62)).fetchall()
+
+    def latest_checkpoint(self, assessment_id, revision=None):
+        with self._lock:
+            row = self._connection.execute("""
+                SELECT MAX(revision) FROM revisions WHERE assessment_id = ? AND checkpoint AND revision <= ?""",
+                (assessment_id, revision if revision is not None else 2 ** 62)).fetchone()
+        return row[0] or 0
+
+    def add_rater(self, shared_id, rater, assessment_id):
+        with self._lock:
+            self._connection.execute("INSERT OR IGNORE INTO raters (shared_id, rater, assessment_id) VALUES (?, ?, ?)",
+                                     (shared_id, rater, assessment_id))
+            return self._connection.execute("SELECT assessment_id FROM raters WHERE shared_id = ? AND rater = ?",
+                                            (shared_id, rater)).fetchone()[0]
+
+    def raters(self, shared_id):
+        with self._lock:
+            return self._connection.execute("SELECT rater, assessment_id FROM raters WHERE shared_id = ? ORDER BY rowid",
+                                            (shared_id,)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class WriteBehindQueue:
+    """Debounced write-behind buffer in front of a repository.
+
+    `submit` only records the latest state of an assessment in memory. A background thread
+    writes everything that changed in one batch once no new submission arrived for `delay`
+    seconds (or at the latest after `max_delay`), so a burst of radio clicks costs one write.
+    """
+
+    def __init__(self, repository, delay=1.0, max_delay=5.0):
+        self.repository = repository
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = {}  # assessment_id -> (answers, dimension_weights, name)
+        self._first_submit = None
+        self._last_submit = None
+        self._condition = threading.Condition()
+        # Taking a batch and writing it is one step, so a flush never overwrites the states of a later one
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._retry_at = 0.0  # no background write before this time after a failed one
+        self._failures = 0  # failed background writes in a row
+        self.writes = 0  # batches written
+        self.coalesced = 0  # submissions that replaced a still pending one
+        self.failed = 0  # batches that could not be written (and were queued again)
+        self._thread = threading.Thread(target=self._run, name="iip-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, assessment_id, store, dimension_weights=None, name=None):
+        with self._condition:
+            if assessment_id in self._pending:
+                self.coalesced += 1
+            # Copy, so later clicks in the session do not change what is written
+            self._pending[assessment_id] = (store.answers.copy(), dict(dimension_weights or {}), name)
+            now = time.monotonic()
+            self._first_submit = self._first_submit or now
+            self._last_submit = now
+            self._condition.notify()
+
+    def pending(self, assessment_id):
+        # Latest not yet written state, so a resume never sees an older version than was submitted
+        with self._condition:
+            return self._pending.get(assessment_id)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, {}
+                self._first_submit = self._last_submit = None
+            if not batch:
+                return
+            try:
+                with instrumentation.stage("storage_write"):
+                    self.repository.save_many((assessment_id, answers, weights, name)
+                                              for assessment_id, (answers, weights, name) in batch.items())
+            except Exception:
+                # Queue the batch again; states submitted since it was taken are newer and stay
+                with self._condition:
+                    for assessment_id, state in batch.items():
+                        self._pending.setdefault(assessment_id, state)
+                    now = time.monotonic()
+                    self._first_submit = self._first_submit or now
+                    self._last_submit = self._last_submit or now
+                self.failed += 1
+                instrumentation.count("storage_write_failed")
+                raise
+            self.writes += 1
+
+    def discard(self, assessment_id):
+        # Forget the pending state of an assessment; waits for a flush in progress, which may still be writing it
+        with self._flush_lock:
+            with self._condition:
+                self._pending.pop(assessment_id, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = max(min(self._last_submit + self.delay, self._first_submit + self.max_delay), self._retry_at)
+                if now < due:
+                    self._condition.wait(due - now)
+                    continue
+            try:
+                self.flush()
+                self._failures = 0
+            except Exception:
+                # E.g. a locked database: keep the answers and try again later, backing off up to a minute
+                self._failures += 1
+                backoff = min(self.delay * 2 ** self._failures, 60.0)
+                logger.exception("Writing %d assessments failed, retrying in %.1f s", len(self._pending), backoff)
+                self._retry_at = time.monotonic() + backoff
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=self.max_delay)
+        self.flush()
+
+
+class AssessmentStorage:
+    """Repository plus write-behind queue; reads see pending writes first."""
+
+    def __init__(self, repository, delay=1.0, max_delay=5.0):
+        self.repository = repository
+        self.queue = WriteBehindQueue(repository, delay=delay, max_delay=max_delay)
+
+    def save(self, assessment_id, store, dimension_weights=None, name=None):
+        self.queue.submit(assessment_id, store, dimension_weights, name)
+
+    def delete(self, assessment_id):
+        # Pending edits first, so the write-behind queue cannot bring the assessment back afterwards
+        self.queue.discard(assessment_id)
+        with instrumentation.stage("storage_write"):
+            self.repository.delete(assessment_id)
+
+    def save_many(self, records):
+        # Bulk writes (imports) go straight to the repository in one transaction, after any queued edits
+        self.queue.flush()
+        with instrumentation.stage("storage_write"):
+            self.repository.save_many(records)
+
+    def load(self, assessment_id):
+        pending = self.queue.pending(assessment_id)
+        if pending is not None:
+            answers, weights, name = pending
+            return ResponseStore(answers.copy()), weights or None, name
+        with instrumentation.stage("storage_read"):
+            return self.repository.load(assessment_id)
+
+    def list(self):
+        self.queue.flush()
+        return self.repository.list()
+
+    def version(self):
+        self.queue.flush()  # nothing to write unless a session saved since the last flush
+        return self.repository.version()
+
+    def load_all(self):
+        self.queue.flush()
+        with instrumentation.stage("storage_read"):
+            return self.repository.load_all()
+
+    def iter_chunks(self, chunk_size=1000):
+        self.queue.flush()
+        return self.repository.iter_chunks(chunk_size)
+
+    def add_rater(self, shared_id, rater, assessment_id):
+        return self.repository.add_rater(shared_id, rater, assessment_id)
+
+    def raters(self, shared_id):
+        with instrumentation.stage("storage_read"):
+            return self.repository.raters(shared_id)
+
+    def revisions(self, assessment_id, first=1, last=None):
+        self.queue.flush()
+        with instrumentation.stage("storage_read"):
+            return self.repository.revisions(assessment_id, first, last)
+
+    def latest_checkpoint(self, assessment_id, revision=None):
+        self.queue.flush()
+        return self.repository.latest_checkpoint(assessment_id, revision)
@@ -1,16 +1,12 @@
 import streamlit as st
+import session
 
 #initialize page
 st.set_page_config(page_title="Business Use-Case IIP-Assessment",
                    layout="centered")
 
-# Initialize default responses with neutral value (3) if not already done
-if 'responses' not in st.session_state:
-    st.session_state.responses = {dimension: 3 for dimension in [
-        "Accessibility", "Use Case Specifics", "Business & Economy",
-         "Collaboration & Interaction", "Presence", "Simulation & Modeling", 
-        "Technical Infrastructure"
-    ]}
+# Initialize an empty response store and an assessment id if not already done (unanswered questions count as neutral (3))
+session.init_session(page="Start")
 
 st.title("Prototype: IIP-Assessment Model")
 st.markdown("""
@@ -28,7 +24,7 @@ The assessment will guide you through the following eight empirical arised and v
 - **Technical Infrastructure**
 
 
-Each of these dimensions has been carefully chosen to reflect key aspects of a business use-case and its potential as an IIP. You will answer a series of questions related to each dimension, and the results will be visualized in real time. The survey will save your answers unless you don't refresh your browser. This survey takes about 20minutes.
+Each of these dimensions has been carefully chosen to reflect key aspects of a business use-case and its potential as an IIP. You will answer a series of questions related to each dimension, and the results will be visualized in real time. The survey saves your answers under the assessment ID shown in the sidebar. This survey takes about 20minutes.
 
 ---  
             
@@ -45,7 +41,7 @@ This tool is intended for **demonstration purposes** only and should not yet be
 1. You will assess your use-case alongsided of 8 core dimensions through reacting to various statements with term from *Strongly Disagree* to *Strongly Agree*.
 2. The tool will dynamically calculate the average score for each dimension and present your results in a **radar chart** at the end of the assessment.
 3. You can revisit any dimension at any time during the assessment to review or update your responses.
-4. ***WARNING:*** If you refresh your browser, all the data you've already entered will be lost. For this reason it is essential to navigate through the prototype using only the designated sidebar menu (left side of your screen!
+4. ***NOTE:*** Your answers are saved automatically under the assessment ID shown in the sidebar. If you refresh your browser, enter this ID under *Resume an assessment* to continue where you left off. Please navigate through the prototype using the designated sidebar menu (left side of your screen)!
 
 ---
 
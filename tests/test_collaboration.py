@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+import scoring
+from collaboration import SharedAssessment
+
+
+def answers(**by_question):
+    # Answers by question id from q<id>=value keywords, the rest unanswered
+    row = np.zeros(scoring.DEFAULT_INDEX.n_questions, dtype=np.int8)
+    for question, value in by_question.items():
+        row[int(question[1:])] = value
+    return row
+
+
+def test_kappa_matches_a_hand_computed_example():
+    # Three raters, two questions:   q0: 5 5 4   q1: 1 2 2
+    # Agreement per question: 1 agreeing pair of 3 -> 1/3 each, so P = 1/3
+    # Answer shares over the 6 ratings: 1: 1/6, 2: 2/6, 4: 1/6, 5: 2/6 -> Pe = 10/36
+    # kappa = (1/3 - 10/36) / (1 - 10/36) = 1/13
+    shared = SharedAssessment("example")
+    shared.submit("ann", answers(q0=5, q1=1))
+    shared.submit("bo", answers(q0=5, q1=2))
+    shared.submit("cy", answers(q0=4, q1=2))
+    consensus = shared.consensus()
+    assert math.isclose(consensus.kappa, 1 / 13)
+    assert np.allclose(consensus.agreement[:2], [1 / 3, 1 / 3])
+    assert np.allclose(consensus.means[:2], [14 / 3, 5 / 3])
+    assert np.allclose(consensus.variances[:2], [2 / 9, 2 / 9])
+    assert consensus.counts[:2].tolist() == [3, 3] and consensus.counts[2:].sum() == 0
+
+
+def test_resubmission_replaces_the_earlier_answers():
+    shared = SharedAssessment("example")
+    shared.submit("ann", answers(q0=5, q1=1))
+    shared.submit("bo", answers(q0=5, q1=2))
+    version = shared.submit("bo", answers(q0=5, q1=1))
+    assert shared.submit("bo", answers(q0=5, q1=1)) == version
+    consensus = shared.consensus()
+    assert consensus.version == version and len(consensus) == 2
+    assert consensus.kappa == 1.0  # every rater gave the same answers
+    assert consensus.counts[:2].tolist() == [2, 2]
+    assert shared.consensus() is consensus
+
+
+def test_consensus_scores_the_mean_answers():
+    rng = np.random.default_rng(0)
+    raters = rng.integers(1, scoring.MAX_SCORE + 1, (4, scoring.DEFAULT_INDEX.n_questions)).astype(np.int8)
+    shared = SharedAssessment("random")
+    for number, row in enumerate(raters):
+        shared.submit(f"rater {number}", row)
+    consensus = shared.consensus()
+    mean = raters.mean(axis=0)[scoring.DEFAULT_INDEX.ordered_ids]
+    assert np.allclose(consensus.dimension_scores(), scoring.score(mean[np.newaxis]).dimension_means[0])
+    assert np.array_equal(consensus.rater_scores.dimension_means,
+                          scoring.score(scoring.answer_matrix(raters)).dimension_means)
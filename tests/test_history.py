@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+import history
+import scoring
+from storage import SQLiteRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "assessments.db"))
+    yield repository
+    repository.close()
+
+
+def save_revisions(repository, rng, saves=150):
+    # Random edits of one assessment; returns {revision: (answers, weights)} as they were saved
+    n_questions = scoring.DEFAULT_INDEX.n_questions
+    answers = np.zeros(n_questions, dtype=np.int8)
+    weights = {}
+    truth = {}
+    for _ in range(saves):
+        if rng.random() < 0.1:
+            weights = {scoring.DIMENSIONS[rng.integers(len(scoring.DIMENSIONS))]: float(rng.integers(0, 21)) / 10}
+        else:
+            changed = rng.integers(0, n_questions, rng.integers(0, 6))
+            answers[changed] = rng.integers(0, scoring.MAX_SCORE + 1, len(changed))
+        repository.save_many([("a", answers.copy(), weights, None)])
+        revision = repository.revisions("a")[-1][0]
+        truth[revision] = (answers.copy(), weights or None)
+    return truth
+
+
+def test_load_equals_the_saved_state_at_random_revisions(repository):
+    rng = np.random.default_rng(7)
+    truth = save_revisions(repository, rng)
+    latest = max(truth)
+    assert latest > 3 * history.CHECKPOINT_EVERY
+    for revision in list(rng.choice(list(truth), 40)) + [1, history.CHECKPOINT_EVERY, history.CHECKPOINT_EVERY + 1, latest]:
+        state = history.load(repository, "a", int(revision))
+        answers, weights = truth[revision]
+        assert state.revision == revision
+        assert np.array_equal(state.answers, answers)
+        assert state.weights == weights
+    assert history.load(repository, "a").revision == latest
+    assert np.array_equal(repository.load("a")[0].answers, truth[latest][0])
+
+
+def test_unchanged_saves_add_no_revision(repository):
+    answers = np.full(scoring.DEFAULT_INDEX.n_questions, 4, dtype=np.int8)
+    repository.save_many([("a", answers, None, None)])
+    repository.save_many([("a", answers, None, "renamed")])
+    assert [row[0] for row in repository.revisions("a")] == [1]
+
+
+def test_load_of_a_missing_revision_is_none(repository):
+    truth = save_revisions(repository, np.random.default_rng(1), saves=5)
+    assert history.load(repository, "a", max(truth) + 1) is None
+    assert history.load(repository, "missing") is None
+
+
+def test_timeline_scores_every_revision(repository):
+    truth = save_revisions(repository, np.random.default_rng(3), saves=40)
+    revisions, scores = history.timeline(repository, "a")
+    assert [revision.revision for revision in revisions] == sorted(truth)
+    answers = np.array([truth[revision.revision][0] for revision in revisions])
+    weights = np.array([scoring.weight_vector(truth[revision.revision][1]) for revision in revisions])
+    expected = scoring.score(scoring.answer_matrix(answers), weights)
+    assert np.array_equal(scores.readiness, expected.readiness)
+
+
+def test_replay_needs_a_checkpoint_first():
+    _, changes, weights = history.encode(2, np.ones(4, np.int8).tobytes(), json.dumps({}),
+                                         np.zeros(4, np.int8).tobytes(), json.dumps({}))
+    with pytest.raises(ValueError):
+        list(history.replay([(2, 0.0, False, changes, weights)]))
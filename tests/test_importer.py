@@ -0,0 +1,57 @@
+import numpy as np
+
+import importer
+import scoring
+
+WEIGHT = f"weight:{scoring.DIMENSIONS[0]}"
+
+# Labels, padded numbers, blanks, out-of-range and non-integer answers, a bad weight, a repeated id,
+# a bare question number and a column that is no question
+EDGE_CASES = f"""assessment_id,name,{WEIGHT},q0,q1,2,q999
+a1,Plant,1.5,strongly agree, 4 ,,1
+a2,,3,6,abc,2.5,
+a1,Repeated,,1,2,3,
+,Blank id,, ,Neutral,5,
+""".encode()
+
+
+def test_edge_case_csv_reports_every_bad_cell():
+    result = importer.validate(importer.read_table(EDGE_CASES, "assessments.csv"))
+    errors = sorted(zip(result.errors["row"], result.errors["column"], result.errors["message"]))
+    assert errors == [
+        (2, "assessment_id", "Assessment ID appears more than once in the file"),
+        (3, "2", "Answer must be 1-5 or a Likert label"),
+        (3, "q0", "Answer must be 1-5 or a Likert label"),
+        (3, "q1", "Answer must be 1-5 or a Likert label"),
+        (3, WEIGHT, "Weight must be between 0.0 and 2.0"),
+        (4, "assessment_id", "Assessment ID appears more than once in the file"),
+    ]
+    # Only the last row is valid: a blank answer is unanswered, the label and the number are read as such
+    assert result.rows == [5] and result.names == ["Blank id"] and len(result) == 1
+    assert result.ids[0]  # a generated id
+    assert result.answers[0, :3].tolist() == [0, 3, 5]
+    assert result.weights == [None]
+    assert any("58 of 61" in warning for warning in result.warnings)
+
+
+def test_valid_rows_keep_labels_and_weights():
+    frame = importer.read_table(EDGE_CASES.splitlines(keepends=True)[0] + b"a1,Plant,1.5,strongly agree, 4 ,,1\n",
+                                "assessments.csv")
+    result = importer.validate(frame)
+    assert result.errors.empty
+    assert result.ids == ["a1"] and result.weights == [{scoring.DIMENSIONS[0]: 1.5}]
+    assert result.answers[0, :3].tolist() == [5, 4, 0]
+    expected = scoring.score(scoring.answer_matrix(result.answers), scoring.weight_vector(result.weights[0])[np.newaxis])
+    assert np.array_equal(result.scores.readiness, expected.readiness)
+
+
+def test_rows_below_the_answered_share_are_rejected():
+    result = importer.validate(importer.read_table(EDGE_CASES, "assessments.csv"), min_answered=0.5)
+    assert len(result) == 0
+    assert "at least 31 required" in result.errors["message"].iloc[-1]
+
+
+def test_template_round_trips():
+    frame = importer.read_table(importer.template_csv().encode(), "template.csv")
+    assert len(importer.question_columns(frame)) == scoring.DEFAULT_INDEX.n_questions
+    assert len(importer.validate(frame)) == 0 and not importer.validate(frame).warnings
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import scoring
+from response_store import ResponseStore
+
+
+def batch_scores(store):
+    return scoring.score(scoring.answer_matrix(store.answers[np.newaxis])).dimension_means[0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_scores_equal_batch_scores(seed):
+    rng = np.random.default_rng(seed)
+    n_questions = scoring.DEFAULT_INDEX.n_questions
+    store = ResponseStore(rng.integers(0, scoring.MAX_SCORE + 1, n_questions).astype(np.int8))
+    assert np.array_equal(store.dimension_scores(), batch_scores(store))
+    for question_id, value in zip(rng.integers(0, n_questions, 300), rng.integers(0, scoring.MAX_SCORE + 1, 300)):
+        store.set(int(question_id), int(value))
+        # Bit for bit, not approximately: the pages compare scores across reruns
+        assert np.array_equal(store.dimension_scores(), batch_scores(store))
+
+
+def test_set_stamps_only_the_changed_dimension():
+    store = ResponseStore()
+    dimension = scoring.DEFAULT_INDEX.id_dimension[0]
+    versions = store.versions.copy()
+    store.set(0, 5)
+    changed = np.flatnonzero(store.versions != versions)
+    assert changed.tolist() == [dimension]
+    version = store.version
+    store.set(0, 5)
+    assert store.version == version
+
+
+def test_set_rejects_answers_out_of_range():
+    with pytest.raises(ValueError):
+        ResponseStore().set(0, scoring.MAX_SCORE + 1)
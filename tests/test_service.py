@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import cli
+import scoring
+import service
+
+
+def post(path, body, chunks=1):
+    """(status, JSON document) of one POST to the app, with the body sent in `chunks` pieces.
+
+    Calls the ASGI app directly; the lifespan (and with it the report worker pool) is not started.
+    """
+    app = service.create_app()
+    app.state.profiles = cli.load_profiles(None)
+    app.state.batcher = service.ScoreBatcher()
+    body = body if isinstance(body, bytes) else json.dumps(body).encode()
+    size = -(-len(body) // chunks) or 1
+    pieces = [body[start:start + size] for start in range(0, max(len(body), 1), size)]
+    messages = [{"type": "http.request", "body": piece, "more_body": n < len(pieces) - 1} for n, piece in enumerate(pieces)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"content-type", b"application/json")], "server": ("test", 80), "client": ("test", 1)}
+    asyncio.run(app(scope, receive, send))
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    return status, json.loads(b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body"))
+
+
+ANSWERS = [3] * scoring.DEFAULT_INDEX.n_questions
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/score", b"{not json"),
+    ("/score", []),
+    ("/score", {"answers": ANSWERS[:-1]}),
+    ("/score", {"answers": [3.5] * len(ANSWERS)}),
+    ("/score", {"answers": ["3"] * len(ANSWERS)}),
+    ("/score", {"answers": [6] * len(ANSWERS)}),
+    ("/score", {"assessments": {"answers": ANSWERS}}),
+    ("/score", {"assessments": [{"answers": ANSWERS}, "not an assessment"]}),
+    ("/score", {"answers": ANSWERS, "dimension_weights": {scoring.DIMENSIONS[0]: None}}),
+    ("/score", {"answers": ANSWERS, "dimension_weights": {scoring.DIMENSIONS[0]: True}}),
+    ("/score", {"answers": ANSWERS, "dimension_weights": {scoring.DIMENSIONS[0]: 2.5}}),
+    ("/score", {"answers": ANSWERS, "dimension_weights": {"Unknown": 1.0}}),
+    ("/score", {"answers": ANSWERS, "profile": "unknown"}),
+    ("/weights", {"dimension_scores": {scoring.DIMENSIONS[0]: 3}}),
+    ("/weights", {"dimension_scores": dict.fromkeys(scoring.DIMENSIONS, "high")}),
+    ("/report", {"responses": "none"}),
+])
+def test_malformed_requests_get_400(path, body):
+    status, document = post(path, body)
+    assert status == 400 and document["error"]
+
+
+def test_oversized_bodies_are_refused_while_streaming():
+    body = json.dumps({"answers": ANSWERS, "padding": "x" * service.MAX_BODY_BYTES}).encode()
+    status, document = post("/score", body, chunks=8)
+    assert status == 400 and "larger than" in document["error"]
+
+
+def test_score_agrees_with_batch_scoring():
+    weights = {scoring.DIMENSIONS[0]: 2.0}
+    answers = np.random.default_rng(0).integers(0, scoring.MAX_SCORE + 1, len(ANSWERS))
+    status, single = post("/score", {"answers": answers.tolist(), "dimension_weights": weights})
+    assert status == 200
+    status, batch = post("/score", {"assessments": [{"answers": answers.tolist(), "dimension_weights": weights}]})
+    assert status == 200 and batch["results"] == [single]
+    expected = scoring.score(scoring.answer_matrix(answers[np.newaxis]), scoring.weight_vector(weights)[np.newaxis])
+    assert single["readiness"] == pytest.approx(float(expected.readiness[0]))
+
+
+def test_a_failed_batch_fails_every_request():
+    async def score_all():
+        batcher = service.ScoreBatcher()
+        good = np.full(len(ANSWERS), 3, dtype=np.int8)
+        return await asyncio.gather(batcher.score(good, scoring.weight_vector()),
+                                    batcher.score(good[:-1], scoring.weight_vector()), return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(score_all(), timeout=5))
+    assert all(isinstance(outcome, Exception) for outcome in results)
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+import pytest
+
+import scoring
+from response_store import ResponseStore
+from storage import AssessmentRepository, AssessmentStorage, SQLiteRepository, WriteBehindQueue
+
+
+class FlakyRepository(AssessmentRepository):
+    """Fails the first `failures` batches, then keeps the written states."""
+
+    def __init__(self, failures=1, during_failure=None):
+        self.failures = failures
+        self.during_failure = during_failure  # called inside a failing save_many, e.g. to submit meanwhile
+        self.saved = {}
+
+    def save_many(self, records):
+        records = list(records)
+        if self.failures:
+            self.failures -= 1
+            if self.during_failure:
+                self.during_failure()
+            raise RuntimeError("database is locked")
+        for assessment_id, answers, weights, name in records:
+            self.saved[assessment_id] = (np.array(answers), weights, name)
+
+
+def store(value):
+    return ResponseStore(np.full(scoring.DEFAULT_INDEX.n_questions, value, dtype=np.int8))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_failed_batch_is_kept_for_the_next_flush():
+    repository = FlakyRepository()
+    queue = WriteBehindQueue(repository, delay=60, max_delay=60)  # flushed by hand only
+    queue.submit("a", store(2), {scoring.DIMENSIONS[0]: 1.5}, "first")
+    queue.submit("b", store(4))
+    with pytest.raises(RuntimeError):
+        queue.flush()
+    assert queue.failed == 1 and queue.writes == 0
+    assert queue.pending("a")[2] == "first"
+    queue.flush()
+    assert queue.writes == 1
+    assert set(repository.saved) == {"a", "b"}
+    assert repository.saved["a"][1] == {scoring.DIMENSIONS[0]: 1.5}
+    queue.close()
+
+
+def test_states_submitted_during_a_failed_flush_win():
+    queue = None
+
+    def submit_newer():
+        queue.submit("a", store(5), None, "newer")
+
+    repository = FlakyRepository(during_failure=submit_newer)
+    queue = WriteBehindQueue(repository, delay=60, max_delay=60)
+    queue.submit("a", store(1), None, "older")
+    with pytest.raises(RuntimeError):
+        queue.flush()
+    queue.flush()
+    answers, _, name = repository.saved["a"]
+    assert name == "newer" and (answers == 5).all()
+    queue.close()
+
+
+def test_background_writer_retries_after_a_failure():
+    repository = FlakyRepository(failures=2)
+    queue = WriteBehindQueue(repository, delay=0.01, max_delay=0.05)
+    queue.submit("a", store(3))
+    wait_for(lambda: queue.writes == 1)
+    assert queue.failed == 2
+    assert queue._thread.is_alive()
+    queue.submit("b", store(4))
+    wait_for(lambda: "b" in repository.saved)
+    queue.close()
+
+
+def test_delete_drops_the_pending_state(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "assessments.db"))
+    storage = AssessmentStorage(repository, delay=60, max_delay=60)
+    storage.save("a", store(2))
+    storage.save_many([("b", store(3).answers, None, None)])
+    repository.add_rater("shared", "rater", "b")
+    storage.save("b", store(4))
+    storage.delete("a")
+    storage.delete("b")
+    assert storage.load("a") is None and storage.load("b") is None
+    assert storage.list() == []
+    assert repository.revisions("b") == [] and repository.raters("shared") == []
+    storage.queue.close()
+    repository.close()